@@ -1,8 +1,12 @@
 # This module contains the base class for a RL-Agent
 
 import os
+import copy
 import time
-import pickle
+from collections import OrderedDict
+
+import utils.flatCheckpoint as uflat
+import utils.checkpointStore as ustore
 
 
 class Agent:
@@ -14,6 +18,20 @@ class Agent:
         self.optimizer = optimizer  # The optimizer for the network
         self.model_dir = model_dir  # The place to dump the saved models
         self.log_dir = log_dir  # The place to dump the training logs
+        self.checkpoint_writer = None  # Background writer of the checkpoints (None writes them synchronously)
+        self.stop_check = None  # Returns True when the agent must stop as soon as possible (None never stops)
+        self.recorder = None  # Records the transitions played in training (None doesn't record them)
+        self.all_perspectives = False  # Play all the agents of the game after the warmup (see set_all_perspectives())
+
+    def __getstate__(self):
+        """ Copies of the agent (e.g. the self-play clones) share neither its background writer, its stop check
+            nor its recorder
+        """
+        state = self.__dict__.copy()
+        state['checkpoint_writer'] = None
+        state['stop_check'] = None
+        state['recorder'] = None
+        return state
 
     def get_model_directory(self):
         """ Returns the directory to store the models """
@@ -35,19 +53,106 @@ class Agent:
         """ Returns the optimizer stored """
         return self.optimizer
 
+    def set_stop_check(self, stop_check):
+        """ Sets the function that is checked on every step, returning True when the agent must stop """
+        self.stop_check = stop_check
+
+    def need_to_stop(self):
+        """ Returns a boolean indicating whether the agent must stop (e.g. the training was cancelled) """
+        return self.stop_check is not None and self.stop_check()
+
+    def set_recorder(self, recorder):
+        """ Sets the recorder of the transitions played in training """
+        self.recorder = recorder
+
+    def record_transition(self, state, action, reward, done):
+        """ Hands the transition, along with the actions of the opponents, to the recorder (if there is one) """
+        if self.recorder is not None:
+            self.recorder.add(state, action, reward, done, self.environment.getOpponentActions())
+
+    def is_replay_full(self):
+        """ Returns whether the replay buffer is full. Agents without one are always considered full """
+        return True
+
+    def set_checkpoint_writer(self, writer):
+        """ Sets the writer that dumps the checkpoints in background """
+        self.checkpoint_writer = writer
+
     def save(self, i):
         """ Responsible for dumping the model's weights to the model directory """
-        state_dict = self.network.state_dict()
 
-        # <model_name>_<episode #>_<time>.pkl
-        model_name = f'{self.get_acronym()}_{i}_{time.asctime()}.pkl'
+        # Copy the weights, so that training can go on while they are being written
+        state_dict = OrderedDict((k, v.detach().clone()) for k, v in self.network.state_dict().items())
+
+        # <model_name>_<episode #>_<YYYYmmdd-HHMMSS>.flat
+        model_name = f'{self.get_acronym()}_{i}_{time.strftime("%Y%m%d-%H%M%S")}{uflat.EXTENSION}'
         model_path = os.path.join(self.get_model_directory(), model_name)
-        model_file = open(model_path, 'wb')
 
         # Finally save the configuration of the network to disk
-        pickle.dump(state_dict, model_file)
-
-        model_file.close()
+        if self.checkpoint_writer is not None:
+            self.checkpoint_writer.submit(i, model_path, state_dict)
+        else:
+            uflat.write(model_path, state_dict)
+
+    def load(self, path, zero_copy=True):
+        """ Loads the model's weights from a checkpoint (flat, delta or pickled). With zero_copy, the weights of a flat
+            checkpoint are used in place over the mapped file instead of being copied into the network, so that
+            many agents loading the same snapshot (e.g. a pool of opponents) share the same physical memory
+        """
+        state_dict = ustore.load_checkpoint(path)
+
+        if not (zero_copy and uflat.is_flat_checkpoint(path)):
+            self.network.load_state_dict(state_dict)
+            return
+
+        # Check the names and shapes first, then point the parameters and buffers to the mapped tensors
+        tensors = dict(self.network.named_parameters())
+        tensors.update(self.network.named_buffers())
+        mismatching = set(tensors) ^ set(state_dict)
+        if mismatching:
+            raise KeyError(f'Mismatching tensors between the network and "{path}": {sorted(mismatching)}')
+
+        for name, tensor in tensors.items():
+            if tensor.shape != state_dict[name].shape:
+                raise ValueError(f'Mismatching shape of "{name}" between the network and "{path}"')
+        for name, tensor in tensors.items():
+            tensor.data = state_dict[name]
+
+    def get_state(self):
+        """ Returns a copy of everything needed to resume training the agent (except its replay buffer) """
+        state = {
+            'network': copy.deepcopy(self.network.state_dict()),
+            'optimizer': copy.deepcopy(self.optimizer.state_dict()) if self.optimizer is not None else None
+        }
+        return state
+
+    def set_state(self, state):
+        """ Restores the agent from a state returned by get_state() """
+        self.network.load_state_dict(state['network'])
+        if self.optimizer is not None and state['optimizer'] is not None:
+            self.optimizer.load_state_dict(state['optimizer'])
+
+    def get_replay_buffer(self):
+        """ Returns the replay buffer of the agent, or None if it doesn't have one """
+        return None
+
+    def supports_offline_training(self):
+        """ Returns whether the agent can be trained on batches of transitions it didn't play (see train_on_batch()) """
+        return False
+
+    def train_on_batch(self, states, actions, rewards, next_states, dones):
+        """ Performs a single update on a batch of transitions (e.g. recorded ones). Returns the loss """
+        raise NotImplementedError(f'{self.get_name()} can\'t be trained on batches of transitions')
+
+    def supports_all_perspectives(self):
+        """ Returns whether the agent can play (and learn from) all the agents of the game at once """
+        return False
+
+    def set_all_perspectives(self, enabled):
+        """ Sets whether the agent plays all the agents of the game once the warmup is over, instead of its clones.
+            Every one of them contributes its transitions. The environment must support it too
+        """
+        self.all_perspectives = enabled
 
     # ****************************************************
     # The following methods need to be overridden by
@@ -6,6 +6,7 @@ import torch.nn.functional as F
 
 # Custom module imports for agent
 from agents.agent import Agent
+import utils.profiler as uprof
 
 
 class CrossEntropyMethod(Agent):
@@ -52,10 +53,15 @@ class CrossEntropyMethod(Agent):
         total_reward = 0  # Total reward (cumulative) we got in the episode
 
         while not done:
-            action = self.predict_action(curr_state, eval)
+            if self.need_to_stop():
+                break       # Cancelled -- The episode is left unfinished
+
+            with uprof.phase(uprof.PHASE_PREDICT_ACTION):
+                action = self.predict_action(curr_state, eval)
 
             # Now take an action and get the appropriate rewards and next state
-            next_state, reward, done, won, _ = env.step(action)
+            with uprof.phase(uprof.PHASE_ENV_STEP):
+                next_state, reward, done, won, _ = env.step(action)
             total_reward += reward
 
             # Save the current state, action and the reward obtained.
@@ -63,6 +69,7 @@ class CrossEntropyMethod(Agent):
                 self.observations.append(curr_state)
                 self.actions.append(action)
                 self.rewards.append(reward)
+                self.record_transition(curr_state, action, reward, done)
 
             curr_state = next_state
             total_steps += 1
@@ -83,12 +90,36 @@ class CrossEntropyMethod(Agent):
         loss = -loss            # Need to do a gradient ascent
 
         # Back-propagate the loss
-        optimizer.zero_grad()
-        loss.backward()
-        optimizer.step()
+        with uprof.phase(uprof.PHASE_GRADIENT_UPDATE):
+            optimizer.zero_grad()
+            loss.backward()
+            optimizer.step()
 
         self._memory_reset()    # No use for the memory -- Clear them now
 
+    def supports_offline_training(self):
+        """ Returns True -- The policy can be fit to the actions of recorded (e.g. stronger) players """
+        return True
+
+    def train_on_batch(self, states, actions, rewards, next_states, dones):
+        """ Fits the policy to the actions taken in the batch of transitions, i.e. minimizes the cross-entropy
+            between the two (the rewards and next states aren't needed). Returns the loss
+        """
+        optimizer = self.get_optimizer()
+
+        states_t = torch.as_tensor(np.asarray(states), dtype=torch.float32)      # Shape (batch, observation_len)
+        actions_t = torch.as_tensor(np.asarray(actions), dtype=torch.long)      # Shape (batch, )
+
+        scores = self.network(states_t)
+        loss = F.cross_entropy(scores, actions_t)
+
+        with uprof.phase(uprof.PHASE_GRADIENT_UPDATE):
+            optimizer.zero_grad()
+            loss.backward()
+            optimizer.step()
+
+        return loss.item()
+
     def _get_discounted_rewards(self):
         """ Calculates the discounted rewards and returns them """
         # Because we are dealing with Episodic tasks, the discounting factor is 1
@@ -8,6 +8,7 @@ import torch.nn.functional as F
 # Custom module imports for agent
 from agents.agent import Agent
 from agents.replayBuffer import ReplayBuffer
+import utils.profiler as uprof
 
 
 class DeepQNetwork(Agent):
@@ -41,6 +42,31 @@ class DeepQNetwork(Agent):
         """ Return the name of this agent, i.e. Deep Q-Network """
         return 'Deep Q-Network'
 
+    def get_state(self):
+        """ Returns a copy of everything needed to resume training, including the target network and exploration """
+        state = super().get_state()
+        state['target_net'] = copy.deepcopy(self.target_net.state_dict())
+        state['epsilon'] = self.epsilon
+        state['steps_trained'] = self._steps_trained
+        state['steps_threshold'] = self._steps_threshold
+        return state
+
+    def set_state(self, state):
+        """ Restores the agent from a state returned by get_state() """
+        super().set_state(state)
+        self.target_net.load_state_dict(state['target_net'])
+        self.epsilon = state['epsilon']
+        self._steps_trained = state['steps_trained']
+        self._steps_threshold = state['steps_threshold']
+
+    def get_replay_buffer(self):
+        """ Returns the replay buffer of the agent """
+        return self.buffer
+
+    def is_replay_full(self):
+        """ Returns whether the replay buffer is full, i.e. storing evicts the oldest experiences """
+        return len(self.buffer) >= self.buffer.buffer_size
+
     def predict_action(self, state, eval=False):
         """ Returns an action -- Predicts it from the state """
         env = self.get_environment()
@@ -56,31 +82,116 @@ class DeepQNetwork(Agent):
 
         return action
 
+    def predict_actions(self, states, eval=False):
+        """ Returns the actions of many states at once, predicted in a single forward pass. Each of them is picked
+            the way predict_action() picks it
+        """
+        env = self.get_environment()
+        states = torch.as_tensor(np.asarray(states), dtype=torch.float)
+        actions = torch.argmax(self.network(states).detach(), dim=-1).tolist()
+
+        for i in range(len(actions)):
+            if np.random.uniform() < self.epsilon and eval:
+                self.epsilon *= self.epsilon_decay
+                actions[i] = np.random.choice(env.getNumActions())
+
+        return actions
+
     def play_one_episode(self, eval=False):
         """ Responsible for playing one episode and storing the experience obtained into the memory """
         env = self.get_environment()
+        if self.all_perspectives and not eval and env.isWarmupComplete():
+            return self._play_all_perspectives()
+
         curr_state = env.reset()
         done = False        # Is the game finished yet ?
         won = False         # Did we total_wins ?
         total_steps = 0     # Number of steps before game was finished
         total_reward = 0    # Total reward (cumulative) we got in the episode
+        experience = []     # Experience obtained, stored once the episode is over
 
         while not done:
-            action = self.predict_action(curr_state, eval)
+            if self.need_to_stop():
+                break       # Cancelled -- The episode is left unfinished
+
+            with uprof.phase(uprof.PHASE_PREDICT_ACTION):
+                action = self.predict_action(curr_state, eval)
 
             # Now take an action and get the appropriate rewards and next state
-            next_state, reward, done, won, _ = env.step(action)
+            with uprof.phase(uprof.PHASE_ENV_STEP):
+                next_state, reward, done, won, _ = env.step(action)
             total_reward += reward
 
-            # Save the experience obtained into the buffer
+            # Save the experience obtained
             if not eval:
-                self.buffer.store(curr_state, action, reward, next_state, done)
+                experience.append((curr_state, action, reward, next_state, done))
+                self.record_transition(curr_state, action, reward, done)
 
             curr_state = next_state
             total_steps += 1
 
+        self._store_experience(experience)
         return total_reward, total_steps, won
 
+    def _play_all_perspectives(self):
+        """ Plays one episode with every goose (ours and all the others) acting from the network, till the game is
+            over, and stores the experience of all of them into the memory. The rewards, steps and outcome returned
+            are those of our goose, as in a regular episode
+        """
+        env = self.get_environment()
+        our_index = env.getOurAgentIndex()
+        curr_states = env.resetAll()
+        active = [True] * env.getNumAgents()     # The geese still in the game
+        won = False
+        total_steps = 0
+        total_reward = 0
+        experience = []
+
+        while any(active):
+            if self.need_to_stop():
+                break       # Cancelled -- The episode is left unfinished
+
+            acting = [i for i, is_active in enumerate(active) if is_active]
+            with uprof.phase(uprof.PHASE_PREDICT_ACTION):
+                acting_actions = self.predict_actions(curr_states[acting])
+
+            actions = [None] * env.getNumAgents()
+            for i, action in zip(acting, acting_actions):
+                actions[i] = action
+
+            with uprof.phase(uprof.PHASE_ENV_STEP):
+                next_states, rewards, dones, won, _ = env.stepAll(actions)
+
+            for i in acting:
+                experience.append((curr_states[i], actions[i], rewards[i], next_states[i], dones[i]))
+
+            if active[our_index]:
+                self.record_transition(curr_states[our_index], actions[our_index], rewards[our_index],
+                                       dones[our_index])
+                total_reward += rewards[our_index]
+                total_steps += 1
+
+            active = [is_active and not done for is_active, done in zip(active, dones)]
+            curr_states = next_states
+
+        self._store_experience(experience)
+        return total_reward, total_steps, won
+
+    def _store_experience(self, experience):
+        """ Stores the experience of an episode into the memory, unless the episode was cancelled. A cancelled
+            episode doesn't count (see Trainer.start()), so none of it must end up in the buffer (nor in the segments
+            of the buffer saved to resume from)
+        """
+        if self.need_to_stop():
+            return
+
+        for transition in experience:
+            self.buffer.store(*transition)
+
+    def supports_all_perspectives(self):
+        """ Returns True -- The transitions of all the geese go into the replay buffer """
+        return True
+
     def train(self):
         """ Responsible for training the network """
 
@@ -92,15 +203,23 @@ class DeepQNetwork(Agent):
         # Yep, the buffer is ready to be sampled from
         # Sample a batch from the buffer
         current_states, actions, rewards, next_states, done = self.buffer.sample(self.REPLAY_BATCH_SIZE)
+        self.train_on_batch(current_states, actions, rewards, next_states, done)
+
+    def supports_offline_training(self):
+        """ Returns True -- Q-learning is off-policy, any transition can be learnt from """
+        return True
+
+    def train_on_batch(self, states, actions, rewards, next_states, dones):
+        """ Performs a single Q-learning update on the batch of transitions. Returns the loss """
         optimizer = self.get_optimizer()
 
         # TODO: Use GPU if available -- Set it in the parent class
 
-        curr_states_t = torch.tensor(current_states, dtype=torch.float)  # Shape (batch, n_obs)
-        next_states_t = torch.tensor(next_states, dtype=torch.float)  # Shape (batch, n_obs)
-        actions_t = torch.tensor(actions, dtype=torch.long)  # Shape (batch, )
-        done_t = torch.tensor(done, dtype=torch.bool)  # Shape (batch, )
-        rewards_t = torch.tensor(rewards, dtype=torch.float)  # Shape (batch, )
+        curr_states_t = torch.as_tensor(np.asarray(states), dtype=torch.float)  # Shape (batch, n_obs)
+        next_states_t = torch.as_tensor(np.asarray(next_states), dtype=torch.float)  # Shape (batch, n_obs)
+        actions_t = torch.as_tensor(np.asarray(actions), dtype=torch.long)  # Shape (batch, )
+        done_t = torch.as_tensor(np.asarray(dones), dtype=torch.bool)  # Shape (batch, )
+        rewards_t = torch.as_tensor(np.asarray(rewards), dtype=torch.float)  # Shape (batch, )
 
         curr_q_vals = self.network(curr_states_t)  # Shape (batch, n_actions)
         target_q_vals = self.target_net(next_states_t).detach()  # Shape (batch, n_actions)
@@ -115,11 +234,14 @@ class DeepQNetwork(Agent):
         # Finally calculate the loss and perform a back-propagation
         loss = F.mse_loss(curr_q_vals, updated_q_val)
 
-        optimizer.zero_grad()
-        loss.backward()
-        optimizer.step()
+        with uprof.phase(uprof.PHASE_GRADIENT_UPDATE):
+            optimizer.zero_grad()
+            loss.backward()
+            optimizer.step()
 
         self._steps_trained += 1
         if self._steps_trained > self._steps_threshold:
             self._steps_threshold = 0
             self.target_net.load_state_dict(self.network.state_dict())
+
+        return loss.item()
@@ -6,6 +6,7 @@ import torch.nn.functional as F
 
 # Custom module imports for agent
 from agents.agent import Agent
+import utils.profiler as uprof
 
 
 class REINFORCE(Agent):
@@ -53,10 +54,15 @@ class REINFORCE(Agent):
         total_reward = 0  # Total reward (cumulative) we got in the episode
 
         while not done:
-            action = self.predict_action(curr_state, eval)
+            if self.need_to_stop():
+                break       # Cancelled -- The episode is left unfinished
+
+            with uprof.phase(uprof.PHASE_PREDICT_ACTION):
+                action = self.predict_action(curr_state, eval)
 
             # Now take an action and get the appropriate rewards and next state
-            next_state, reward, done, won, _ = env.step(action)
+            with uprof.phase(uprof.PHASE_ENV_STEP):
+                next_state, reward, done, won, _ = env.step(action)
             total_reward += reward
 
             # Save the reward obtained. Log probabilities of the action was aleady saved
@@ -65,6 +71,7 @@ class REINFORCE(Agent):
                 self.actions.append(action)
                 self.rewards.append(reward)
                 self.observations.append(curr_state)
+                self.record_transition(curr_state, action, reward, done)
 
             curr_state = next_state
             total_steps += 1
@@ -94,9 +101,10 @@ class REINFORCE(Agent):
         loss = -loss            # We need to do a gradient ascent step
 
         # Back-propagate the loss
-        optimizer.zero_grad()
-        loss.backward()
-        optimizer.step()
+        with uprof.phase(uprof.PHASE_GRADIENT_UPDATE):
+            optimizer.zero_grad()
+            loss.backward()
+            optimizer.step()
 
         self._memory_reset()    # No use for the memory -- Clear them now
 
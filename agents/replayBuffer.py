@@ -1,6 +1,10 @@
 # This module contains the class for Replay-Buffer
 
+import os
+import glob
 import random
+import itertools
+import numpy as np
 from collections import deque
 
 
@@ -11,13 +15,33 @@ class ReplayBuffer:
     NEXT_STATE_KEY = 'next_state'
     DONE_KEY = 'done'
 
+    # Segments of the buffer on disk are named <prefix><index of first experience>_<index past the last one>.npz
+    SEGMENT_PREFIX = 'segment_'
+
     def __init__(self, buffer_size):
         self.buffer = deque(maxlen=buffer_size)
+        self.buffer_size = buffer_size
+        self.total_stored = 0       # Number of experiences ever stored (the index of the next one)
+        self.total_dumped = 0       # Number of experiences ever stored that were already handed out for dumping
+        self.augmentation = None    # Transforms the sampled batches (None hands them out as they were stored)
 
     def store(self, curr_state, action, reward, next_state, done):
         """ Store the obtained experience onto the buffer """
         data = self._prepare_data(curr_state, action, reward, next_state, done)
         self.buffer.append(data)
+        self.total_stored += 1
+
+    def store_batch(self, columns):
+        """ Stores many experiences at once, given column by column (as in the segments written to disk) """
+        n_experiences = len(columns[self.ACTION_KEY])
+        self.buffer.extend({key: column[i] for key, column in columns.items()} for i in range(n_experiences))
+        self.total_stored += n_experiences
+
+    def set_augmentation(self, augmentation):
+        """ Sets the function that transforms (states, actions, next_states) of every sampled batch, e.g. by the
+            symmetries of the board. It returns them transformed, as arrays
+        """
+        self.augmentation = augmentation
 
     def sample(self, batch_size):
         """ Samples a batch of data from the buffer and returns it """
@@ -35,6 +59,9 @@ class ReplayBuffer:
             next_states.append(data[self.NEXT_STATE_KEY])
             done.append(data[self.DONE_KEY])
 
+        if self.augmentation is not None:
+            curr_states, actions, next_states = self.augmentation(curr_states, actions, next_states)
+
         return curr_states, actions, rewards, next_states, done
 
     def _prepare_data(self, curr_state, action, reward, next_state, done):
@@ -49,6 +76,74 @@ class ReplayBuffer:
 
         return data
 
+    # *****************************************
+    # Incremental persistence of the buffer. Only the experiences stored since the previous
+    # dump are written, as a new segment, so the cost of a dump doesn't grow with the buffer
+    # *****************************************
+
+    def take_new_segment(self):
+        """ Returns (start, experiences) of the experiences stored since the previous call.
+            Those that were already evicted from the buffer are skipped
+        """
+        n_new = min(self.total_stored - self.total_dumped, len(self.buffer))
+        start = self.total_stored - n_new
+        experiences = list(itertools.islice(reversed(self.buffer), n_new))     # Only the newest, not the whole buffer
+        experiences.reverse()
+
+        self.total_dumped = self.total_stored
+        return start, experiences
+
+    @classmethod
+    def write_segment(cls, directory, start, experiences):
+        """ Writes the experiences (as returned by take_new_segment) as a segment in the directory """
+        if not experiences:
+            return
+
+        end = start + len(experiences)
+        columns = {key: np.asarray([data[key] for data in experiences]) for key in experiences[0]}
+
+        path = os.path.join(directory, f'{cls.SEGMENT_PREFIX}{start}_{end}.npz')
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as segment_file:
+            np.savez(segment_file, **columns)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def prune_segments(cls, directory, total_stored, buffer_size):
+        """ Deletes the segments whose experiences have all been evicted from a buffer that stored total_stored,
+            and the ones written after it (left over by a run that crashed before saving its state)
+        """
+        for path, start, end in cls._list_segments(directory):
+            if end <= total_stored - buffer_size or start >= total_stored:
+                os.remove(path)
+
+    def load_segments(self, directory, total_stored):
+        """ Refills the (empty) buffer from the segments in the directory, as it was after total_stored experiences """
+        first = total_stored - self.buffer_size
+        for path, start, end in self._list_segments(directory):
+            if end <= first or start >= total_stored:
+                continue
+
+            with np.load(path) as segment:
+                columns = {key: segment[key] for key in segment.files}
+
+            for i in range(max(start, first), min(end, total_stored)):
+                self.buffer.append({key: column[i - start] for key, column in columns.items()})
+
+        self.total_stored = total_stored
+        self.total_dumped = total_stored
+
+    @classmethod
+    def _list_segments(cls, directory):
+        """ Returns the list of (path, start, end) of the segments in the directory, ordered by start """
+        segments = []
+        for path in glob.glob(os.path.join(directory, f'{cls.SEGMENT_PREFIX}*.npz')):
+            name = os.path.basename(path)[len(cls.SEGMENT_PREFIX):-len('.npz')]
+            start, end = name.split('_')
+            segments.append((path, int(start), int(end)))
+
+        return sorted(segments, key=lambda segment: segment[1])
+
     def __len__(self):
         """ Returns the length of the current buffer """
         return len(self.buffer)
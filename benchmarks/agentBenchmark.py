@@ -0,0 +1,52 @@
+# This module benchmarks the agents: predicting actions and training the Deep Q-Network
+
+import numpy as np
+
+import benchmarks.benchmarkUtils as ubench
+import config.algorithmsConfig as acfg
+import utils.nn as unn
+from agents.dqn.deepQNetwork import DeepQNetwork
+from environments.kaggle.hungry_geese.hungryGeese import HungryGeese
+
+
+N_AGENTS = 2
+UNITS_LIST = [acfg.ALGO_DEF_NUM_UNITS] * acfg.ALGO_DEF_NUM_LAYERS
+ACTIV_LIST = [acfg.ALGO_DEF_ACTIVATION] * acfg.ALGO_DEF_NUM_LAYERS
+OPTIMIZER = 'Adam'
+
+
+def build_agent(agent_class):
+    """ Builds the agent on a fresh environment, with the default network, the way the dispatcher does """
+    env = HungryGeese(N_AGENTS, n_warmup=0, delta=0)
+    network = unn.FeedForwardNet(ip_dim=env.getObservationLength(),
+                                 op_dim=env.getNumActions(),
+                                 units_list=UNITS_LIST,
+                                 activ_list=ACTIV_LIST)
+    optimizer = unn.buildOptimizer(network, OPTIMIZER, acfg.ALGO_DEF_LEARN_RATE)
+    agent = agent_class(env=env, network=network, optimizer=optimizer, model_dir=None, log_dir=None)
+
+    env.setAgents(agent)
+    return agent
+
+
+def run(repeats=ubench.DEF_REPEATS, secs_per_repeat=ubench.DEF_SECS_PER_REPEAT):
+    """ Runs the benchmarks of the agents and returns their results """
+    results = {}
+
+    for agent_class in acfg.ALGO_LIST:
+        agent = build_agent(agent_class)
+        state = agent.get_environment().reset()
+        results[f'agent.predict_action[{agent_class.get_acronym()}]'] = ubench.measure(
+            lambda: agent.predict_action(state), 'predictions/sec', repeats, secs_per_repeat)
+
+    # The replay buffer is filled with random experiences, a training step only samples from it
+    agent = build_agent(DeepQNetwork)
+    env = agent.get_environment()
+    for _ in range(agent.REPLAY_BUFF_SIZE):
+        state = np.random.randint(-3, 5, size=env.getObservationLength()).astype(np.float32)
+        agent.get_replay_buffer().store(state, np.random.randint(env.getNumActions()), 1.0, state, False)
+
+    results[f'agent.train[{DeepQNetwork.get_acronym()},batch={agent.REPLAY_BATCH_SIZE}]'] = ubench.measure(
+        agent.train, 'train_steps/sec', repeats, secs_per_repeat)
+
+    return results
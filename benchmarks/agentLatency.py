@@ -0,0 +1,186 @@
+# Measures the latency of an exported (single-file) Hungry Geese agent, loaded and called the way Kaggle does
+#
+# Run it from the root of the project, for e.g.
+#           python -m benchmarks.agentLatency main.py --episodes 20
+#           python -m benchmarks.agentLatency main.py --observations observations.json --move-budget-ms 50
+#
+# The observations are recorded from games of the Kaggle GreedyAgent bots (every goose's perspective), and kept in
+# the file given, if any, to be played again by the later runs. The agent is loaded in a fresh interpreter every
+# time, so that the cold start pays for its imports as well. Exits with a non-zero status if a budget is exceeded
+#
+# NOTE: Only the standard library is imported at the top, as the worker must not have NumPy (or anything else
+#       the agent may import) loaded before the agent is
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+
+
+DEF_EPISODES = 10               # Number of games recorded, when the observations are not loaded from a file
+DEF_N_AGENTS = 4
+DEF_COLD_RUNS = 3               # Number of fresh interpreters the agent is loaded in
+DEF_MOVE_BUDGET_MS = 1000       # Kaggle's actTimeout of Hungry Geese
+DEF_COLD_BUDGET_MS = 1000       # Beyond actTimeout, the first move eats into the overage time of the whole game
+
+# Keys of the file of observations
+KEY_CONFIGURATION = 'configuration'
+KEY_OBSERVATIONS = 'observations'
+
+# Keys of the measurements of a worker
+KEY_LOAD_MS = 'load_ms'         # Executing the file (its imports included) to get the agent
+KEY_FIRST_MS = 'first_move_ms'  # First call of the agent
+KEY_MOVES_MS = 'moves_ms'       # Every call after the first one
+
+
+class _Struct(dict):
+    """ Dictionary whose keys are attributes as well, like the observation and configuration Kaggle passes """
+
+    def __getattr__(self, name):
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name)
+
+
+def record_observations(n_episodes, n_agents=DEF_N_AGENTS):
+    """ Plays games of the GreedyAgent bots and returns the observation of every goose still playing, every step """
+    import kaggle_environments as kaggle_env
+
+    env = kaggle_env.make('hungry_geese')
+    observations = []
+    for _ in range(n_episodes):
+        steps = env.run(['greedy'] * n_agents)
+
+        # Kaggle only shares the state of the board with the first agent. The last step is the end of the game
+        for step in steps[:-1]:
+            shared = step[0]['observation']
+            for index, agent_state in enumerate(step):
+                if agent_state['status'] == 'ACTIVE':
+                    observations.append(dict(shared, index=index))
+
+    return {KEY_CONFIGURATION: dict(env.configuration), KEY_OBSERVATIONS: observations}
+
+
+def save_observations(path, recording):
+    """ Saves the observations returned by record_observations() as JSON """
+    with open(path, 'w') as obs_file:
+        json.dump(recording, obs_file)
+
+
+def load_observations(path):
+    """ Loads a file saved by save_observations() """
+    with open(path) as obs_file:
+        return json.load(obs_file)
+
+
+def load_agent(path):
+    """ Returns the agent of the file -- Like Kaggle, the last callable defined once the file is executed """
+    with open(path) as agent_file:
+        source = agent_file.read()
+
+    namespace = {}
+    sys.path.append(os.path.dirname(os.path.abspath(path)))     # The agent may import files next to it
+    try:
+        exec(compile(source, path, 'exec'), namespace)
+    finally:
+        sys.path.pop()
+
+    return [value for value in namespace.values() if callable(value)][-1]
+
+
+def run_worker(agent_path, obs_path, result_path):
+    """ Loads the agent, plays all the observations through it and saves the timings (in ms) as JSON """
+    start = time.perf_counter()
+    agent = load_agent(agent_path)
+    load_ms = (time.perf_counter() - start) * 1000
+
+    recording = load_observations(obs_path)
+    configuration = _Struct(recording[KEY_CONFIGURATION])
+    observations = [_Struct(obs) for obs in recording[KEY_OBSERVATIONS]]
+
+    moves_ms = []
+    for obs in observations:
+        start = time.perf_counter()
+        agent(obs, configuration)
+        moves_ms.append((time.perf_counter() - start) * 1000)
+
+    with open(result_path, 'w') as result_file:
+        json.dump({KEY_LOAD_MS: load_ms, KEY_FIRST_MS: moves_ms[0], KEY_MOVES_MS: moves_ms[1:]}, result_file)
+
+
+def measure(agent_path, obs_path):
+    """ Runs a worker in a fresh interpreter and returns its timings """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        result_path = os.path.join(tmp_dir, 'result.json')
+        root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        subprocess.run([sys.executable, '-m', 'benchmarks.agentLatency', os.path.abspath(agent_path),
+                        '--observations', os.path.abspath(obs_path), '--worker-result', result_path],
+                       cwd=root_dir, check=True)
+
+        with open(result_path) as result_file:
+            return json.load(result_file)
+
+
+def percentile(values, q):
+    """ Returns the q-th percentile of the values (nearest rank) """
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measures the latency of an exported Hungry Geese agent')
+    parser.add_argument('agent', help='File of the agent, e.g. the main.py of the submission')
+    parser.add_argument('--observations', default=None,
+                        help='File of the observations to play -- Recorded from games of the bots into it if missing')
+    parser.add_argument('--episodes', type=int, default=DEF_EPISODES, help='Number of games to record')
+    parser.add_argument('--cold-runs', type=int, default=DEF_COLD_RUNS,
+                        help='Number of fresh interpreters the agent is loaded in')
+    parser.add_argument('--move-budget-ms', type=float, default=DEF_MOVE_BUDGET_MS,
+                        help='Budget of the slowest move (after the first one)')
+    parser.add_argument('--cold-budget-ms', type=float, default=DEF_COLD_BUDGET_MS,
+                        help='Budget of the cold start: loading the agent and its first move')
+    parser.add_argument('--worker-result', default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker_result is not None:
+        run_worker(args.agent, args.observations, args.worker_result)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        obs_path = args.observations
+        if obs_path is None or not os.path.exists(obs_path):
+            recording = record_observations(args.episodes)
+            obs_path = obs_path or os.path.join(tmp_dir, 'observations.json')
+            save_observations(obs_path, recording)
+            print(f'Recorded {len(recording[KEY_OBSERVATIONS])} observations from {args.episodes} games')
+
+        runs = [measure(args.agent, obs_path) for _ in range(args.cold_runs)]
+
+    cold_ms = [run[KEY_LOAD_MS] + run[KEY_FIRST_MS] for run in runs]
+    moves_ms = [move_ms for run in runs for move_ms in run[KEY_MOVES_MS]]
+
+    print(f'Cold start (worst of {len(runs)}): {max(cold_ms):.2f} ms -- '
+          f'Loading {max(run[KEY_LOAD_MS] for run in runs):.2f} ms, '
+          f'first move {max(run[KEY_FIRST_MS] for run in runs):.2f} ms')
+    print(f'Moves ({len(moves_ms)}): p50 {percentile(moves_ms, 50):.3f} ms, p99 {percentile(moves_ms, 99):.3f} ms, '
+          f'max {max(moves_ms):.3f} ms')
+
+    failures = []
+    if max(cold_ms) > args.cold_budget_ms:
+        failures.append(f'cold start {max(cold_ms):.2f} ms > {args.cold_budget_ms:.2f} ms')
+    if max(moves_ms) > args.move_budget_ms:
+        failures.append(f'slowest move {max(moves_ms):.2f} ms > {args.move_budget_ms:.2f} ms')
+
+    if failures:
+        print(f'FAILED: Over the budget -- {", ".join(failures)}')
+        sys.exit(1)
+
+    print('All within the budget')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+# This module contains the helpers shared by the benchmarks: timing, machine information and the result files
+
+import os
+import sys
+import json
+import time
+import socket
+import platform
+import statistics
+import subprocess
+import numpy as np
+import torch
+
+
+# Keys of a single benchmark result
+KEY_VALUE = 'value'             # Median throughput over the repeats
+KEY_STDEV = 'stdev'             # Standard deviation of the throughput over the repeats
+KEY_UNIT = 'unit'
+KEY_REPEATS = 'repeats'
+
+# Keys of a result file
+KEY_MACHINE = 'machine'
+KEY_RESULTS = 'results'
+KEY_CREATED = 'created'
+
+DEF_REPEATS = 5                 # Number of times every benchmark is measured
+DEF_SECS_PER_REPEAT = 0.5       # Minimum time a single measurement runs for
+
+
+def measure(fn, unit, repeats=DEF_REPEATS, secs_per_repeat=DEF_SECS_PER_REPEAT, setup=None):
+    """ Measures how many times per second fn can be called. The calls are timed in batches of at least
+        secs_per_repeat, repeats times, and the median of them is reported. setup (if given) is called,
+        untimed, before every batch
+    """
+    fn()    # Warm up -- The first call often pays for lazy initialization
+
+    throughputs = []
+    for _ in range(repeats):
+        if setup is not None:
+            setup()
+
+        n_ops = 0
+        start = time.perf_counter()
+        elapsed = 0
+        while elapsed < secs_per_repeat:
+            fn()
+            n_ops += 1
+            elapsed = time.perf_counter() - start
+
+        throughputs.append(n_ops / elapsed)
+
+    return summarize(throughputs, unit)
+
+
+def summarize(throughputs, unit):
+    """ Returns the result of a benchmark from the throughputs measured on its repeats """
+    return {
+        KEY_VALUE: statistics.median(throughputs),
+        KEY_STDEV: statistics.stdev(throughputs) if len(throughputs) > 1 else 0.0,
+        KEY_UNIT: unit,
+        KEY_REPEATS: len(throughputs)
+    }
+
+
+def get_machine_info():
+    """ Returns the description of the machine (and the software) the benchmarks are run on """
+    return {
+        'hostname': socket.gethostname(),
+        'platform': platform.platform(),
+        'processor': platform.processor() or platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'python': sys.version.split()[0],
+        'numpy': np.__version__,
+        'torch': torch.__version__,
+        'torch_threads': torch.get_num_threads(),
+        'git_commit': _get_git_commit()
+    }
+
+
+def save_results(path, results):
+    """ Saves the results of the benchmarks, along with the machine information, as JSON """
+    data = {
+        KEY_CREATED: time.strftime('%Y-%m-%d %H:%M:%S'),
+        KEY_MACHINE: get_machine_info(),
+        KEY_RESULTS: results
+    }
+
+    with open(path, 'w') as results_file:
+        json.dump(data, results_file, indent=2)
+
+
+def load_results(path):
+    """ Loads a file saved by save_results() """
+    with open(path) as results_file:
+        return json.load(results_file)
+
+
+def _get_git_commit():
+    """ Returns the commit of the repository being benchmarked (None if it can't be found) """
+    try:
+        output = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10)
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+    return output.stdout.strip() or None
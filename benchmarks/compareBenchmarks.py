@@ -0,0 +1,69 @@
+# Compares two result files of the benchmarks and flags the regressions
+#
+# Run it from the root of the project, for e.g.
+#           python -m benchmarks.compareBenchmarks baseline.json results.json --threshold 0.1
+#
+# Exits with a non-zero status if any benchmark regressed, so that it can gate a change
+
+import sys
+import argparse
+
+import benchmarks.benchmarkUtils as ubench
+
+
+DEF_THRESHOLD = 0.10            # Relative slowdown beyond which a benchmark is flagged
+
+# Machine information that makes the results incomparable if it differs
+MACHINE_KEYS_COMPARED = ['processor', 'cpu_count', 'python', 'numpy', 'torch', 'torch_threads']
+
+
+def compare(baseline, current, threshold):
+    """ Returns the (name, baseline value, current value, relative change, regressed) of the benchmarks
+        present in both. All the benchmarks measure throughputs, so higher is better
+    """
+    rows = []
+    for name, base_result in baseline[ubench.KEY_RESULTS].items():
+        if name not in current[ubench.KEY_RESULTS]:
+            continue
+
+        base_value = base_result[ubench.KEY_VALUE]
+        curr_value = current[ubench.KEY_RESULTS][name][ubench.KEY_VALUE]
+        change = (curr_value - base_value) / base_value if base_value > 0 else 0.0
+        rows.append((name, base_value, curr_value, change, change < -threshold))
+
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compares two result files of the benchmarks')
+    parser.add_argument('baseline', help='Results to compare against')
+    parser.add_argument('current', help='Results to check for regressions')
+    parser.add_argument('--threshold', type=float, default=DEF_THRESHOLD,
+                        help='Relative slowdown beyond which a benchmark is flagged (0.1 is 10%%)')
+    args = parser.parse_args()
+
+    baseline = ubench.load_results(args.baseline)
+    current = ubench.load_results(args.current)
+
+    for key in MACHINE_KEYS_COMPARED:
+        base_info, curr_info = baseline[ubench.KEY_MACHINE].get(key), current[ubench.KEY_MACHINE].get(key)
+        if base_info != curr_info:
+            print(f'WARNING: The results come from different setups ({key}: {base_info} vs {curr_info})')
+
+    rows = compare(baseline, current, args.threshold)
+    n_regressed = 0
+    for name, base_value, curr_value, change, regressed in rows:
+        flag = 'REGRESSION' if regressed else ''
+        print(f'{name:<55} {base_value:>12.2f} -> {curr_value:>12.2f} {change:>+8.1%} {flag}')
+        n_regressed += int(regressed)
+
+    missing = set(baseline[ubench.KEY_RESULTS]) ^ set(current[ubench.KEY_RESULTS])
+    if missing:
+        print(f'Not compared (missing from one of the files): {", ".join(sorted(missing))}')
+
+    print(f'{n_regressed} of {len(rows)} benchmarks regressed by more than {args.threshold:.0%}')
+    sys.exit(1 if n_regressed > 0 else 0)
+
+
+if __name__ == '__main__':
+    main()
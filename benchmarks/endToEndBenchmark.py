@@ -0,0 +1,72 @@
+# This module benchmarks the whole training loop, from the dispatcher to the end of Trainer.start()
+
+import time
+import shutil
+import tempfile
+
+import benchmarks.benchmarkUtils as ubench
+import config.algorithmsConfig as acfg
+from config.environmentConfig import registerEnvironments
+from utils.dispatcher import dispatcher
+
+
+ENVIRONMENT = 'Hungry Geese'
+OPTIMIZER = 'Adam'
+N_EPISODES = 50
+
+
+class StubWorker:
+    """ Stands in for the worker of the GUI -- Never stops the training and drops the updates """
+
+    def __init__(self):
+        self.n_updates = 0
+
+    def is_active(self):
+        return True
+
+    def _update(self, *args):
+        self.n_updates += 1
+
+    update_progress_bar = _update
+    update_textbox_training = _update
+    update_textbox_showdown = _update
+    update_textbox_profile = _update
+    update_tensorboard_cmd = _update
+
+
+def build_config(algorithm, workspace, n_episodes):
+    """ Returns the configuration of a run with the defaults, the way the GUI builds it """
+    algo_config = acfg.AlgoConfig()
+    algo_config.setEnvironment(ENVIRONMENT)
+    algo_config.setAlgorithm(algorithm)
+    algo_config.setOptimizer(OPTIMIZER)
+    algo_config.setWorkspace(workspace)
+
+    config_data = algo_config.checkAndUpdateConfigData(algo_config.getConfigData())
+    config_data[acfg.KEY_NUM_EPISODES] = n_episodes
+    return config_data
+
+
+def run(repeats=ubench.DEF_REPEATS, secs_per_repeat=ubench.DEF_SECS_PER_REPEAT):
+    """ Runs the training loop of every agent and returns the episodes per second of each.
+        Every repeat is a complete run (secs_per_repeat doesn't apply, the runs are much longer)
+    """
+    registerEnvironments()
+    results = {}
+
+    for agent_class in acfg.ALGO_LIST:
+        throughputs = []
+        for _ in range(repeats):
+            workspace = tempfile.mkdtemp()
+            try:
+                config_data = build_config(agent_class.get_name(), workspace, N_EPISODES)
+                start = time.perf_counter()
+                dispatcher(config_data, StubWorker())
+                throughputs.append(N_EPISODES / (time.perf_counter() - start))
+            finally:
+                shutil.rmtree(workspace, ignore_errors=True)
+
+        results[f'e2e.trainer[{agent_class.get_acronym()},episodes={N_EPISODES}]'] = ubench.summarize(
+            throughputs, 'episodes/sec')
+
+    return results
@@ -0,0 +1,38 @@
+# This module benchmarks the Hungry Geese environment: reset, step and the board update
+
+import numpy as np
+
+import benchmarks.benchmarkUtils as ubench
+from environments.kaggle.hungry_geese.hungryGeese import HungryGeese
+
+
+AGENT_COUNTS = [2, 4, 8]
+WARMUP_FOREVER = 10**9          # The opponents stay the greedy bots, so no agent is needed to step
+
+
+def run(repeats=ubench.DEF_REPEATS, secs_per_repeat=ubench.DEF_SECS_PER_REPEAT):
+    """ Runs the benchmarks of the environment and returns their results """
+    results = {}
+
+    for n_agents in AGENT_COUNTS:
+        env = HungryGeese(n_agents, WARMUP_FOREVER, delta=0)
+        n_actions = env.getNumActions()
+        env.reset()
+
+        def step():
+            _, _, done, _, _ = env.step(np.random.randint(n_actions))
+            if done:
+                env.reset()
+
+        results[f'env.reset[n_agents={n_agents}]'] = ubench.measure(env.reset, 'resets/sec',
+                                                                    repeats, secs_per_repeat)
+        results[f'env.step[n_agents={n_agents}]'] = ubench.measure(step, 'steps/sec',
+                                                                   repeats, secs_per_repeat)
+
+        # The board is updated from the current observation, a mid-game one is more representative
+        for _ in range(10):
+            step()
+        results[f'env._update_board[n_agents={n_agents}]'] = ubench.measure(env._update_board, 'updates/sec',
+                                                                            repeats, secs_per_repeat)
+
+    return results
@@ -0,0 +1,124 @@
+# Checks that the vectorized greedy bots (see environments.kaggle.hungry_geese.greedyBots) play exactly like the
+# Kaggle GreedyAgent, and measures how much faster they decide
+#
+# Run it from the root of the project, for e.g.
+#           python -m benchmarks.greedyParity --episodes 50 --agents 4
+#
+# The positions are those of games of Kaggle's own greedy agents. Every goose still playing is a bot to decide for,
+# with its own index and the last action its goose actually played. All of them are decided by the vectorized bots in
+# a single call (across all the games), and one at a time by Kaggle's GreedyAgent. The bots that have nowhere safe
+# to go move at random, those aren't compared. Exits with a non-zero status if any decision differs
+
+import sys
+import time
+import argparse
+import numpy as np
+import kaggle_environments as kaggle_env
+from kaggle_environments.envs.hungry_geese import hungry_geese
+
+from environments.kaggle.hungry_geese.greedyBots import GreedyBots, NO_ACTION
+
+
+DEF_EPISODES = 20
+DEF_N_AGENTS = 4
+
+_ACTIONS = list(hungry_geese.Action)
+
+
+class _RandomMove(Exception):
+    """ Raised in place of the random move of a Kaggle bot that has nowhere safe to go """
+
+
+def record_positions(n_episodes, n_agents):
+    """ Plays games of the Kaggle greedy agents. Returns (configuration, positions, bots): the (geese, food) of
+        every step, and the (step, index, last action) of every goose still playing on it
+    """
+    env = kaggle_env.make('hungry_geese')
+    positions = []
+    bots = []
+    for _ in range(n_episodes):
+        steps = env.run(['greedy'] * n_agents)
+        last_actions = [NO_ACTION] * n_agents
+
+        # Kaggle only shares the state of the board with the first agent. The last step is the end of the game
+        for step, next_step in zip(steps[:-1], steps[1:]):
+            shared = step[0]['observation']
+            positions.append((shared['geese'], shared['food']))
+            for index, agent_state in enumerate(step):
+                if agent_state['status'] == 'ACTIVE':
+                    bots.append((len(positions) - 1, index, last_actions[index]))
+                    last_actions[index] = _ACTIONS.index(hungry_geese.Action[next_step[index]['action']])
+
+    return env.configuration, positions, bots
+
+
+def kaggle_actions(configuration, positions, bots):
+    """ Returns the action index the Kaggle GreedyAgent picks for every bot, NO_ACTION where it would move at random """
+    def random_move(_):
+        raise _RandomMove()
+
+    actions = np.empty(len(bots), dtype=np.int64)
+    kaggle_choice = hungry_geese.choice
+    hungry_geese.choice = random_move
+    try:
+        for i, (step, index, last_action) in enumerate(bots):
+            geese, food = positions[step]
+            agent = hungry_geese.GreedyAgent(configuration)
+            agent.last_action = _ACTIONS[last_action] if last_action != NO_ACTION else None
+            try:
+                name = agent(hungry_geese.Observation({'geese': geese, 'food': food, 'index': index}))
+                actions[i] = _ACTIONS.index(hungry_geese.Action[name])
+            except _RandomMove:
+                actions[i] = NO_ACTION
+    finally:
+        hungry_geese.choice = kaggle_choice
+
+    return actions
+
+
+def vectorized_actions(configuration, positions, bots):
+    """ Returns the action index the vectorized bots pick for every bot, all of them decided in a single call """
+    greedy_bots = GreedyBots(configuration.rows, configuration.columns)
+    steps, indices, last_actions = (np.asarray(column) for column in zip(*bots))
+    geese, food = zip(*positions)
+    return greedy_bots.act(geese, food, steps, indices, last_actions)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compares the vectorized greedy bots with Kaggle\'s GreedyAgent')
+    parser.add_argument('--episodes', type=int, default=DEF_EPISODES, help='Number of games recorded')
+    parser.add_argument('--agents', type=int, default=DEF_N_AGENTS, help='Number of geese in a game')
+    args = parser.parse_args()
+
+    configuration, positions, bots = record_positions(args.episodes, args.agents)
+
+    start = time.perf_counter()
+    expected = kaggle_actions(configuration, positions, bots)
+    kaggle_secs = time.perf_counter() - start
+
+    start = time.perf_counter()
+    actual = vectorized_actions(configuration, positions, bots)
+    vectorized_secs = time.perf_counter() - start
+
+    compared = expected != NO_ACTION
+    mismatches = np.nonzero(compared & (expected != actual))[0]
+
+    print(f'Decisions: {len(bots)} in {len(positions)} positions ({np.sum(~compared)} random moves not compared)')
+    print(f'Kaggle GreedyAgent: {kaggle_secs * 1e6 / len(bots):8.2f} us/decision')
+    print(f'Vectorized bots:    {vectorized_secs * 1e6 / len(bots):8.2f} us/decision '
+          f'({kaggle_secs / vectorized_secs:.1f}x)')
+
+    for i in mismatches[:10]:
+        step, index, last_action = bots[i]
+        geese, food = positions[step]
+        print(f'MISMATCH: goose {index}, last action {last_action}, geese {geese}, food {food} -- '
+              f'Kaggle {_ACTIONS[expected[i]].name}, vectorized {_ACTIONS[actual[i]].name}')
+
+    if len(mismatches) > 0:
+        print(f'{len(mismatches)} decisions differ')
+        sys.exit(1)
+    print('All the decisions match')
+
+
+if __name__ == '__main__':
+    main()
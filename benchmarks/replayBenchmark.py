@@ -0,0 +1,39 @@
+# This module benchmarks the replay buffer: storing and sampling experiences at several capacities
+
+import numpy as np
+
+import benchmarks.benchmarkUtils as ubench
+from agents.replayBuffer import ReplayBuffer
+from environments.kaggle.hungry_geese.boardSymmetries import BoardSymmetries
+
+
+CAPACITIES = [1_000, 10_000, 50_000]
+BATCH_SIZE = 256
+N_ROWS, N_COLS = 7, 11
+OBSERVATION_LEN = N_ROWS * N_COLS   # The length of a Hungry Geese board
+
+
+def run(repeats=ubench.DEF_REPEATS, secs_per_repeat=ubench.DEF_SECS_PER_REPEAT):
+    """ Runs the benchmarks of the replay buffer and returns their results """
+    results = {}
+    state = np.zeros(OBSERVATION_LEN, dtype=np.float32)
+
+    for capacity in CAPACITIES:
+        buffer = ReplayBuffer(buffer_size=capacity)
+
+        # Filled up, so that storing evicts the oldest experiences (as it does for most of a run)
+        for i in range(capacity):
+            buffer.store(state, i % 4, 1.0, state, False)
+
+        results[f'replay.store[capacity={capacity}]'] = ubench.measure(
+            lambda: buffer.store(state, 0, 1.0, state, False), 'stores/sec', repeats, secs_per_repeat)
+        results[f'replay.sample[capacity={capacity},batch={BATCH_SIZE}]'] = ubench.measure(
+            lambda: buffer.sample(BATCH_SIZE), 'batches/sec', repeats, secs_per_repeat)
+
+    # The batches transformed by the symmetries of the board, on the largest buffer. It includes stacking the states
+    # into arrays, which the agents do anyway when they train on plain batches
+    buffer.set_augmentation(BoardSymmetries(N_ROWS, N_COLS).augment)
+    results[f'replay.sample_augmented[capacity={capacity},batch={BATCH_SIZE}]'] = ubench.measure(
+        lambda: buffer.sample(BATCH_SIZE), 'batches/sec', repeats, secs_per_repeat)
+
+    return results
@@ -0,0 +1,57 @@
+# Runs the benchmarks and saves their results as JSON (along with the machine information)
+#
+# Run it from the root of the project, for e.g.
+#           python -m benchmarks.runBenchmarks --output results.json
+#           python -m benchmarks.runBenchmarks --suites env replay --quick
+
+import time
+import argparse
+
+import benchmarks.benchmarkUtils as ubench
+import benchmarks.envBenchmark as env_bench
+import benchmarks.replayBenchmark as replay_bench
+import benchmarks.agentBenchmark as agent_bench
+import benchmarks.endToEndBenchmark as e2e_bench
+
+
+# The suites of benchmarks, in the order they are run
+SUITES = {
+    'env': env_bench.run,
+    'replay': replay_bench.run,
+    'agents': agent_bench.run,
+    'e2e': e2e_bench.run,
+}
+
+QUICK_REPEATS = 3
+QUICK_SECS_PER_REPEAT = 0.2
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Runs the benchmarks of the lab')
+    parser.add_argument('--output', default=f'benchmark_{time.strftime("%Y%m%d-%H%M%S")}.json',
+                        help='File to save the results into')
+    parser.add_argument('--suites', nargs='+', choices=list(SUITES), default=list(SUITES),
+                        help='Suites of benchmarks to run (all of them by default)')
+    parser.add_argument('--quick', action='store_true',
+                        help='Fewer and shorter measurements -- Noisier, for a quick check only')
+    args = parser.parse_args()
+
+    repeats = QUICK_REPEATS if args.quick else ubench.DEF_REPEATS
+    secs_per_repeat = QUICK_SECS_PER_REPEAT if args.quick else ubench.DEF_SECS_PER_REPEAT
+
+    results = {}
+    for name in args.suites:
+        print(f'Running the {name} benchmarks ...')
+        suite_results = SUITES[name](repeats=repeats, secs_per_repeat=secs_per_repeat)
+
+        for bench_name, result in suite_results.items():
+            print(f'  {bench_name:<55} {result[ubench.KEY_VALUE]:>12.2f} {result[ubench.KEY_UNIT]}'
+                  f' (+/- {result[ubench.KEY_STDEV]:.2f})')
+        results.update(suite_results)
+
+    ubench.save_results(args.output, results)
+    print(f'Results saved to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -40,6 +40,27 @@ KEY_ACTIV_LIST      = 'activations_list'
 KEY_EVAL_INTERVAL   = 'evaluation_interval'
 KEY_EVAL_EPISODES   = 'evaluation_episodes'
 KEY_WORKSPACE       = 'workspace'
+KEY_EVAL_ASYNC      = 'evaluation_async'
+KEY_EVAL_MAX_PENDING = 'evaluation_max_pending'
+KEY_EVAL_CI_WIDTH   = 'evaluation_ci_width'
+KEY_EVAL_COMMON_SEEDS = 'evaluation_common_seeds'
+KEY_CHKPT_KEEP_LAST = 'checkpoint_keep_last'
+KEY_CHKPT_KEEP_BEST = 'checkpoint_keep_best'
+KEY_CHKPT_KEYFRAME_INT = 'checkpoint_keyframe_interval'
+KEY_LOG_WINDOW      = 'logging_window'
+KEY_NUM_CORES       = 'num_cores'
+KEY_CHKPT_ON_CANCEL = 'checkpoint_on_cancel'
+KEY_PROFILE_PHASES  = 'profile_phases'
+KEY_TRACE_TIMELINE  = 'trace_timeline'
+KEY_SAMPLING_SECS   = 'sampling_profiler_secs'
+KEY_MEMORY_INT      = 'memory_tracking_interval'
+KEY_RECORD_TRAJ     = 'record_trajectories'
+KEY_PRETRAIN_DATA   = 'pretrain_data'
+KEY_PRETRAIN_EPOCHS = 'pretrain_epochs'
+KEY_PARALLEL_WARMUP = 'parallel_warmup'
+KEY_ALL_PERSPECTIVES = 'all_perspectives'
+KEY_AUGMENT_SYMMETRIES = 'augment_symmetries'
+KEY_RESUME_DIR      = 'resume_directory'
 
 
 # Default configuration values
@@ -55,6 +76,26 @@ ALGO_DEF_NUM_UNITS      = 32
 ALGO_DEF_ACTIVATION     = 'ReLU'
 ALGO_DEF_EVAL_INTERVAL  = 10
 ALGO_DEF_EVAL_EPISODES  = 50
+ALGO_DEF_EVAL_ASYNC     = True
+ALGO_DEF_EVAL_MAX_PENDING = 2
+ALGO_DEF_EVAL_CI_WIDTH  = 0.2     # Width of the win rate's confidence interval to stop a showdown at (0 disables)
+ALGO_DEF_EVAL_COMMON_SEEDS = True  # Play every showdown on the same bank of seeded episodes
+ALGO_DEF_CHKPT_KEEP_LAST = 5      # Number of most recent checkpoints kept on disk (0 keeps all of them)
+ALGO_DEF_CHKPT_KEEP_BEST = 3      # Number of checkpoints with the best showdowns kept on top of those
+ALGO_DEF_CHKPT_KEYFRAME_INT = 10  # Save a full checkpoint every N saves, compressed deltas in between (1 disables)
+ALGO_DEF_LOG_WINDOW     = 10      # Number of episodes summarized per point in tensorboard (1 logs every episode)
+ALGO_DEF_NUM_CORES      = 2       # Number of cores a queued run gets from the core budget of the run manager
+ALGO_DEF_CHKPT_ON_CANCEL = True   # Save a final checkpoint (and the state to resume from) when cancelled
+ALGO_DEF_PROFILE_PHASES = False   # Time the phases of the training loop and report where the time goes
+ALGO_DEF_TRACE_TIMELINE = False   # Record the phases of every thread as a Chrome trace in the logs directory
+ALGO_DEF_SAMPLING_SECS  = 10      # Number of seconds the stacks are sampled for, once the profiler is started
+ALGO_DEF_MEMORY_INT     = 0       # Sample the memory (RSS and top allocation sites) every N episodes (0 disables)
+ALGO_DEF_RECORD_TRAJ    = False   # Record the transitions played in training into the directory of the run
+ALGO_DEF_PRETRAIN_DATA  = []      # Recorded trajectories and Kaggle episode files to pretrain on, before self-play
+ALGO_DEF_PRETRAIN_EPOCHS = 1      # Number of passes over the pretraining data
+ALGO_DEF_PARALLEL_WARMUP = True   # Play the warmup episodes up front on all the cores (agents with a replay buffer)
+ALGO_DEF_ALL_PERSPECTIVES = False  # After the warmup, play all the geese from the network and learn from all of them
+ALGO_DEF_AUGMENT_SYMMETRIES = False  # Transform the sampled experience by random symmetries of the board
 
 
 def get_agent(agent_name):
@@ -82,6 +123,27 @@ class AlgoConfig:
         self.numAgents = None
         self.evalInterval = None
         self.evalEpisodes = None
+        self.evalAsync = None
+        self.evalMaxPending = None
+        self.evalCIWidth = None
+        self.evalCommonSeeds = None
+        self.chkptKeepLast = None
+        self.chkptKeepBest = None
+        self.chkptKeyframeInterval = None
+        self.logWindow = None
+        self.numCores = None
+        self.chkptOnCancel = None
+        self.profilePhases = None
+        self.traceTimeline = None
+        self.samplingSecs = None
+        self.memoryInterval = None
+        self.recordTrajectories = None
+        self.pretrainData = None
+        self.pretrainEpochs = None
+        self.parallelWarmup = None
+        self.allPerspectives = None
+        self.augmentSymmetries = None
+        self.resumeDir = None
 
     # *****************************************
     # Setter methods for the instance variables
@@ -123,9 +185,69 @@ class AlgoConfig:
     def setEvaluationEpisodes(self, episodes):
         self.evalEpisodes = episodes
 
+    def setEvaluationAsync(self, evalAsync):
+        self.evalAsync = evalAsync
+
+    def setEvaluationMaxPending(self, maxPending):
+        self.evalMaxPending = maxPending
+
+    def setEvaluationCIWidth(self, width):
+        self.evalCIWidth = width
+
+    def setEvaluationCommonSeeds(self, commonSeeds):
+        self.evalCommonSeeds = commonSeeds
+
     def setUpdateInterval(self, uInterval):
         self.uInterval = uInterval
 
+    def setCheckpointKeepLast(self, n):
+        self.chkptKeepLast = n
+
+    def setCheckpointKeepBest(self, n):
+        self.chkptKeepBest = n
+
+    def setCheckpointKeyframeInterval(self, interval):
+        self.chkptKeyframeInterval = interval
+
+    def setLoggingWindow(self, window):
+        self.logWindow = window
+
+    def setNumCores(self, n):
+        self.numCores = n
+
+    def setCheckpointOnCancel(self, chkptOnCancel):
+        self.chkptOnCancel = chkptOnCancel
+
+    def setProfilePhases(self, profilePhases):
+        self.profilePhases = profilePhases
+
+    def setTraceTimeline(self, traceTimeline):
+        self.traceTimeline = traceTimeline
+
+    def setSamplingSeconds(self, secs):
+        self.samplingSecs = secs
+
+    def setMemoryTrackingInterval(self, interval):
+        self.memoryInterval = interval
+
+    def setRecordTrajectories(self, recordTrajectories):
+        self.recordTrajectories = recordTrajectories
+
+    def setPretrainData(self, paths):
+        self.pretrainData = paths
+
+    def setPretrainEpochs(self, epochs):
+        self.pretrainEpochs = epochs
+
+    def setParallelWarmup(self, parallelWarmup):
+        self.parallelWarmup = parallelWarmup
+
+    def setAllPerspectives(self, allPerspectives):
+        self.allPerspectives = allPerspectives
+
+    def setAugmentSymmetries(self, augmentSymmetries):
+        self.augmentSymmetries = augmentSymmetries
+
     def setLayerList(self, units, activations):
         if units is None and activations is None:
             self.layerList = None
@@ -136,6 +258,9 @@ class AlgoConfig:
     def setWorkspace(self, workspace):
         self.workspace = workspace
 
+    def setResumeDirectory(self, resumeDir):
+        self.resumeDir = resumeDir
+
 
     # *****************************************
     # Getter methods for the instance variables
@@ -177,9 +302,69 @@ class AlgoConfig:
     def getEvaluationEpisodes(self):
         return self.evalEpisodes
 
+    def getEvaluationAsync(self):
+        return self.evalAsync
+
+    def getEvaluationMaxPending(self):
+        return self.evalMaxPending
+
+    def getEvaluationCIWidth(self):
+        return self.evalCIWidth
+
+    def getEvaluationCommonSeeds(self):
+        return self.evalCommonSeeds
+
     def getUpdateInterval(self):
         return self.uInterval
 
+    def getCheckpointKeepLast(self):
+        return self.chkptKeepLast
+
+    def getCheckpointKeepBest(self):
+        return self.chkptKeepBest
+
+    def getCheckpointKeyframeInterval(self):
+        return self.chkptKeyframeInterval
+
+    def getLoggingWindow(self):
+        return self.logWindow
+
+    def getNumCores(self):
+        return self.numCores
+
+    def getCheckpointOnCancel(self):
+        return self.chkptOnCancel
+
+    def getProfilePhases(self):
+        return self.profilePhases
+
+    def getTraceTimeline(self):
+        return self.traceTimeline
+
+    def getSamplingSeconds(self):
+        return self.samplingSecs
+
+    def getMemoryTrackingInterval(self):
+        return self.memoryInterval
+
+    def getRecordTrajectories(self):
+        return self.recordTrajectories
+
+    def getPretrainData(self):
+        return self.pretrainData
+
+    def getPretrainEpochs(self):
+        return self.pretrainEpochs
+
+    def getParallelWarmup(self):
+        return self.parallelWarmup
+
+    def getAllPerspectives(self):
+        return self.allPerspectives
+
+    def getAugmentSymmetries(self):
+        return self.augmentSymmetries
+
     def getLayerList(self):
         unitsList = None
         actvsList = None
@@ -194,6 +379,9 @@ class AlgoConfig:
     def getWorkspace(self):
         return self.workspace
 
+    def getResumeDirectory(self):
+        return self.resumeDir
+
 
     def getConfigData(self):
         """ Packing method that packs all the data obtained so far as a dictionary and returns it """
@@ -210,9 +398,30 @@ class AlgoConfig:
             KEY_SELF_PLAY_EP:    self.getSelfPlayUpdateEpisodes(),
             KEY_SELF_PLAY_DELTA: self.getSelfPlayDelta(),
             KEY_CHKPT_INT:       self.getUpdateInterval(),
+            KEY_CHKPT_KEEP_LAST: self.getCheckpointKeepLast(),
+            KEY_CHKPT_KEEP_BEST: self.getCheckpointKeepBest(),
+            KEY_CHKPT_KEYFRAME_INT: self.getCheckpointKeyframeInterval(),
+            KEY_CHKPT_ON_CANCEL: self.getCheckpointOnCancel(),
             KEY_EVAL_EPISODES:   self.getEvaluationEpisodes(),
             KEY_EVAL_INTERVAL:   self.getEvaluationInterval(),
+            KEY_EVAL_ASYNC:      self.getEvaluationAsync(),
+            KEY_EVAL_MAX_PENDING: self.getEvaluationMaxPending(),
+            KEY_EVAL_CI_WIDTH:   self.getEvaluationCIWidth(),
+            KEY_EVAL_COMMON_SEEDS: self.getEvaluationCommonSeeds(),
+            KEY_LOG_WINDOW:      self.getLoggingWindow(),
+            KEY_NUM_CORES:       self.getNumCores(),
+            KEY_PROFILE_PHASES:  self.getProfilePhases(),
+            KEY_TRACE_TIMELINE:  self.getTraceTimeline(),
+            KEY_SAMPLING_SECS:   self.getSamplingSeconds(),
+            KEY_MEMORY_INT:      self.getMemoryTrackingInterval(),
+            KEY_RECORD_TRAJ:     self.getRecordTrajectories(),
+            KEY_PRETRAIN_DATA:   self.getPretrainData(),
+            KEY_PRETRAIN_EPOCHS: self.getPretrainEpochs(),
+            KEY_PARALLEL_WARMUP: self.getParallelWarmup(),
+            KEY_ALL_PERSPECTIVES: self.getAllPerspectives(),
+            KEY_AUGMENT_SYMMETRIES: self.getAugmentSymmetries(),
             KEY_WORKSPACE:       self.getWorkspace(),
+            KEY_RESUME_DIR:      self.getResumeDirectory(),
             KEY_UNITS_LIST:      unitsList,
             KEY_ACTIV_LIST:      actvsList
         }
@@ -240,6 +449,54 @@ class AlgoConfig:
         if configData[KEY_CHKPT_INT] is None:
             configData[KEY_CHKPT_INT] = ALGO_DEF_CHKPT_INT
 
+        if configData[KEY_CHKPT_KEEP_LAST] is None:
+            configData[KEY_CHKPT_KEEP_LAST] = ALGO_DEF_CHKPT_KEEP_LAST
+
+        if configData[KEY_CHKPT_KEEP_BEST] is None:
+            configData[KEY_CHKPT_KEEP_BEST] = ALGO_DEF_CHKPT_KEEP_BEST
+
+        if configData[KEY_CHKPT_KEYFRAME_INT] is None:
+            configData[KEY_CHKPT_KEYFRAME_INT] = ALGO_DEF_CHKPT_KEYFRAME_INT
+
+        if configData[KEY_LOG_WINDOW] is None:
+            configData[KEY_LOG_WINDOW] = ALGO_DEF_LOG_WINDOW
+
+        if configData[KEY_NUM_CORES] is None:
+            configData[KEY_NUM_CORES] = ALGO_DEF_NUM_CORES
+
+        if configData[KEY_CHKPT_ON_CANCEL] is None:
+            configData[KEY_CHKPT_ON_CANCEL] = ALGO_DEF_CHKPT_ON_CANCEL
+
+        if configData[KEY_PROFILE_PHASES] is None:
+            configData[KEY_PROFILE_PHASES] = ALGO_DEF_PROFILE_PHASES
+
+        if configData[KEY_TRACE_TIMELINE] is None:
+            configData[KEY_TRACE_TIMELINE] = ALGO_DEF_TRACE_TIMELINE
+
+        if configData[KEY_SAMPLING_SECS] is None:
+            configData[KEY_SAMPLING_SECS] = ALGO_DEF_SAMPLING_SECS
+
+        if configData[KEY_MEMORY_INT] is None:
+            configData[KEY_MEMORY_INT] = ALGO_DEF_MEMORY_INT
+
+        if configData[KEY_RECORD_TRAJ] is None:
+            configData[KEY_RECORD_TRAJ] = ALGO_DEF_RECORD_TRAJ
+
+        if configData[KEY_PRETRAIN_DATA] is None:
+            configData[KEY_PRETRAIN_DATA] = list(ALGO_DEF_PRETRAIN_DATA)
+
+        if configData[KEY_PRETRAIN_EPOCHS] is None:
+            configData[KEY_PRETRAIN_EPOCHS] = ALGO_DEF_PRETRAIN_EPOCHS
+
+        if configData[KEY_PARALLEL_WARMUP] is None:
+            configData[KEY_PARALLEL_WARMUP] = ALGO_DEF_PARALLEL_WARMUP
+
+        if configData[KEY_ALL_PERSPECTIVES] is None:
+            configData[KEY_ALL_PERSPECTIVES] = ALGO_DEF_ALL_PERSPECTIVES
+
+        if configData[KEY_AUGMENT_SYMMETRIES] is None:
+            configData[KEY_AUGMENT_SYMMETRIES] = ALGO_DEF_AUGMENT_SYMMETRIES
+
         if configData[KEY_SELF_PLAY_EP] is None:
             configData[KEY_SELF_PLAY_EP] = ALGO_DEF_SPLAY_EPISODES
 
@@ -252,6 +509,18 @@ class AlgoConfig:
         if configData[KEY_EVAL_EPISODES] is None:
             configData[KEY_EVAL_EPISODES] = ALGO_DEF_EVAL_EPISODES
 
+        if configData[KEY_EVAL_ASYNC] is None:
+            configData[KEY_EVAL_ASYNC] = ALGO_DEF_EVAL_ASYNC
+
+        if configData[KEY_EVAL_MAX_PENDING] is None:
+            configData[KEY_EVAL_MAX_PENDING] = ALGO_DEF_EVAL_MAX_PENDING
+
+        if configData[KEY_EVAL_CI_WIDTH] is None:
+            configData[KEY_EVAL_CI_WIDTH] = ALGO_DEF_EVAL_CI_WIDTH
+
+        if configData[KEY_EVAL_COMMON_SEEDS] is None:
+            configData[KEY_EVAL_COMMON_SEEDS] = ALGO_DEF_EVAL_COMMON_SEEDS
+
         if configData[KEY_WORKSPACE] is None:
             configData[KEY_WORKSPACE] = os.path.abspath(os.curdir)
 
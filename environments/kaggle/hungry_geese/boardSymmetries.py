@@ -0,0 +1,78 @@
+# This module contains the symmetries of the Hungry Geese board, to augment the experience sampled for training
+#
+# The board is a torus, so shifting it along the rows and the columns (wrapping around) changes nothing to the game,
+# and neither does flipping it upside down or left to right, as long as the actions are flipped along: NORTH and
+# SOUTH swap places with the rows, EAST and WEST with the columns. Every combination of a flip and a shift is a
+# transform, and each of them is precomputed as the cell every cell of the transformed board comes from
+
+import numpy as np
+from kaggle_environments.envs.hungry_geese import hungry_geese
+
+
+_ACTIONS = list(hungry_geese.Action)        # NORTH, EAST, SOUTH, WEST -- The order of the actions of the agents
+
+
+class BoardSymmetries:
+    """ The transforms (flips and wrap-around shifts) of a board that leave the game unchanged """
+
+    def __init__(self, rows, columns):
+        cells_rows, cells_cols = np.divmod(np.arange(rows * columns), columns)
+        vertical = (hungry_geese.Action.NORTH, hungry_geese.Action.SOUTH)
+        flip_rows = np.array([_ACTIONS.index(a.opposite() if a in vertical else a) for a in _ACTIONS])
+        flip_cols = np.array([_ACTIONS.index(a if a in vertical else a.opposite()) for a in _ACTIONS])
+
+        # sources[t, cell] is the cell of the board that ends up at cell under the transform t. The transform
+        # flips the board first, then shifts it. actions[t, a] is what the action a becomes under it
+        sources = []
+        actions = []
+        for flipped_rows in (False, True):
+            for flipped_cols in (False, True):
+                rows_moved = rows - 1 - cells_rows if flipped_rows else cells_rows
+                cols_moved = columns - 1 - cells_cols if flipped_cols else cells_cols
+
+                transform_actions = np.arange(len(_ACTIONS))
+                if flipped_rows:
+                    transform_actions = flip_rows[transform_actions]
+                if flipped_cols:
+                    transform_actions = flip_cols[transform_actions]
+
+                for row_shift in range(rows):
+                    for col_shift in range(columns):
+                        destinations = ((rows_moved + row_shift) % rows * columns +
+                                        (cols_moved + col_shift) % columns)
+                        sources.append(np.argsort(destinations))
+                        actions.append(transform_actions)
+
+        self.sources = np.array(sources)        # (n_transforms, n_cells)
+        self.actions = np.array(actions)        # (n_transforms, n_actions)
+
+    def get_num_transforms(self):
+        """ Returns the number of transforms, the identity included """
+        return len(self.sources)
+
+    def transform(self, boards, actions, transforms):
+        """ Returns (boards, actions) transformed, each row by its own transform
+        boards:     (batch, n_cells) The boards, e.g. as encoded by the environment
+        actions:    (batch, ) The indices of the actions
+        transforms: (batch, ) The index of the transform of every row
+        """
+        boards = np.asarray(boards)
+        return boards.ravel()[self._flat_sources(transforms)], self.actions[transforms, np.asarray(actions)]
+
+    def augment(self, states, actions, next_states):
+        """ Returns (states, actions, next_states) of a batch of transitions, each of them transformed by a random
+            transform (the same one for its state, action and next state)
+        """
+        transforms = np.random.randint(self.get_num_transforms(), size=len(actions))
+        flat_sources = self._flat_sources(transforms)
+
+        return (np.asarray(states).ravel()[flat_sources],
+                self.actions[transforms, np.asarray(actions)],
+                np.asarray(next_states).ravel()[flat_sources])
+
+    def _flat_sources(self, transforms):
+        """ Returns the sources of the cells of every row, as indices into the whole (flattened) batch. Indexing
+            the flat batch at once is several times faster than gathering along its rows
+        """
+        n_cells = self.sources.shape[1]
+        return self.sources[transforms] + np.arange(0, len(transforms) * n_cells, n_cells)[:, None]
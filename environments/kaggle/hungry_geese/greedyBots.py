@@ -0,0 +1,88 @@
+# This module contains a vectorized version of Kaggle's GreedyAgent, to play all the greedy bots at once
+#
+# The heuristic is the same: the goose moves to the closest food, avoiding the cells next to the heads of the other
+# geese, the bodies of all of them and turning back. Every cell's neighbours and the distances between cells are
+# looked up in tables built once for the board, so the decisions of the bots of many games are made in one go
+
+import random
+import numpy as np
+from kaggle_environments.envs.hungry_geese import hungry_geese
+
+
+NO_ACTION = -1                  # Last action of a bot that hasn't moved yet
+
+_ACTIONS = list(hungry_geese.Action)                                        # NORTH, EAST, SOUTH, WEST
+_OPPOSITES = np.array([_ACTIONS.index(a.opposite()) for a in _ACTIONS])     # Action index -> its opposite's
+_BLOCKED = np.iinfo(np.int32).max                                           # Distance of the moves not allowed
+
+
+class GreedyBots:
+    """ Actions of any number of GreedyAgent bots, in any number of games. Unlike the Kaggle bots, they don't keep
+        their last action: the caller does, as an action index (see act())
+    """
+
+    def __init__(self, rows, columns):
+        n_cells = rows * columns
+        cells_rows, cells_cols = np.divmod(np.arange(n_cells), columns)
+
+        # neighbours[cell, a] is the cell reached by moving from cell with the action a (the board wraps around)
+        self.neighbours = np.empty((n_cells, len(_ACTIONS)), dtype=np.int64)
+        for a, action in enumerate(_ACTIONS):
+            row_offset, col_offset = action.to_row_col()
+            self.neighbours[:, a] = (cells_rows + row_offset) % rows * columns + (cells_cols + col_offset) % columns
+
+        # distances[cell, other] is the distance the bots measure to food. Like Kaggle's min_distance(), it doesn't
+        # take the shortcuts across the edges of the board, so this doesn't either -- The bots must play alike
+        self.distances = (np.abs(cells_rows[:, None] - cells_rows[None, :]) +
+                          np.abs(cells_cols[:, None] - cells_cols[None, :])).astype(np.int32)
+
+        self.n_cells = n_cells
+        self.no_food = rows + columns           # Beyond any distance, when there is no food on the board
+
+    def act(self, geese, food, games, indices, last_actions, rng=random):
+        """ Returns the index of the action of every bot
+        geese:        For every game, the positions of its geese (as in Kaggle's observation)
+        food:         For every game, the positions of its food
+        games:        (n_bots, ) The game of every bot
+        indices:      (n_bots, ) The goose of every bot, in its game. Its goose must be alive
+        last_actions: (n_bots, ) The index of the last action of every bot, NO_ACTION if it hasn't moved yet
+        rng:          Source of the random moves of the bots that have nowhere to go (like Kaggle's, it must have
+                      a choice() method)
+        """
+        games = np.asarray(games, dtype=np.int64)
+        indices = np.asarray(indices, dtype=np.int64)
+        last_actions = np.asarray(last_actions, dtype=np.int64)
+
+        n_games = len(geese)
+        n_geese = max(len(game_geese) for game_geese in geese)
+        heads = np.full((n_games, n_geese), -1, dtype=np.int64)
+        occupied = np.zeros((n_games, self.n_cells), dtype=bool)
+        has_food = np.zeros((n_games, self.n_cells), dtype=bool)
+        for g, (game_geese, game_food) in enumerate(zip(geese, food)):
+            for k, goose in enumerate(game_geese):
+                if goose:
+                    heads[g, k] = goose[0]
+                    occupied[g, goose] = True
+            has_food[g, game_food] = True
+
+        # Number of heads next to every cell. A bot's own head is next to all the cells it can move to
+        alive_games, alive_geese = np.nonzero(heads >= 0)
+        heads_nearby = np.zeros((n_games, self.n_cells), dtype=np.int64)
+        np.add.at(heads_nearby,
+                  (np.repeat(alive_games, len(_ACTIONS)), self.neighbours[heads[alive_games, alive_geese]].ravel()),
+                  1)
+
+        moves = self.neighbours[heads[games, indices]]                      # (n_bots, n_actions)
+        blocked = occupied[games[:, None], moves] | (heads_nearby[games[:, None], moves] > 1)
+        moved = last_actions != NO_ACTION
+        blocked[np.nonzero(moved)[0], _OPPOSITES[last_actions[moved]]] = True
+
+        distances = np.where(has_food[games][:, None, :], self.distances[moves], self.no_food).min(axis=2)
+        distances[blocked] = _BLOCKED
+        actions = np.argmin(distances, axis=1)          # Ties go to the first action, as with Kaggle's bots
+
+        # The bots that can't move anywhere safe move at random
+        for i in np.nonzero(blocked.all(axis=1))[0]:
+            actions[i] = rng.choice(range(len(_ACTIONS)))
+
+        return actions
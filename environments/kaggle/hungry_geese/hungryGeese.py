@@ -1,11 +1,41 @@
 # This module contains the class for "Hungry-Geese" Kaggle competition
 
+import random
+import threading
 import numpy as np
 import kaggle_environments as kaggle_env
 from kaggle_environments.envs.hungry_geese import hungry_geese
 
 # Custom module for supporting self-play
 from environments.selfplay import SelfPlay
+from environments.kaggle.hungry_geese.greedyBots import GreedyBots, NO_ACTION
+from environments.kaggle.hungry_geese.boardSymmetries import BoardSymmetries
+import utils.profiler as uprof
+
+
+class _SeededRandom(threading.local):
+    """ Source of randomness of the Kaggle interpreter (starting positions, food spawns) and the greedy bots.
+        Draws from the generator of the current thread when a seeded episode is being played, otherwise
+        from the global one. Per-thread, so seeded showdowns don't disturb training on other threads
+    """
+
+    generator = None
+
+    def seed(self, seed):
+        """ Seeds the generator of the current thread. None falls back to the global generator """
+        self.generator = random.Random(seed) if seed is not None else None
+
+    def sample(self, population, k):
+        return (self.generator or random).sample(population, k)
+
+    def choice(self, seq):
+        return (self.generator or random).choice(seq)
+
+
+# The interpreter and the bots use the module level 'sample' and 'choice', route them through the seeded source
+_SEEDED_RANDOM = _SeededRandom()
+hungry_geese.sample = _SEEDED_RANDOM.sample
+hungry_geese.choice = _SEEDED_RANDOM.choice
 
 
 class HungryGeese(SelfPlay):
@@ -31,15 +61,16 @@ class HungryGeese(SelfPlay):
         self.nCols = self.env.configuration['columns']      # Number of columns on the board
         self.we_won = False                                 # Did we total_wins the game
 
-        # The warmup bot -- Intially the model is trained against these bots
-        # The idea is, we want our agent to get a good start
-        self.warmupBots = [hungry_geese.GreedyAgent(self.env.configuration) if i != self.getOurAgentIndex()
-                           else None for i in range(n_agents)]
+        # The warmup bots -- Intially the model is trained against these bots (Kaggle's GreedyAgent)
+        # The idea is, we want our agent to get a good start. They all act at once, remembering their last actions
+        self.warmupBots = GreedyBots(self.nRows, self.nCols)
+        self.warmupBotsLastActions = np.full(n_agents, NO_ACTION)
 
         # There are 4 actions: NORTH, EAST, SOUTH, WEST
         # And they all are strings. Stepping through the environment needs the actions to be
         # strings. So there is a need to build a mapping between integers and the string
         self.actions = {i: a.name for i, a in enumerate(hungry_geese.Action)}
+        self.action_indices = {name: i for i, name in self.actions.items()}
 
         # The current state of the board. Contains one vector for each agent
         self.board = np.zeros(shape=(n_agents, self.nRows*self.nCols), dtype=np.float32)
@@ -50,12 +81,18 @@ class HungryGeese(SelfPlay):
 
     def reset(self):
         """ Responsible for resetting the environment """
+        _SEEDED_RANDOM.seed(self.popNextSeed())             # Reproduce the episode if it has been seeded
+        self._reset_warmup_bots()                           # Like on Kaggle, the bots start every episode afresh
+
         obs = self.env.reset(self.getNumAgents())
+        self.updateLastActions(None)
         self.updateCurrentObservation(obs)                  # Update the most recent observation
-        self._update_board()                                # Update the state of the board with current observation
+        with uprof.phase(uprof.PHASE_UPDATE_BOARD):
+            self._update_board()                            # Update the state of the board with current observation
 
-        # Return the status of the board of each of the agents
-        return self.board[self.getOurAgentIndex()]
+        # Return the status of the board of our agent. It's a copy, as the board is updated in-place
+        # while the agents keep the states around (e.g. in their replay buffers)
+        return self.board[self.getOurAgentIndex()].copy()
 
     def step(self, action):
         """ Responsible for stepping through the environment
@@ -76,8 +113,10 @@ class HungryGeese(SelfPlay):
         actions_list[our_index] = self.actions[action]
 
         obs = self.env.step(actions_list)
+        self.updateLastActions([self.action_indices.get(a) for a in actions_list])
         self.updateCurrentObservation(obs)
-        self._update_board()
+        with uprof.phase(uprof.PHASE_UPDATE_BOARD):
+            self._update_board()
 
         game_over = self.env.done
         we_lost = self._our_goose_died()
@@ -89,13 +128,50 @@ class HungryGeese(SelfPlay):
         done = we_lost or game_over
         info = self.getInfo(our_index)
         reward = self.getReward(our_index)
-        reward = self._tweak_reward(reward)
+        reward = self.tweak_reward(reward)
 
         if done:
             self.we_won = not we_lost
             self.updateWarmupCounter()
 
-        return self.board[our_index], reward, done, self.we_won, info
+        return self.board[our_index].copy(), reward, done, self.we_won, info
+
+    def getSymmetries(self):
+        """ Returns the flips and the wrap-around shifts of the board """
+        return BoardSymmetries(self.nRows, self.nCols)
+
+    def supportsAllPerspectives(self):
+        """ Returns True -- The board is encoded from the perspective of every goose anyway """
+        return True
+
+    def resetAll(self):
+        """ Resets the environment and returns the boards of all the geese, one row per goose """
+        self.reset()
+        return self.board.copy()
+
+    def stepAll(self, actions):
+        """ Steps through the environment with the actions (indices) of all the geese, None for those that are done.
+            Returns (next_states, rewards, dones, won, info): the boards of all the geese, their rewards and whether
+            each of them is out of the game (all of them once it's over). won and info are those of our goose
+        """
+        our_index = self.getOurAgentIndex()
+        actions_list = [self.actions[a] if a is not None else None for a in actions]
+
+        obs = self.env.step(actions_list)
+        self.updateLastActions([self.action_indices.get(a) for a in actions_list])
+        self.updateCurrentObservation(obs)
+        with uprof.phase(uprof.PHASE_UPDATE_BOARD):
+            self._update_board()
+
+        game_over = self.env.done
+        dones = [game_over or self.isAgentDone(i) for i in range(self.getNumAgents())]
+        rewards = [self.tweak_reward(self.getReward(i)) for i in range(self.getNumAgents())]
+
+        if game_over:
+            self.we_won = not self._our_goose_died()
+            self.updateWarmupCounter()
+
+        return self.board.copy(), rewards, dones, self.we_won, self.getInfo(our_index)
 
 
     # *****************************************
@@ -107,32 +183,40 @@ class HungryGeese(SelfPlay):
         agents = self._get_agent_positions()                # A 2D list containing position of the geese
         food = self._get_food_positions()                   # A 1D list containing position of the food
 
-        for i, pos in enumerate(agents):
-            self.board[i, :] = 0                            # First reset the status of the board entirely
-            dead = (pos == [])                              # When the goose dies, the position is an empty list
+        for i in range(len(agents)):
+            self.encode_board(self.board[i], agents, food, i)
+
+    @classmethod
+    def encode_board(cls, board, geese, food, index):
+        """ Encodes the board as seen by the goose at index into board (a vector of rows*cols cells, overwritten).
+            geese and food are the positions in Kaggle's observation. Offline data goes through it too
+        """
+        board[:] = 0                                        # First reset the status of the board entirely
+        pos = geese[index]
+        dead = (pos == [])                                  # When the goose dies, the position is an empty list
 
-            if not dead:                                    # If the goose is not dead, update the positions
-                self.board[i, pos[0]] = self.OUR_GEESE_HEAD_MARKER
-                if len(pos) > 1:
-                    self.board[i, pos[1:-1]] = self.OUR_GEESE_BODY_MARKER
-                    self.board[i, pos[-1]] = self.OUR_GEESE_TAIL_MARKER
+        if not dead:                                        # If the goose is not dead, update the positions
+            board[pos[0]] = cls.OUR_GEESE_HEAD_MARKER
+            if len(pos) > 1:
+                board[pos[1:-1]] = cls.OUR_GEESE_BODY_MARKER
+                board[pos[-1]] = cls.OUR_GEESE_TAIL_MARKER
 
-            self.board[i, food] = self.FOOD_MARKER          # Now mark the position of food on the grid
+        board[food] = cls.FOOD_MARKER                       # Now mark the position of food on the grid
 
-            # Now marks the opponents in this goose's grid in a similar way
-            for j, opp_pos in enumerate(agents):
-                if i == j:
-                    continue
+        # Now marks the opponents in this goose's grid in a similar way
+        for j, opp_pos in enumerate(geese):
+            if j == index:
+                continue
 
-                opp_dead = (opp_pos == [])
-                if opp_dead:
-                    continue
+            opp_dead = (opp_pos == [])
+            if opp_dead:
+                continue
 
-                # Opponent is alive and kicking. Need to update its position on the grid
-                self.board[i, opp_pos[0]] = self.OPPONENT_GEESE_HEAD_MARKER
-                if len(opp_pos) > 1:
-                    self.board[i, opp_pos[1:-1]] = self.OPPONENT_GEESE_BODY_MARKER
-                    self.board[i, opp_pos[-1]] = self.OPPONENT_GEESE_TAIL_MARKER
+            # Opponent is alive and kicking. Need to update its position on the grid
+            board[opp_pos[0]] = cls.OPPONENT_GEESE_HEAD_MARKER
+            if len(opp_pos) > 1:
+                board[opp_pos[1:-1]] = cls.OPPONENT_GEESE_BODY_MARKER
+                board[opp_pos[-1]] = cls.OPPONENT_GEESE_TAIL_MARKER
 
         # All done -- Return
 
@@ -147,7 +231,8 @@ class HungryGeese(SelfPlay):
         obs = self.getObservation()
         return obs['food']
 
-    def _tweak_reward(self, reward):
+    @staticmethod
+    def tweak_reward(reward):
         """ Tweaks the reward accordingly -- Depending on the tweak, the agent will perform better/worse """
         reward = int(np.log10(reward + 1))  # Convert to log-scale because the rewards get extremely large
         return reward
@@ -155,13 +240,27 @@ class HungryGeese(SelfPlay):
     def _getWarmupBotsActions(self):
         """ Get the actions from the warmup bots """
         obs = self.getObservation()
-        obs = hungry_geese.Observation(obs)
-
-        actions = [bot(obs) if bot is not None else None for bot in self.warmupBots]
+        our_index = self.getOurAgentIndex()
+        bots = [i for i, goose in enumerate(obs['geese']) if i != our_index and goose]     # The ones still alive
+
+        actions = [None] * self.getNumAgents()
+        if bots:
+            bots_actions = self.warmupBots.act([obs['geese']], [obs['food']],
+                                               games=np.zeros(len(bots), dtype=np.int64),
+                                               indices=bots,
+                                               last_actions=self.warmupBotsLastActions[bots],
+                                               rng=_SEEDED_RANDOM)
+            self.warmupBotsLastActions[bots] = bots_actions
+            for i, a in zip(bots, bots_actions):
+                actions[i] = self.actions[a]
 
         # NOTE: The actions are already decoded, i.e. they are string names !
         return actions
 
+    def _reset_warmup_bots(self):
+        """ Clears the memory (last action taken) of the warmup bots """
+        self.warmupBotsLastActions[:] = NO_ACTION
+
     def _our_goose_died(self):
         """ Checks the length of our goose. If it's an empty list, it means our goose is dead """
         died = True
@@ -3,6 +3,9 @@
 import copy
 import numpy as np
 
+# Custom module imports
+import utils.profiler as uprof
+
 
 class SelfPlay:
     """ Base environment for self-play """
@@ -21,6 +24,8 @@ class SelfPlay:
         self.n_obs = None                                   # Number of components in the observation vector
         self.n_actions = None                               # Number of valid actions
         self.n_warmup = n_warmup                            # Number of warmup episodes
+        self.next_seed = None                               # Seed of the next episode (None for fresh randomness)
+        self.last_actions = None                            # Actions of all the agents on the latest step
 
         self._set_warmup_counter()
 
@@ -42,6 +47,19 @@ class SelfPlay:
                 self.clones[i] = copy.deepcopy(agent)
 
 
+    def getState(self):
+        """ Returns the state of the self-play (the weights of the clones and the warmup progress) to resume from """
+        clones = [clone.get_network().state_dict() if clone is not None else None for clone in self.clones]
+        return {'clones': clones, 'warmed_up': self.episodes_warmed_up_}
+
+    def setState(self, state):
+        """ Restores the self-play from a state returned by getState(). The clones must have been set already """
+        for clone, state_dict in zip(self.clones, state['clones']):
+            if clone is not None and state_dict is not None:
+                clone.get_network().load_state_dict(state_dict)
+
+        self.episodes_warmed_up_ = state['warmed_up']
+
     # *****************************************
     # Methods that the kaggle environment
     # needs to override
@@ -54,8 +72,27 @@ class SelfPlay:
             (next_state, reward, done, info)
         """
         raise NotImplementedError
+
+    # Only for the environments that support playing all the agents at once (see supportsAllPerspectives())
+    def resetAll(self):
+        """ Resets the environment and returns the starting states of all the agents """
+        raise NotImplementedError
+
+    def stepAll(self, actions):
+        """ Takes the actions of all the agents (None for those that don't act) and returns
+            (next_states, rewards, dones, won, info), with one entry per agent in the first three
+        """
+        raise NotImplementedError
     # *****************************************
 
+    def getSymmetries(self):
+        """ Returns the symmetries of the game, to augment the experience with (None if it has none to offer) """
+        return None
+
+    def supportsAllPerspectives(self):
+        """ Returns whether all the agents can be played at once, through resetAll() and stepAll() """
+        return False
+
     def getActionsList(self, action, obs):
         """ Takes an action (so does the opponents) and returns
             (next_state, reward, done, info)
@@ -84,7 +121,8 @@ class SelfPlay:
 
         # Now predict the action. Note that agentObs is a vector of shape (n_observations, )
         # clone_agent is an instance of a child of "Agent" class
-        action = clone_agent.predict_action(agentObs)
+        with uprof.phase(uprof.PHASE_CLONE_PREDICT):
+            action = clone_agent.predict_action(agentObs)
         return action
 
     def _set_warmup_counter(self):
@@ -96,10 +134,30 @@ class SelfPlay:
         if self.episodes_warmed_up_ < self.n_warmup:
             self.episodes_warmed_up_ += 1
 
+    def completeWarmup(self):
+        """ Marks the warmup as complete, e.g. once its episodes have been played elsewhere """
+        self.episodes_warmed_up_ = self.n_warmup
+
+    def setNextSeed(self, seed):
+        """ Sets the seed that the next reset (and the episode following it) is played on.
+            Environments that don't support seeding simply ignore it
+        """
+        self.next_seed = seed
+
+    def popNextSeed(self):
+        """ Returns the seed of the episode being reset and clears it """
+        seed = self.next_seed
+        self.next_seed = None
+        return seed
+
     def updateCurrentObservation(self, obs):
         """ Responsible for updating the current observation of the environment """
         self.curr_obs = obs
 
+    def updateLastActions(self, actions):
+        """ Updates the actions (indices, None for the agents that didn't act) taken by all the agents on the step """
+        self.last_actions = actions
+
     def updateNumActions(self, n):
         """ Updates the number of actions. Called only during initialization of the environment """
         self.n_actions = n
@@ -157,6 +215,17 @@ class SelfPlay:
         """
         return self.curr_obs[agentID]['status']
 
+    def getOpponentActions(self):
+        """ Returns the actions the opponents took on the latest step, by their index (None for our agent and the
+            opponents that didn't act). Returns None if the environment doesn't keep track of them
+        """
+        if self.last_actions is None:
+            return None
+
+        actions = list(self.last_actions)
+        actions[self.getOurAgentIndex()] = None
+        return actions
+
     def getObservation(self):
         """ Returns the current state of the game (includes state of all the agents) """
         return self.curr_obs[0]['observation']
\ No newline at end of file
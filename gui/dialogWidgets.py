@@ -1,7 +1,7 @@
 # This module contains custom dialog widgets for the GUI
 import os
 import pyperclip
-from PyQt5.QtCore import QThread
+from PyQt5.QtCore import QThread, QTimer
 from PyQt5.QtGui import QFont
 from PyQt5.QtWidgets import (
     QDialog,
@@ -15,6 +15,10 @@ from PyQt5.QtWidgets import (
     QProgressBar,
     QMessageBox,
     QLineEdit,
+    QTableWidget,
+    QTableWidgetItem,
+    QHeaderView,
+    QAbstractItemView,
 )
 
 # Custom module imports
@@ -29,10 +33,18 @@ import utils.nn
 DIALOG_TITLE_LAYER_CFG = 'Configure the Hidden Layers'
 DIALOG_TITLE_TRAINING  = 'Training the agent ...'
 DIALOG_TITLE_ERROR_MSG = 'Error(s) have occurred'
+DIALOG_TITLE_DASHBOARD = 'Training Runs'
+
+# Constants for RunDashboardDialog
+DASHBOARD_COLUMNS = ['Run', 'Status', 'Cores', 'Episode', 'Progress %', 'Episodes/sec']
+DASHBOARD_REFRESH_MS = 1000
 
 # Constant for dialog textbox
 DIALOG_TEXTBOX_STATS_HEADER = 'Performance Summary'
 
+# Key of the episode the most recent showdown was taken at (may lag behind when evaluating in background)
+DIALOG_SHOWDOWN_EPOCH_KEY = 'showdown_epoch'
+
 # Constant for tensorboard
 # The command needs to be appended with the log-directory
 DIALOG_TENSORBOARD_LABEL = 'Execute the command on terminal to start TensorBoard server'
@@ -52,6 +64,9 @@ LAYER_CONFIG_MAX_UNITS    = 2048
 GUI_BUTTON_TRAIN = 'Train'
 GUI_BUTTON_CANCEL = 'Cancel'
 GUI_BUTTON_CLOSE  = 'Close'
+GUI_BUTTON_CANCEL_RUN = 'Cancel Selected Run'
+GUI_BUTTON_PROFILE = 'Sample Profile'
+GUI_TOOLTIP_PROFILE = 'Samples the stacks of the training for a while and writes them into the run folder'
 
 
 class ErrorDialog(QMessageBox):
@@ -182,6 +197,11 @@ class TrainingDialog(QDialog):
         trainer.Trainer.AVG_SHOWDOWN_REWARD_KEY: '--',
         trainer.Trainer.AVG_SHOWDOWN_STEPS_KEY: '--',
         trainer.Trainer.SHOWDOWN_KEY: '--',
+        trainer.Trainer.SHOWDOWN_EPISODES_KEY: '--',
+        DIALOG_SHOWDOWN_EPOCH_KEY: '--',
+        trainer.Trainer.ENV_STEPS_PER_SEC_KEY: '--',
+        trainer.Trainer.UPDATES_PER_SEC_KEY: '--',
+        trainer.Trainer.PROFILE_SHARES_KEY: {},
     }
 
     TRAINING_STATS_DEF = TRAINING_STATS.copy()
@@ -197,6 +217,8 @@ class TrainingDialog(QDialog):
 
         self.parent = mainParent                    # Store a reference to the main parent widget
         self.config = config                        # The configuration information for the current training session
+        self.closeOnDone = False                    # Close the window once the training is done ? (when cancelled)
+        self.training = False                       # Is the training process running ?
         self.mainLayout = QGridLayout()             # Create the main layout for this window -- Grid Layout
 
         self.createTensorBoardLinkBox()             # List box corresponding to tensorboard server link
@@ -228,6 +250,9 @@ class TrainingDialog(QDialog):
             None,                   # 12. Model update delta, i.e. probability of clone not being updated
             None,                   # 13. Evaluation interval, i.e. how often there is a showdown
             None,                   # 14. Evaluation episodes, i.e. how many episodes in a showdown
+            None,                   # 15. Whether the showdowns run in background, alongside training
+            None,                   # 16. Width of the win rate's confidence interval that ends a showdown early
+            None,                   # 17. Whether the showdowns are played on a fixed bank of seeds
             '</body></html>'        # Closing tag
         ]
 
@@ -250,6 +275,9 @@ class TrainingDialog(QDialog):
         fmt_config[12] = f'<p> <b>Evaluation Interval: </b> {self.config[acfg.KEY_EVAL_INTERVAL]} </p>'
         fmt_config[13] = f'<p> <b>Evaluation Episodes: </b> {self.config[acfg.KEY_EVAL_EPISODES]} </p>'
         fmt_config[14] = f'<p> <b>Checkpoint Interval: </b> {self.config[acfg.KEY_CHKPT_INT]} </p>'
+        fmt_config[15] = f'<p> <b>Background Evaluation: </b> {self.config[acfg.KEY_EVAL_ASYNC]} </p>'
+        fmt_config[16] = f'<p> <b>Evaluation Interval Width: </b> {self.config[acfg.KEY_EVAL_CI_WIDTH]} </p>'
+        fmt_config[17] = f'<p> <b>Common Evaluation Seeds: </b> {self.config[acfg.KEY_EVAL_COMMON_SEEDS]} </p>'
 
         fmt_config_str = '\n'.join(fmt_config)
         self.configInfoTextBox.setText(fmt_config_str)
@@ -275,7 +303,11 @@ class TrainingDialog(QDialog):
             None,                   # 10. Average win rate
             None,                   # 11. Average reward
             None,                   # 12. Average time steps
-            '</body></html>'        # 13. Closing tag
+            None,                   # 13. Episodes played in the most recent showdown
+            '',                     # 14. Newline (only if the phases are profiled)
+            '',                     # 15. Environment steps and updates per second
+            '',                     # 16. Share of the time spent in each phase
+            '</body></html>'        # 17. Closing tag
         ]
 
         # Absolutely terrible way >:(
@@ -284,10 +316,21 @@ class TrainingDialog(QDialog):
         fmt_stats[5] = f'<p> <b>Avg. Reward: </b> {self.TRAINING_STATS[trainer.Trainer.TOTAL_TRAIN_REWARD_KEY]} </p>'
         fmt_stats[6] = f'<p> <b>Avg. Steps: </b> {self.TRAINING_STATS[trainer.Trainer.TOTAL_TRAIN_STEPS_KEY]} </p>'
         fmt_stats[7] = f'<p> <b>Avg. Win %: </b> {self.TRAINING_STATS[trainer.Trainer.TOTAL_TRAIN_WINS_KEY]} </p>'
-        fmt_stats[9] = f'<p> <b>Evaluation #: </b> {self.TRAINING_STATS[trainer.Trainer.SHOWDOWN_KEY]} </p>'
+        fmt_stats[9] = f'''<p> <b>Evaluation #: </b> {self.TRAINING_STATS[trainer.Trainer.SHOWDOWN_KEY]}
+                        (Episode {self.TRAINING_STATS[DIALOG_SHOWDOWN_EPOCH_KEY]}) </p>'''
         fmt_stats[10] = f'<p> <b>Avg. Win %: </b> {self.TRAINING_STATS[trainer.Trainer.WIN_RATE_KEY]} </p>'
         fmt_stats[11] = f'<p> <b>Avg. Reward: </b> {self.TRAINING_STATS[trainer.Trainer.AVG_SHOWDOWN_REWARD_KEY]} </p>'
         fmt_stats[12] = f'<p> <b>Avg. Steps: </b> {self.TRAINING_STATS[trainer.Trainer.AVG_SHOWDOWN_STEPS_KEY]} </p>'
+        fmt_stats[13] = f'<p> <b>Episodes Played: </b> {self.TRAINING_STATS[trainer.Trainer.SHOWDOWN_EPISODES_KEY]} </p>'
+
+        if self.config[acfg.KEY_PROFILE_PHASES]:
+            shares = self.TRAINING_STATS[trainer.Trainer.PROFILE_SHARES_KEY]
+            fmt_stats[14] = '<br/>'
+            fmt_stats[15] = f'''<p> <b>Env. Steps/sec: </b> {self.TRAINING_STATS[trainer.Trainer.ENV_STEPS_PER_SEC_KEY]}
+                            <b>Updates/sec: </b> {self.TRAINING_STATS[trainer.Trainer.UPDATES_PER_SEC_KEY]} </p>'''
+            fmt_stats[16] = '<p> <b>Time Spent: </b> ' + (', '.join([
+                f'{name} {share}%' for name, share in shares.items()
+            ]) or '--') + ' </p>'
 
         fmt_stats_str = '\n'.join(fmt_stats)
         self.trainingInfoTextBox.setText(fmt_stats_str)
@@ -350,16 +393,21 @@ class TrainingDialog(QDialog):
         self.trainBtn = QPushButton(GUI_BUTTON_TRAIN)
         self.closeBtn = QPushButton(GUI_BUTTON_CLOSE)
         self.cancelBtn = QPushButton(GUI_BUTTON_CANCEL)
+        self.profileBtn = QPushButton(GUI_BUTTON_PROFILE)
+        self.profileBtn.setToolTip(GUI_TOOLTIP_PROFILE)
 
         self.trainBtn.clicked.connect(self.trainButtonClicked)
         self.closeBtn.clicked.connect(self.closeButtonClicked)
         self.cancelBtn.clicked.connect(self.cancelButtonClicked)
+        self.profileBtn.clicked.connect(self.profileButtonClicked)
 
         # Initially close button is disabled. It's enabled only when training is complete
         # When training completes, the cancel button gets disabled
         self.closeBtn.setEnabled(False)
         self.cancelBtn.setEnabled(False)
+        self.profileBtn.setEnabled(False)
 
+        self.mainLayout.addWidget(self.profileBtn, 4, 0, 1, 1)
         self.mainLayout.addWidget(self.cancelBtn, 4, 3, 1, 1)
         self.mainLayout.addWidget(self.closeBtn, 4, 2, 1, 1)
         self.mainLayout.addWidget(self.trainBtn, 4, 1, 1, 1)
@@ -371,12 +419,15 @@ class TrainingDialog(QDialog):
     # *****************************************
 
     def trainButtonClicked(self):
-        """ Starts the thread for training and disables itself and enables the cancel button """
+        """ Starts the process for training and disables itself and enables the cancel button """
         self.trainBtn.setEnabled(False)
         self.cancelBtn.setEnabled(True)
+        self.profileBtn.setEnabled(True)
+        self.training = True
 
+        # The training runs in a process of its own, the thread only listens to it
         self.thread_ = QThread()
-        self.worker_ = gui_worker.Worker(self.config)
+        self.worker_ = gui_worker.WorkerProcess(self.config)
         self.worker_.moveToThread(self.thread_)
         self.thread_.started.connect(self.worker_.run)
 
@@ -388,6 +439,7 @@ class TrainingDialog(QDialog):
         self.worker_.signals.progress_signal.connect(self.progressBarUpdate)
         self.worker_.signals.textbox_training_signal.connect(self.trainingInfoUpdate)
         self.worker_.signals.textbox_showndown_signal.connect(self.showdownInfoUpdate)
+        self.worker_.signals.textbox_profile_signal.connect(self.profileInfoUpdate)
 
         self.thread_.start()
 
@@ -397,17 +449,38 @@ class TrainingDialog(QDialog):
         self.close()
 
 
+    def reject(self):
+        """ Closing the window (Esc, or its close button) while training cancels it, like the 'Cancel' button.
+            The window closes once the final checkpoint is saved
+        """
+        if self.training:
+            self.cancelButtonClicked()
+            return
+
+        super().reject()
+
+
     def cancelButtonClicked(self):
-        """ Stops the algorithm and then closes """
-        #TODO: Do the above mentioned stuff
+        """ Stops the algorithm and then closes (once the final checkpoint is saved) """
+        self.cancelBtn.setEnabled(False)
+        self.closeOnDone = True
         self.worker_.stop()
-        self.close()
+
+
+    def profileButtonClicked(self):
+        """ Starts sampling the stacks of the training (or stops it early, if it already is) """
+        self.worker_.profile()
 
 
     def trainingDone(self):
-        """ Enables the close button and disables the cancel button """
+        """ Enables the close button and disables the cancel and profile buttons """
         self.cancelBtn.setEnabled(False)
+        self.profileBtn.setEnabled(False)
         self.closeBtn.setEnabled(True)
+        self.training = False
+
+        if self.closeOnDone:
+            self.close()
 
 
     def tensorBoardCopyCommand(self):
@@ -456,16 +529,111 @@ class TrainingDialog(QDialog):
         avg_win_rate = data[trainer.Trainer.WIN_RATE_KEY]
         curr_epoch = data[trainer.Trainer.EPOCH_KEY]
         showdown_num = data[trainer.Trainer.SHOWDOWN_KEY]
+        showdown_episodes = data[trainer.Trainer.SHOWDOWN_EPISODES_KEY]
 
         # Update the common dictionary with the new values
         self.TRAINING_STATS[trainer.Trainer.AVG_SHOWDOWN_REWARD_KEY] = avg_rewards
         self.TRAINING_STATS[trainer.Trainer.AVG_SHOWDOWN_STEPS_KEY] = avg_steps
         self.TRAINING_STATS[trainer.Trainer.WIN_RATE_KEY] = avg_win_rate
-        self.TRAINING_STATS[trainer.Trainer.EPOCH_KEY] = curr_epoch
+        self.TRAINING_STATS[DIALOG_SHOWDOWN_EPOCH_KEY] = curr_epoch
         self.TRAINING_STATS[trainer.Trainer.SHOWDOWN_KEY] = showdown_num
+        self.TRAINING_STATS[trainer.Trainer.SHOWDOWN_EPISODES_KEY] = showdown_episodes
 
         self._write_performance_statistics()   # Update on the GUI
 
 
+    def profileInfoUpdate(self, data):
+        """ Updates the time spent in the phases of training on the text box """
+
+        # Update the common dictionary with the new values
+        self.TRAINING_STATS[trainer.Trainer.PROFILE_SHARES_KEY] = data[trainer.Trainer.PROFILE_SHARES_KEY]
+        self.TRAINING_STATS[trainer.Trainer.ENV_STEPS_PER_SEC_KEY] = data[trainer.Trainer.ENV_STEPS_PER_SEC_KEY]
+        self.TRAINING_STATS[trainer.Trainer.UPDATES_PER_SEC_KEY] = data[trainer.Trainer.UPDATES_PER_SEC_KEY]
+
+        self._write_performance_statistics()   # Update on the GUI
+
+
+class RunDashboardDialog(QDialog):
+    """ Class responsible for the dashboard of the runs started by the run manager """
+
+    def __init__(self, mainParent, runManager, *args, **kwargs):
+        super().__init__(mainParent)
+
+        self.setWindowTitle(DIALOG_TITLE_DASHBOARD)
+        self.setMinimumWidth(winw.GUI_WDW_MAX_WIDTH)
+
+        self.runManager = runManager                # The manager of the runs displayed
+        self.mainLayout = QGridLayout()             # Create the main layout for this window -- Grid Layout
+
+        self.createBudgetLabel()                    # Label displaying the usage of the core budget
+        self.createRunsTable()                      # Table displaying the status and throughput of every run
+        self.createOptionButtons()                  # Option buttons to cancel a run and to close
+
+        # The throughput changes continuously, the table is refreshed periodically (as well as on every change)
+        self.refreshTimer = QTimer(self)
+        self.refreshTimer.timeout.connect(self.refresh)
+        self.refreshTimer.start(DASHBOARD_REFRESH_MS)
+        self.runManager.runs_changed_signal.connect(self.refresh)
+
+        self.setLayout(self.mainLayout)
+        self.refresh()
+
+
+    def createBudgetLabel(self):
+        """ Creates the label that displays the usage of the core budget """
+        self.budgetLabel = QLabel()
+        self.mainLayout.addWidget(self.budgetLabel, 0, 0, 1, 4)
+
+
+    def createRunsTable(self):
+        """ Creates the table of the runs """
+        self.runsTable = QTableWidget(0, len(DASHBOARD_COLUMNS))
+        self.runsTable.setHorizontalHeaderLabels(DASHBOARD_COLUMNS)
+        self.runsTable.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.runsTable.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.runsTable.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.runsTable.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+
+        self.mainLayout.addWidget(self.runsTable, 1, 0, 1, 4)
+
+
+    def createOptionButtons(self):
+        """ Creates the buttons Cancel Selected Run and Close and adds them to this widget """
+        self.cancelRunBtn = QPushButton(GUI_BUTTON_CANCEL_RUN)
+        self.closeBtn = QPushButton(GUI_BUTTON_CLOSE)
+
+        self.cancelRunBtn.clicked.connect(self.cancelRunButtonClicked)
+        self.closeBtn.clicked.connect(self.close)
+
+        self.mainLayout.addWidget(self.cancelRunBtn, 2, 2, 1, 1)
+        self.mainLayout.addWidget(self.closeBtn, 2, 3, 1, 1)
+
+    # *****************************************
+    # Below methods contains the control logic
+    # for handling events that originated from
+    # interacting with this subcomponent of GUI
+    # *****************************************
+
+    def refresh(self):
+        """ Fills the table with the current state of the runs """
+        budget = self.runManager.get_budget()
+        runs = self.runManager.get_runs()
+        total_throughput = sum(run.get_throughput() for run in runs)
+
+        self.budgetLabel.setText(f'<b>Cores in use:</b> {budget.n_used()} / {budget.size()}'
+                                 f' &nbsp; <b>Total Episodes/sec:</b> {total_throughput:.2f}')
+
+        self.runsTable.setRowCount(len(runs))
+        for row, run in enumerate(runs):
+            cores = ', '.join(map(str, run.cores)) if run.cores is not None else '--'
+            values = [run.get_name(), run.status, cores, run.episode, int(run.progress), f'{run.get_throughput():.2f}']
+
+            for col, value in enumerate(values):
+                self.runsTable.setItem(row, col, QTableWidgetItem(str(value)))
 
 
+    def cancelRunButtonClicked(self):
+        """ Cancels the run selected in the table """
+        rows = {index.row() for index in self.runsTable.selectionModel().selectedRows()}
+        for row in rows:
+            self.runManager.cancel(self.runManager.get_runs()[row])
@@ -1,12 +1,13 @@
 # This module takes care of creating the main GUI for the application
 
-from PyQt5.QtCore import QSize
+from PyQt5.QtCore import Qt, QSize
 from PyQt5.QtWidgets import (
     QMainWindow,
     QWidget,
     QVBoxLayout,
     QPushButton,
-    QFrame
+    QFrame,
+    QProgressDialog
 )
 
 # Custom module imports related to creating the subcomponents of the GUI and their functioning
@@ -16,12 +17,17 @@ import utils.dispatcher as udispatch
 
 from gui.dialogWidgets import TrainingDialog
 from gui.dialogWidgets import ErrorDialog
+from gui.dialogWidgets import RunDashboardDialog
+from gui.runManager import RunManager
 from gui.algoWidget import AlgoWidget
 from gui.miscWidget import MiscWidget
 
 
 # Some useful constants
 GUI_BUTTON_START = 'Ready to Train'
+GUI_BUTTON_QUEUE = 'Add to Run Queue'
+GUI_BUTTON_DASHBOARD = 'Show Runs'
+GUI_CLOSING_TEXT = 'Waiting for the runs to save their final checkpoints...'
 
 
 class KaggleSimLabUI(QMainWindow):
@@ -42,6 +48,16 @@ class KaggleSimLabUI(QMainWindow):
         self.startButton.setEnabled(False)
         self.startButton.clicked.connect(self.startButtonEventHandler)
 
+        # The runs can also be queued, to be trained side by side by the run manager (on a share of the cores each)
+        self.runManager = RunManager()
+        self.runDashboard = None
+        self.closingDialog = None       # Shown while the runs stop, once the window is being closed
+        self.queueButton = QPushButton(GUI_BUTTON_QUEUE)
+        self.queueButton.setEnabled(False)
+        self.queueButton.clicked.connect(self.queueButtonEventHandler)
+        self.dashboardButton = QPushButton(GUI_BUTTON_DASHBOARD)
+        self.dashboardButton.clicked.connect(self.dashboardButtonEventHandler)
+
         # Create the widget that'll host the other layouts
         self.mainWidget = QWidget()
 
@@ -62,6 +78,8 @@ class KaggleSimLabUI(QMainWindow):
         self.mainLayout.addWidget(self.horzLine)
         self.mainLayout.addWidget(self.algoWidget)
         self.mainLayout.addWidget(self.startButton)
+        self.mainLayout.addWidget(self.queueButton)
+        self.mainLayout.addWidget(self.dashboardButton)
 
         # Finally add the layout to the the main widget and add it to the
         # main window of the GUI
@@ -79,8 +97,10 @@ class KaggleSimLabUI(QMainWindow):
         # The last check is to ensure we only enable the start button only if we support that environment
         if currOptim and currAlgo and currEnviron and currEnviron in ecfg.ENV_SUPPORTED_LIST:
             self.startButton.setEnabled(True)
+            self.queueButton.setEnabled(True)
         else:
             self.startButton.setEnabled(False)
+            self.queueButton.setEnabled(False)
 
 
     def startButtonEventHandler(self):
@@ -96,3 +116,43 @@ class KaggleSimLabUI(QMainWindow):
 
         # Execution of the main widget pauses until the dialog is closed
         # Once training is done or is cancelled, execution resumes
+
+
+    def queueButtonEventHandler(self):
+        """ Event handler for the 'Add to Run Queue' button. Queues the run and shows the dashboard """
+        configData = self.algoWidget.algoConfig.getConfigData()
+        configData = self.algoWidget.algoConfig.checkAndUpdateConfigData(configData)
+
+        self.runManager.submit(configData)
+        self.dashboardButtonEventHandler()
+
+
+    def dashboardButtonEventHandler(self):
+        """ Event handler for the 'Show Runs' button. Shows the (non-blocking) dashboard of the runs """
+        if self.runDashboard is None:
+            self.runDashboard = RunDashboardDialog(self, self.runManager)
+
+        self.runDashboard.show()
+        self.runDashboard.raise_()
+
+
+    def closeEvent(self, event):
+        """ Stops the queued runs (after their final checkpoints) and closes once they are all done. It can take
+            a while, so the GUI keeps running meanwhile, behind a progress dialog
+        """
+        n_active = self.runManager.count_active()
+        if n_active > 0:
+            event.ignore()
+            if self.closingDialog is None:
+                self.closingDialog = QProgressDialog(GUI_CLOSING_TEXT, None, 0, n_active, self)
+                self.closingDialog.setWindowModality(Qt.WindowModal)
+                self.closingDialog.setMinimumDuration(0)
+                self.runManager.stop_all()
+                self.runManager.runs_changed_signal.connect(self.close)     # Tries again whenever a run is done
+            self.closingDialog.setValue(self.closingDialog.maximum() - n_active)
+            return
+
+        if self.closingDialog is not None:
+            self.closingDialog.close()
+        self.runManager.wait_all()      # Their threads are done, or just about
+        super().closeEvent(event)
@@ -19,6 +19,8 @@ from PyQt5.QtWidgets import (
 
 # Custom module imports
 import config.environmentConfig as ecfg                  # Environment configuration information
+import utils.foldersPrep as fprep                        # Module for checking the folders of a run
+from gui.dialogWidgets import ErrorDialog
 
 
 # Placeholder text constants
@@ -27,6 +29,9 @@ PLACEHOLDER_ENV_BOX = '-- Select your Environment --'
 # GUI related contstants
 GUI_BUTTON_WORKSPACE = 'Change Workspace'
 GUI_SELECT_WORKSPACE = 'Select Workspace'
+GUI_BUTTON_RESUME    = 'Resume Run'
+GUI_SELECT_RESUME    = 'Select the Run to Resume'
+GUI_RESUME_PLACEHOLDER = 'Start a new run'
 GUI_LABEL_NUM_AGENTS = 'Number of Agents'
 GUI_NUM_AGENTS_MIN   = 2
 
@@ -48,6 +53,7 @@ class MiscWidget(QWidget):
         self.createEnvListBox()             # Create the environment selection widgets
         self.createNumAgentsBox()           # Create the number of agents widget
         self.createWorkspaceBox()           # Create the workspace selection widgets
+        self.createResumeBox()              # Create the widgets for selecting a run to resume
 
 
     def createProjectInfo(self):
@@ -116,6 +122,22 @@ class MiscWidget(QWidget):
         self.mainLayout.addWidget(self.chooseWorkspaceBtn, 4, 3, 1, 1)
 
 
+    def createResumeBox(self):
+        """ Creates the widget that asks the user to select the directory of a run to resume """
+        self.chooseResumeBtn = QPushButton(GUI_BUTTON_RESUME)
+        self.currResumeBox = QLineEdit()
+
+        # The user is not allowed to tweak the value inside by typing
+        self.currResumeBox.setReadOnly(True)
+        self.currResumeBox.setPlaceholderText(GUI_RESUME_PLACEHOLDER)
+
+        # Connect the button to the handler for updating the run to resume
+        self.chooseResumeBtn.clicked.connect(self.changeResumeHandler)
+
+        self.mainLayout.addWidget(self.currResumeBox, 5, 0, 1, 3)
+        self.mainLayout.addWidget(self.chooseResumeBtn, 5, 3, 1, 1)
+
+
     # *****************************************
     # Below methods contains the control logic
     # for handling events that originated from
@@ -149,4 +171,20 @@ class MiscWidget(QWidget):
         self.currWorkspaceBox.setText(str(filepath))
 
         # Update the workspace path
-        self.parent.algoWidget.algoConfig.setWorkspace(filepath)
\ No newline at end of file
+        self.parent.algoWidget.algoConfig.setWorkspace(filepath)
+
+
+    def changeResumeHandler(self):
+        """ Creates a directory selection dialog for the user to choose the run to resume (cancel starts a new run) """
+        filepath = self.fileDialog.getExistingDirectory(caption=GUI_SELECT_RESUME)
+
+        # The run would only fail once started, in its own process -- Tell the user now and start a new run instead
+        problems = fprep.PrepareFolders.check_resumable(filepath) if filepath else []
+        if problems:
+            ErrorDialog(self.parent, problems).exec_()
+            filepath = ''
+
+        self.currResumeBox.setText(str(filepath))
+
+        # An empty path means the selection was cancelled, i.e. a new run
+        self.parent.algoWidget.algoConfig.setResumeDirectory(filepath if filepath else None)
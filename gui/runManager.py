@@ -0,0 +1,187 @@
+# This module contains the manager that runs the queued training runs side by side
+
+import os
+import time
+from collections import deque
+from PyQt5.QtCore import (
+    Qt,
+    QObject,
+    QThread,
+    pyqtSignal
+)
+
+# Custom module imports
+import gui.workers as gui_worker               # Module containing the process specific classes
+import config.algorithmsConfig as acfg         # Module containing algorithm configuration information
+import utils.trainer as trainer                # Module containing the trainer class, used here for extracting the stats
+
+
+class CoreBudget:
+    """ The cores the runs may use. Every run is given a set of cores of its own, so that they don't compete """
+
+    def __init__(self, cores=None):
+        """
+        cores: The cores available to the runs (None for all the cores this process may run on)
+        """
+        if cores is None:
+            cores = os.sched_getaffinity(0) if hasattr(os, 'sched_getaffinity') else range(os.cpu_count() or 1)
+
+        self.cores = sorted(cores)
+        self.free = list(self.cores)
+
+    def size(self):
+        """ Returns the number of cores in the budget """
+        return len(self.cores)
+
+    def n_used(self):
+        """ Returns the number of cores given to the runs """
+        return len(self.cores) - len(self.free)
+
+    def acquire(self, n):
+        """ Takes n free cores (capped at the budget) and returns them, or None if not enough of them are free """
+        n = max(1, min(n, self.size()))
+        if len(self.free) < n:
+            return None
+
+        cores, self.free = self.free[:n], self.free[n:]
+        return cores
+
+    def release(self, cores):
+        """ Gives the cores back to the budget """
+        self.free = sorted(self.free + list(cores))
+
+
+class ManagedRun:
+    """ A training run of the run manager, along with its status and throughput """
+
+    # Status of a run
+    QUEUED = 'Queued'
+    RUNNING = 'Running'
+    STOPPING = 'Stopping'
+    DONE = 'Done'
+
+    THROUGHPUT_WINDOW_SECS = 10         # The throughput is measured over the most recent updates
+
+    def __init__(self, run_id, config_data):
+        self.run_id = run_id
+        self.config_data = config_data
+        self.status = self.QUEUED
+        self.cores = None               # Cores the run is pinned to, once started
+        self.thread = None              # Thread listening to the training process
+        self.worker = None              # Listener of the training process
+        self.episode = 0                # Most recent episode reported by the run
+        self.progress = 0               # Percentage of the run done
+        self.updates = deque()          # (time, episode) of the recent updates, for the throughput
+
+    def get_name(self):
+        """ Returns the name of the run, as displayed on the dashboard """
+        return f'#{self.run_id} {self.config_data[acfg.KEY_ALGO]} ({self.config_data[acfg.KEY_ENVIRONMENT]})'
+
+    def record_episode(self, episode):
+        """ Records the episode reported by the run """
+        now = time.monotonic()
+        self.episode = episode
+        self.updates.append((now, episode))
+
+        while now - self.updates[0][0] > self.THROUGHPUT_WINDOW_SECS:
+            self.updates.popleft()
+
+    def get_throughput(self):
+        """ Returns the number of episodes per second over the recent updates """
+        if self.status != self.RUNNING or len(self.updates) < 2:
+            return 0.0
+
+        (first_time, first_episode), (last_time, last_episode) = self.updates[0], self.updates[-1]
+        return (last_episode - first_episode) / max(last_time - first_time, 1e-9)
+
+
+class RunManager(QObject):
+    """ Queues the training runs and starts them as separate processes whenever enough cores are free """
+
+    runs_changed_signal = pyqtSignal()  # Sent when a run is queued, started, or finished
+
+    def __init__(self, cores=None):
+        super().__init__()
+        self.budget = CoreBudget(cores)
+        self.runs = []                  # All the runs, in the order they were queued
+        self.next_run_id = 1
+
+    def submit(self, config_data):
+        """ Queues the run, and starts it right away if enough cores are free """
+        run = ManagedRun(self.next_run_id, config_data)
+        self.next_run_id += 1
+        self.runs.append(run)
+
+        self._schedule()
+        self.runs_changed_signal.emit()
+        return run
+
+    def cancel(self, run):
+        """ Removes the run from the queue, or stops it (after its final checkpoint) if it is running """
+        if run.status == ManagedRun.QUEUED:
+            run.status = ManagedRun.DONE
+        elif run.status == ManagedRun.RUNNING:
+            run.status = ManagedRun.STOPPING
+            run.worker.stop()
+
+        self.runs_changed_signal.emit()
+
+    def stop_all(self):
+        """ Cancels all the runs """
+        for run in self.runs:
+            self.cancel(run)
+
+    def count_active(self):
+        """ Returns the number of runs that are running or stopping """
+        return sum(run.status in (ManagedRun.RUNNING, ManagedRun.STOPPING) for run in self.runs)
+
+    def wait_all(self):
+        """ Blocks till all the started runs are done """
+        for run in self.runs:
+            if run.thread is not None:
+                run.thread.wait()
+
+    def get_runs(self):
+        """ Returns all the runs, in the order they were queued """
+        return self.runs
+
+    def get_budget(self):
+        """ Returns the core budget shared by the runs """
+        return self.budget
+
+    def _schedule(self):
+        """ Starts the queued runs, in order, as long as there are enough free cores for them """
+        for run in self.runs:
+            if run.status != ManagedRun.QUEUED:
+                continue
+
+            cores = self.budget.acquire(run.config_data[acfg.KEY_NUM_CORES])
+            if cores is None:
+                break       # The runs start in the order they were queued
+            self._start(run, cores)
+
+    def _start(self, run, cores):
+        """ Starts the run on the cores """
+        run.status = ManagedRun.RUNNING
+        run.cores = cores
+        run.thread = QThread()
+        run.worker = gui_worker.WorkerProcess(run.config_data, cores)
+        run.worker.moveToThread(run.thread)
+        run.thread.started.connect(run.worker.run)
+
+        signals = run.worker.signals
+        # Quit straight from the run's thread. Queued to the GUI thread, it would never come while wait_all() blocks it
+        signals.finished_signal.connect(run.thread.quit, Qt.DirectConnection)
+        signals.finished_signal.connect(lambda: self._finished(run))
+        signals.progress_signal.connect(lambda percent: setattr(run, 'progress', percent))
+        signals.textbox_training_signal.connect(lambda data: run.record_episode(data[trainer.Trainer.EPOCH_KEY]))
+
+        run.thread.start()
+
+    def _finished(self, run):
+        """ Gives the cores of the finished run back and starts the next runs """
+        run.status = ManagedRun.DONE
+        self.budget.release(run.cores)
+
+        self._schedule()
+        self.runs_changed_signal.emit()
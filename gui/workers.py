@@ -1,5 +1,8 @@
-# This module contains worker threads to start the training process
+# This module contains the worker that runs the training in a separate process, and the listener of the GUI
+import os
 import time
+import multiprocessing as mp
+import torch
 from PyQt5.QtCore import (
     QObject,
     pyqtSignal
@@ -7,7 +10,24 @@ from PyQt5.QtCore import (
 
 # Custom module imports
 import utils.trainer as trainer
+import utils.profiler as uprof
+import utils.samplingProfiler as usampler
+import config.algorithmsConfig as acfg
 from utils.dispatcher import dispatcher
+from config.environmentConfig import registerEnvironments
+
+
+# Kinds of the messages sent by the training process over the pipe
+MSG_TENSORBOARD = 'tensorboard'
+MSG_PROGRESS = 'progress'
+MSG_TEXTBOX_TRAINING = 'textbox_training'
+MSG_TEXTBOX_SHOWDOWN = 'textbox_showdown'
+MSG_TEXTBOX_PROFILE = 'textbox_profile'
+MSG_FINISHED = 'finished'
+
+# Commands sent to the training process over the pipe
+CMD_STOP = 'stop'
+CMD_PROFILE = 'profile'
 
 
 # Signals for the worker threads
@@ -18,45 +38,266 @@ class WorkerSignals(QObject):
     progress_signal = pyqtSignal(float)         # Sent when the progress bar needs an update
     textbox_training_signal = pyqtSignal(dict)  # Sent when the training information textbox needs an update
     textbox_showndown_signal = pyqtSignal(dict) # Sent when the training information textbox needs to update
+    textbox_profile_signal = pyqtSignal(dict)   # Sent when the time spent in the phases of training is reported
 
 
-# Worker-Thread class that is responsible for training
-class Worker(QObject):
-    """ A worker thread that is spawned when Train is clicked """
+# Coalesces the updates sent to the GUI
+class SignalThrottle:
+    """ Emits the latest value given to it through the signal, at most once every interval.
+        The values given in between are dropped, and a value equal to the last one emitted is never sent again
+    """
 
-    def __init__(self, config_data):
-        super().__init__()
+    def __init__(self, signal, interval_ms):
+        self.signal = signal
+        self.interval = interval_ms / 1000
+        self.last_emit_time = None      # When the last value was emitted
+        self.last_value = None          # The last value emitted
+        self.pending = None             # The latest value not emitted yet
+        self.has_pending = False        # Is there a value that's not emitted yet ? (None is a valid value)
+
+    def update(self, value):
+        """ Records the value and emits it if the interval since the last emit has elapsed """
+        if self.last_emit_time is not None and value == self.last_value:
+            self.has_pending = False    # Back to what the GUI already shows, nothing to send
+            return
+
+        self.pending = value
+        self.has_pending = True
+
+        self.flush_if_due()
+
+    def flush_if_due(self):
+        """ Emits the pending value if the interval since the last emit has elapsed """
+        if self.last_emit_time is None or time.monotonic() - self.last_emit_time >= self.interval:
+            self.flush()
+
+    def flush(self):
+        """ Emits the pending value, if any """
+        if not self.has_pending:
+            return
+
+        self.signal.emit(self.pending)
+        self.last_emit_time = time.monotonic()
+        self.last_value = self.pending
+        self.pending = None
+        self.has_pending = False
+
+
+# Stands in for a signal inside the training process
+class PipeSignal:
+    """ Emitting sends the value over the pipe, to be emitted as a real signal on the GUI side """
+
+    def __init__(self, conn, kind):
+        self.conn = conn
+        self.kind = kind
+
+    def emit(self, value=None):
+        with uprof.phase(uprof.PHASE_GUI_EMIT):
+            self.conn.send((self.kind, value))
+
+
+# Worker class that is responsible for training, inside the training process
+class Worker:
+    """ The worker handed to the dispatcher in the training process. Sends the updates for the GUI over
+        the events pipe and picks up the commands of the GUI from the commands pipe
+    """
+
+    UPDATE_INTERVAL_MS = 100        # Minimum time between two updates of the same GUI component
+    COMMAND_POLL_INTERVAL_MS = 20   # Minimum time between two checks for commands (it's checked on every step)
+
+    def __init__(self, config_data, events, commands):
         self.config_data = config_data
-        self.signals = WorkerSignals()
+        self.events = events            # Pipe to send the updates through
+        self.commands = commands        # Pipe to receive the commands from
         self.active = True
+        self.last_poll_time = 0         # When the commands were last checked
+
+        # The trainer sends updates every episode, which can be much faster than the GUI needs (or keeps up with)
+        self.progress_throttle = SignalThrottle(PipeSignal(events, MSG_PROGRESS), self.UPDATE_INTERVAL_MS)
+        self.training_throttle = SignalThrottle(PipeSignal(events, MSG_TEXTBOX_TRAINING), self.UPDATE_INTERVAL_MS)
+        self.showdown_throttle = SignalThrottle(PipeSignal(events, MSG_TEXTBOX_SHOWDOWN), self.UPDATE_INTERVAL_MS)
 
     def stop(self):
         """ Sets the stopping variable which stops the training loop """
         self.active = False
 
     def is_active(self):
-        """ Returns the status of the worker thread -- whether it is active or not """
+        """ Returns the status of the worker -- whether it is active or not """
+        self.receive_commands()
         return self.active
 
+    def receive_commands(self):
+        """ Executes the commands sent by the GUI since the last check """
+        now = time.monotonic()
+        if now - self.last_poll_time < self.COMMAND_POLL_INTERVAL_MS / 1000:
+            return
+
+        self.last_poll_time = now
+        while self.commands.poll():
+            command = self.commands.recv()
+            if command == CMD_STOP:
+                self.stop()
+            elif command == CMD_PROFILE:
+                usampler.SAMPLER.toggle()
+
+        # A value held back is sent once its interval is over, not only with the next update (which can be long)
+        self.progress_throttle.flush_if_due()
+        self.training_throttle.flush_if_due()
+        self.showdown_throttle.flush_if_due()
+
     def update_progress_bar(self, percent):
-        """ Emits the signal that updates the progress bar on the GUI """
-        self.signals.progress_signal.emit(percent)
+        """ Sends the update of the progress bar on the GUI """
+        self.progress_throttle.update(percent)
 
     def update_textbox_training(self, data):
-        """ Emits the signal that updates the textbox on the GUI """
-        self.signals.textbox_training_signal.emit(data)
+        """ Sends the update of the textbox on the GUI """
+        self.training_throttle.update(data)
 
     def update_textbox_showdown(self, data):
-        """ Emits the signal that updates the textbox on the GUI """
-        self.signals.textbox_showndown_signal.emit(data)
+        """ Sends the update of the textbox on the GUI """
+        self.showdown_throttle.update(data)
+
+    def update_textbox_profile(self, data):
+        """ Sends the update of the textbox on the GUI. It's reported once in a while, no need to throttle it """
+        PipeSignal(self.events, MSG_TEXTBOX_PROFILE).emit(data)
 
     def update_tensorboard_cmd(self, log_dir):
-        """ Emits the signal that updates the tensorboard command on the GUI """
-        self.signals.tensorboard_signal.emit(log_dir)
+        """ Sends the update of the tensorboard command on the GUI """
+        PipeSignal(self.events, MSG_TENSORBOARD).emit(log_dir)
+
+    def flush_updates(self):
+        """ Sends the updates that were held back, so that the GUI ends up showing the latest state """
+        self.progress_throttle.flush()
+        self.training_throttle.flush()
+        self.showdown_throttle.flush()
 
     def run(self):
-        """ Entry point of the thread. Control is passed to dispatcher with its reference """
-        dispatcher(self.config_data, self)
+        """ Control is passed to dispatcher with its reference """
+        try:
+            dispatcher(self.config_data, self)
+            self.flush_updates()
+        finally:
+            # Execution has been finished (or failed) -- Mark the end of execution
+            PipeSignal(self.events, MSG_FINISHED).emit()
+
+
+def assign_cores(cores):
+    """ Pins the current process to the cores and sizes the thread pool of torch to match """
+    if hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, cores)
+    torch.set_num_threads(len(cores))
+
+
+def run_worker(config_data, events, commands, cores=None):
+    """ Entry point of the training process. cores is the list of cores it may use (None for all of them) """
+    if cores is not None:
+        assign_cores(cores)
+
+    registerEnvironments()          # The process starts afresh, the environments need to be registered again
+    Worker(config_data, events, commands).run()
+
+
+# Listener class that runs the training process, on a thread of the GUI
+class WorkerProcess(QObject):
+    """ Runs the training in a child process, so that it doesn't fight with the GUI over the interpreter.
+        Moved to a thread, it listens to the process and re-emits its updates as the signals of the GUI
+    """
+
+    POLL_INTERVAL_SECS = 0.1        # How often the listener checks the process while no update comes
+    STOP_TIMEOUT_SECS = 120         # How long a cancelled run has for its final checkpoint before being terminated
+
+    def __init__(self, config_data, cores=None):
+        super().__init__()
+        self.config_data = config_data
+        self.cores = cores              # Cores the process is pinned to (None for all of them)
+        self.signals = WorkerSignals()
+        self.stop_deadline = None       # Time by which the process must have stopped, once cancelled
+        self.log_dir = None             # Logs directory of the run, once created by the process
+
+        # Spawned, not forked -- Forking a process with the threads of Qt running is unsafe
+        context = mp.get_context('spawn')
+        self.events, self.child_events = context.Pipe(duplex=False)
+        self.child_commands, self.commands = context.Pipe(duplex=False)
+        self.process = context.Process(target=run_worker,
+                                       args=(config_data, self.child_events, self.child_commands, cores))
+
+        self.emitters = {
+            MSG_TENSORBOARD: self.signals.tensorboard_signal,
+            MSG_PROGRESS: self.signals.progress_signal,
+            MSG_TEXTBOX_TRAINING: self.signals.textbox_training_signal,
+            MSG_TEXTBOX_SHOWDOWN: self.signals.textbox_showndown_signal,
+            MSG_TEXTBOX_PROFILE: self.signals.textbox_profile_signal
+        }
+
+    def stop(self):
+        """ Asks the training process to stop. It saves a final checkpoint before exiting """
+        if self.stop_deadline is not None:
+            return
+
+        self.stop_deadline = time.monotonic() + self.STOP_TIMEOUT_SECS
+        try:
+            self.commands.send(CMD_STOP)
+        except OSError:
+            pass    # The process has already exited
+
+    def is_active(self):
+        """ Returns the status of the worker -- whether it is active or not """
+        return self.stop_deadline is None
+
+    def profile(self):
+        """ Asks the training process to start sampling its stacks (or to stop early, if it already is) """
+        try:
+            self.commands.send(CMD_PROFILE)
+        except OSError:
+            pass    # The process has already exited
+
+    def write_trace(self, tracer):
+        """ Adds the spans of the GUI to the timeline written by the training process """
+        if tracer is None or self.log_dir is None:
+            return
+
+        try:
+            tracer.write(os.path.join(self.log_dir, uprof.TRACE_FILE), append=True)
+        except OSError:
+            print(f'WARNING: Unable to write the trace to {self.log_dir}')
+
+    def run(self):
+        """ Entry point of the thread. Starts the training process and relays its updates till it finishes """
+        self.process.start()
+
+        # The updates relayed here are added to the timeline of the training process, if it is recorded
+        tracer = uprof.TraceRecorder('GUI') if self.config_data[acfg.KEY_TRACE_TIMELINE] else None
+
+        # Only the child needs its ends of the pipes. Closing them here lets the listener notice when it exits
+        self.child_events.close()
+        self.child_commands.close()
+
+        while True:
+            if self.stop_deadline is not None and time.monotonic() > self.stop_deadline:
+                print('WARNING: The training process did not stop in time. Terminating it')
+                self.process.terminate()
+                break
+
+            if not self.events.poll(self.POLL_INTERVAL_SECS):
+                if not self.process.is_alive():
+                    break   # Exited without marking the end (e.g. it was killed)
+                continue
+
+            try:
+                kind, value = self.events.recv()
+            except EOFError:
+                break
+
+            if kind == MSG_FINISHED:
+                break
+            if kind == MSG_TENSORBOARD:
+                self.log_dir = os.path.join(self.config_data[acfg.KEY_WORKSPACE], value)
+
+            with uprof.trace_span(tracer, uprof.PHASE_GUI_EMIT):
+                self.emitters[kind].emit(value)
+
+        self.process.join()
+        self.write_trace(tracer)
 
         # Execution has been finished -- Emit the signal marking the end of execution
         self.signals.finished_signal.emit()
@@ -0,0 +1,103 @@
+# Tests of the symmetries of the Hungry Geese board, used to augment the sampled experience
+
+import numpy as np
+import pytest
+import kaggle_environments as kaggle_env
+from kaggle_environments.envs.hungry_geese import hungry_geese
+
+from environments.kaggle.hungry_geese.boardSymmetries import BoardSymmetries
+from environments.kaggle.hungry_geese.hungryGeese import HungryGeese
+
+
+ROWS = 7
+COLUMNS = 11
+N_CELLS = ROWS * COLUMNS
+ACTIONS = list(hungry_geese.Action)
+
+
+@pytest.fixture(scope='module')
+def symmetries():
+    return BoardSymmetries(ROWS, COLUMNS)
+
+
+def _destinations(symmetries, t):
+    """ Returns where every cell ends up under the transform t """
+    return np.argsort(symmetries.sources[t])
+
+
+def test_transforms(symmetries):
+    # Both flips (or none of them), times every shift along the rows and the columns
+    assert symmetries.get_num_transforms() == 4 * N_CELLS
+    assert symmetries.sources.shape == (4 * N_CELLS, N_CELLS)
+    assert symmetries.actions.shape == (4 * N_CELLS, len(ACTIONS))
+
+    for t in range(symmetries.get_num_transforms()):
+        assert sorted(symmetries.sources[t]) == list(range(N_CELLS))
+        assert sorted(symmetries.actions[t]) == list(range(len(ACTIONS)))
+
+    assert len({tuple(sources) for sources in symmetries.sources}) == symmetries.get_num_transforms()
+
+
+def test_identity(symmetries):
+    boards = np.random.rand(3, N_CELLS)
+    actions = np.array([0, 1, 3])
+    transformed, transformed_actions = symmetries.transform(boards, actions, np.zeros(3, dtype=np.int64))
+
+    assert np.array_equal(transformed, boards)
+    assert np.array_equal(transformed_actions, actions)
+
+
+def test_moves_are_transformed_along(symmetries):
+    # Moving then transforming ends up on the same cell as transforming then moving with the transformed action
+    for t in range(symmetries.get_num_transforms()):
+        destinations = _destinations(symmetries, t)
+        for cell in range(N_CELLS):
+            for a, action in enumerate(ACTIONS):
+                moved = hungry_geese.translate(cell, action, COLUMNS, ROWS)
+                transformed_action = ACTIONS[symmetries.actions[t, a]]
+                assert hungry_geese.translate(destinations[cell], transformed_action, COLUMNS, ROWS) == \
+                    destinations[moved]
+
+
+def test_encoded_boards_are_transformed(symmetries):
+    env = kaggle_env.make('hungry_geese')
+    steps = env.run(['greedy'] * 4)
+    rng = np.random.RandomState(0)
+
+    for step in steps[::5]:
+        observation = step[0]['observation']
+        geese, food = observation['geese'], observation['food']
+        t = rng.randint(symmetries.get_num_transforms())
+        destinations = _destinations(symmetries, t)
+
+        for index in range(len(geese)):
+            board = np.zeros(N_CELLS, dtype=np.float32)
+            HungryGeese.encode_board(board, geese, food, index)
+
+            # The board of the transformed positions is the transformed board
+            expected = np.zeros(N_CELLS, dtype=np.float32)
+            HungryGeese.encode_board(expected,
+                                     [[int(destinations[cell]) for cell in goose] for goose in geese],
+                                     [int(destinations[cell]) for cell in food],
+                                     index)
+
+            transformed, _ = symmetries.transform(board[None], [0], np.array([t]))
+            assert np.array_equal(transformed[0], expected)
+
+
+def test_augment_transforms_each_transition_as_a_whole(symmetries):
+    # Every cell holds its own index, so the transform of a row can be recognized from its cells
+    n_transitions = 64
+    states = np.tile(np.arange(N_CELLS, dtype=np.float32), (n_transitions, 1))
+    next_states = states + 1000
+    actions = np.arange(n_transitions) % len(ACTIONS)
+
+    np.random.seed(0)
+    augmented_states, augmented_actions, augmented_next_states = symmetries.augment(states, actions, next_states)
+
+    transforms = {tuple(sources): t for t, sources in enumerate(symmetries.sources)}
+    for state, action, next_state, original_action in zip(augmented_states, augmented_actions,
+                                                          augmented_next_states, actions):
+        t = transforms[tuple(state.astype(np.int64))]
+        assert np.array_equal(next_state, state + 1000)
+        assert action == symmetries.actions[t, original_action]
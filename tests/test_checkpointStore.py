@@ -0,0 +1,117 @@
+# Tests of the store that keeps the checkpoint history as keyframes and deltas
+
+import os
+import pickle
+from collections import OrderedDict
+
+import torch
+
+import utils.flatCheckpoint as uflat
+import utils.checkpointStore as ustore
+
+
+def _versions(n_versions):
+    """ Returns n_versions state dictionaries, each a slightly trained version of the previous one """
+    torch.manual_seed(0)
+    state_dict = OrderedDict([
+        ('layer.weight', torch.randn(16, 8)),
+        ('layer.bias', torch.randn(16)),
+        ('steps', torch.tensor(0, dtype=torch.int64)),
+    ])
+
+    versions = []
+    for i in range(n_versions):
+        state_dict = OrderedDict([
+            ('layer.weight', state_dict['layer.weight'] + 1e-4 * torch.randn(16, 8)),
+            ('layer.bias', state_dict['layer.bias'] + 1e-4 * torch.randn(16)),
+            ('steps', torch.tensor(i, dtype=torch.int64)),
+        ])
+        versions.append(state_dict)
+    return versions
+
+
+def _write_all(store, directory, versions):
+    """ Writes the versions through the store and returns the paths they were written to """
+    return [store.write(os.path.join(directory, f'dqn_{i}.flat'), state_dict) for i, state_dict in enumerate(versions)]
+
+
+def _assert_equal(loaded, expected):
+    assert list(loaded) == list(expected)
+    for name, tensor in expected.items():
+        assert loaded[name].dtype == tensor.dtype
+        assert torch.equal(loaded[name], tensor)
+
+
+def test_keyframes_and_deltas(tmp_path):
+    paths = _write_all(ustore.DeltaCheckpointStore(keyframe_interval=3), str(tmp_path), _versions(7))
+
+    assert [os.path.splitext(path)[1] for path in paths] == ['.flat', '.delta', '.delta'] * 2 + ['.flat']
+    assert all(uflat.is_flat_checkpoint(path) for path in paths[::3])
+    assert not any(uflat.is_flat_checkpoint(path) for path in paths[1:3] + paths[4:6])
+
+
+def test_every_version_is_rebuilt_exactly(tmp_path):
+    versions = _versions(7)
+    paths = _write_all(ustore.DeltaCheckpointStore(keyframe_interval=3), str(tmp_path), versions)
+
+    for path, state_dict in zip(paths, versions):
+        _assert_equal(ustore.load_checkpoint(path), state_dict)
+
+
+def test_only_keyframes(tmp_path):
+    paths = _write_all(ustore.DeltaCheckpointStore(keyframe_interval=1), str(tmp_path), _versions(3))
+    assert all(uflat.is_flat_checkpoint(path) for path in paths)
+
+
+def test_architecture_change_writes_a_keyframe(tmp_path):
+    store = ustore.DeltaCheckpointStore(keyframe_interval=10)
+    versions = _versions(2)
+    store.write(str(tmp_path / 'dqn_0.flat'), versions[0])
+
+    resized = OrderedDict([('layer.weight', torch.randn(4, 8))])
+    path = store.write(str(tmp_path / 'dqn_1.flat'), resized)
+
+    assert uflat.is_flat_checkpoint(path)
+    _assert_equal(ustore.load_checkpoint(path), resized)
+
+
+def test_keyframe_outlives_its_deltas(tmp_path):
+    store = ustore.DeltaCheckpointStore(keyframe_interval=3)
+    versions = _versions(4)
+    paths = _write_all(store, str(tmp_path), versions)
+
+    # The first keyframe is no longer the current one, but its deltas still need it
+    store.remove(paths[0])
+    assert os.path.isfile(paths[0])
+    _assert_equal(ustore.load_checkpoint(paths[2]), versions[2])
+
+    store.remove(paths[1])
+    assert os.path.isfile(paths[0])
+    store.remove(paths[2])
+    assert sorted(os.listdir(tmp_path)) == ['dqn_3.flat']
+
+
+def test_adopted_deltas_keep_their_keyframe(tmp_path):
+    versions = _versions(3)
+    paths = _write_all(ustore.DeltaCheckpointStore(keyframe_interval=3), str(tmp_path), versions)
+
+    # A resumed run takes over the checkpoints on disk with a fresh store
+    store = ustore.DeltaCheckpointStore(keyframe_interval=3)
+    store.adopt(str(tmp_path))
+
+    store.remove(paths[0])
+    store.remove(paths[1])
+    assert os.path.isfile(paths[0])
+    _assert_equal(ustore.load_checkpoint(paths[2]), versions[2])
+
+    store.remove(paths[2])
+    assert os.listdir(tmp_path) == []
+
+
+def test_pickled_checkpoints_still_load(tmp_path):
+    state_dict = _versions(1)[0]
+    path = str(tmp_path / 'dqn_0.pt')
+    with open(path, 'wb') as model_file:
+        pickle.dump(state_dict, model_file)
+
+    _assert_equal(ustore.load_checkpoint(path), state_dict)
@@ -0,0 +1,167 @@
+# Tests of the background checkpoint writer and its retention of the most recent and the best checkpoints
+
+import os
+
+import utils.checkpointWriter as uchkpt
+
+
+class _Disk:
+    """ Stands in for the disk: records the writes and the deletions, in order """
+
+    def __init__(self, failing=()):
+        self.events = []
+        self.failing = set(failing)     # Paths that can't be written
+
+    def write(self, path, state_dict):
+        if path in self.failing:
+            raise OSError(f'Unable to write {path}')
+        self.events.append(('write', path))
+        return path
+
+    def remove(self, path):
+        self.events.append(('remove', path))
+
+    def removed(self):
+        return [path for kind, path in self.events if kind == 'remove']
+
+
+def _writer(disk, keep_last, keep_best, **kwargs):
+    return uchkpt.CheckpointWriter(keep_last, keep_best, write_fn=disk.write, remove_fn=disk.remove, **kwargs)
+
+
+def test_keeps_the_most_recent():
+    disk = _Disk()
+    writer = _writer(disk, keep_last=2, keep_best=0)
+    for e in range(1, 6):
+        writer.submit(e, f'c{e}', {})
+    writer.close()
+
+    assert writer.checkpoints == [(4, 'c4'), (5, 'c5')]
+    assert disk.removed() == ['c1', 'c2', 'c3']
+
+
+def test_keeps_all_of_them():
+    disk = _Disk()
+    writer = _writer(disk, keep_last=0, keep_best=0)
+    for e in range(1, 6):
+        writer.submit(e, f'c{e}', {})
+    writer.close()
+
+    assert len(writer.checkpoints) == 5
+    assert disk.removed() == []
+
+
+def test_keeps_the_best_scored():
+    disk = _Disk()
+    writer = _writer(disk, keep_last=1, keep_best=2)
+    for e, win_rate in zip(range(1, 6), (0.2, 0.9, 0.1, 0.7, 0.3)):
+        writer.submit(e, f'c{e}', {})
+        writer.record_score(e, win_rate)
+    writer.close()
+
+    assert writer.checkpoints == [(2, 'c2'), (4, 'c4'), (5, 'c5')]
+    assert writer.scores == {'c2': 0.9, 'c4': 0.7, 'c5': 0.3}
+
+
+def test_score_goes_to_the_latest_checkpoint_saved_till_then():
+    disk = _Disk()
+    writer = _writer(disk, keep_last=0, keep_best=1)
+    writer.submit(10, 'c10', {})
+    writer.submit(20, 'c20', {})
+    writer.record_score(15, 0.5)
+    writer.record_score(5, 0.9)       # Before any checkpoint, scores none of them
+    writer.close()
+
+    assert writer.scores == {'c10': 0.5}
+
+
+def test_awaited_checkpoint_is_kept_till_its_score_comes():
+    disk = _Disk()
+    writer = _writer(disk, keep_last=2, keep_best=1)
+    writer.submit(1, 'c1', {})
+    writer.submit(2, 'c2', {})
+    writer.record_score(2, 0.9)
+    writer.submit(3, 'c3', {})
+    writer.submit(4, 'c4', {})
+    writer.expect_score(4)            # Its showdown runs in background
+    for e in range(5, 8):
+        writer.submit(e, f'c{e}', {})
+    writer.record_score(4, 0.1)
+    writer.submit(8, 'c8', {})
+    writer.close()
+
+    # c4 was only pruned once it got its (poor) score, which went to c4 and not to a checkpoint that survived
+    assert disk.events.index(('remove', 'c4')) > disk.events.index(('write', 'c7'))
+    assert writer.scores == {'c2': 0.9}
+    assert writer.checkpoints == [(2, 'c2'), (7, 'c7'), (8, 'c8')]
+
+
+def test_score_of_a_pruned_checkpoint_is_dropped():
+    disk = _Disk()
+    writer = _writer(disk, keep_last=1, keep_best=1)
+    writer.submit(1, 'c1', {})
+    writer.record_score(1, 0.9)
+    writer.submit(2, 'c2', {})
+    writer.submit(3, 'c3', {})
+    writer.record_score(2, 0.5)       # c2 is gone already
+    writer.close()
+
+    assert writer.scores == {'c1': 0.9}
+    assert writer.checkpoints == [(1, 'c1'), (3, 'c3')]
+
+
+def test_score_of_a_failed_checkpoint_is_dropped():
+    disk = _Disk(failing=['c2'])
+    writer = _writer(disk, keep_last=0, keep_best=1)
+    writer.submit(1, 'c1', {})
+    writer.submit(2, 'c2', {})
+    writer.record_score(2, 0.5)
+    writer.close()
+
+    assert writer.checkpoints == [(1, 'c1')]
+    assert writer.scores == {}
+
+
+def test_cancelled_showdowns_hold_nothing_back():
+    disk = _Disk()
+    writer = _writer(disk, keep_last=1, keep_best=0)
+    writer.submit(1, 'c1', {})
+    writer.expect_score(1)            # Never comes, the run is cancelled
+    writer.submit(2, 'c2', {})
+    writer.close()
+
+    assert writer.checkpoints == [(2, 'c2')]
+
+
+def test_resumed_checkpoints_are_kept_alike():
+    disk = _Disk()
+    writer = _writer(disk, keep_last=2, keep_best=1,
+                     checkpoints=[(1, 'c1'), (2, 'c2'), (3, 'c3'), (4, 'c4')],
+                     scores={2: 0.8, 3: 0.4},
+                     saved_episodes=[1, 2, 3, 4])
+    writer.submit(5, 'c5', {})
+    writer.close()
+
+    assert disk.removed() == ['c1', 'c3']
+    assert writer.checkpoints == [(2, 'c2'), (4, 'c4'), (5, 'c5')]
+
+
+def test_list_checkpoints(tmp_path):
+    names = ['dqn_10_20260101-000010.flat', 'dqn_2_20260101-000002.delta', 'dqn_2_20260101-000001.flat',
+             'dqn_11_20260101-000011.flat.tmp', 'notes.txt']
+    for name in names:
+        (tmp_path / name).write_bytes(b'')
+
+    assert uchkpt.list_checkpoints(str(tmp_path)) == [
+        (2, os.path.join(str(tmp_path), 'dqn_2_20260101-000001.flat')),
+        (2, os.path.join(str(tmp_path), 'dqn_2_20260101-000002.delta')),
+        (10, os.path.join(str(tmp_path), 'dqn_10_20260101-000010.flat')),
+    ]
+
+
+def test_scored_checkpoint():
+    saved_episodes = [10, 20, 30]
+    assert uchkpt.scored_checkpoint(saved_episodes, 5) is None
+    assert uchkpt.scored_checkpoint(saved_episodes, 10) == 10
+    assert uchkpt.scored_checkpoint(saved_episodes, 29) == 20
+    assert uchkpt.scored_checkpoint(saved_episodes, 99) == 30
@@ -0,0 +1,84 @@
+# Tests of the showdowns: the Wilson interval that ends them early, and the seeded episodes they're played on
+
+import pytest
+
+import utils.evaluator as uevaluator
+
+
+Z_95 = 1.96
+
+
+class _Environment:
+    """ Stands in for the environment, records the seeds of the episodes """
+
+    def __init__(self):
+        self.seeds = []
+
+    def setNextSeed(self, seed):
+        self.seeds.append(seed)
+
+
+class _Agent:
+    """ Stands in for the agent, wins the episodes whose outcome is True """
+
+    def __init__(self, outcomes):
+        self.env = _Environment()
+        self.outcomes = iter(outcomes)
+        self.n_played = 0
+
+    def get_environment(self):
+        return self.env
+
+    def play_one_episode(self, eval=False):
+        self.n_played += 1
+        return 10, 100, next(self.outcomes)
+
+
+def test_wilson_interval():
+    lower, upper = uevaluator.wilson_interval(8, 10, Z_95)
+    assert lower == pytest.approx(0.4902, abs=1e-4)
+    assert upper == pytest.approx(0.9433, abs=1e-4)
+
+
+def test_wilson_interval_at_the_bounds():
+    lower, upper = uevaluator.wilson_interval(0, 20, Z_95)
+    assert lower == pytest.approx(0) and 0 < upper < 1
+
+    lower, upper = uevaluator.wilson_interval(20, 20, Z_95)
+    assert 0 < lower < 1 and upper == pytest.approx(1)
+
+
+def test_wilson_interval_narrows():
+    widths = [upper - lower for lower, upper in (uevaluator.wilson_interval(n // 2, n, Z_95) for n in (10, 100, 1000))]
+    assert widths[0] > widths[1] > widths[2]
+
+    lower, upper = uevaluator.wilson_interval(50, 100, Z_95)
+    assert 0.5 - lower == pytest.approx(upper - 0.5)
+
+
+def test_showdown_plays_all_the_episodes():
+    agent = _Agent([True, False] * 10)
+    win_rate, avg_reward, avg_steps, n_played = uevaluator.showdown(agent, 20)
+    assert (win_rate, avg_reward, avg_steps, n_played) == (50, 10, 100, 20)
+
+
+def test_showdown_stops_once_the_win_rate_is_known():
+    # Winning all the time, the interval gets narrow quickly
+    agent = _Agent([True] * 1000)
+    win_rate, _, _, n_played = uevaluator.showdown(agent, 1000, ci_width=0.2)
+
+    assert win_rate == 100
+    assert uevaluator.SEQUENTIAL_MIN_EPISODES <= n_played < 1000
+    lower, upper = uevaluator.wilson_interval(n_played, n_played, uevaluator.SEQUENTIAL_Z_SCORE)
+    assert upper - lower < 0.2
+
+
+def test_showdown_plays_the_seeded_episodes():
+    agent = _Agent([True] * 5)
+    uevaluator.showdown(agent, 5, seeds=[11, 12, 13, 14, 15, 16])
+    assert agent.env.seeds == [11, 12, 13, 14, 15]
+
+
+def test_cancelled_showdown():
+    agent = _Agent([True] * 10)
+    assert uevaluator.showdown(agent, 10, need_to_stop=lambda: agent.n_played > 3) == (100, 10, 100, 3)
@@ -0,0 +1,71 @@
+# Tests of the flat (memory-mappable) checkpoint format
+
+import os
+from collections import OrderedDict
+
+import pytest
+import torch
+
+import utils.flatCheckpoint as uflat
+
+
+def _state_dict():
+    """ Returns a state dictionary with tensors of several dtypes and shapes, a scalar and an empty one included """
+    torch.manual_seed(0)
+    return OrderedDict([
+        ('layer.weight', torch.randn(7, 5)),
+        ('layer.bias', torch.randn(7)),
+        ('steps', torch.tensor(12345, dtype=torch.int64)),
+        ('mask', torch.tensor([True, False, True])),
+        ('half', torch.randn(3, 2).to(torch.float16)),
+        ('empty', torch.zeros(0, 4)),
+    ])
+
+
+def test_round_trip(tmp_path):
+    state_dict = _state_dict()
+    path = uflat.write(str(tmp_path / 'model.flat'), state_dict)
+
+    loaded = uflat.load(path)
+    assert list(loaded) == list(state_dict)
+    for name, tensor in state_dict.items():
+        assert loaded[name].dtype == tensor.dtype
+        assert loaded[name].shape == tensor.shape
+        assert torch.equal(loaded[name], tensor)
+
+
+def test_tensors_are_aligned(tmp_path):
+    path = uflat.write(str(tmp_path / 'model.flat'), _state_dict())
+
+    for tensor in uflat.load(path).values():
+        if tensor.numel() > 0:
+            assert tensor.numpy().ctypes.data % uflat.ALIGNMENT == 0
+
+
+def test_non_contiguous_tensors(tmp_path):
+    state_dict = OrderedDict([('transposed', torch.arange(12, dtype=torch.float32).reshape(3, 4).t())])
+    path = uflat.write(str(tmp_path / 'model.flat'), state_dict)
+
+    assert torch.equal(uflat.load(path)['transposed'], state_dict['transposed'])
+
+
+def test_modifying_a_loaded_tensor_leaves_the_file_alone(tmp_path):
+    state_dict = _state_dict()
+    path = uflat.write(str(tmp_path / 'model.flat'), state_dict)
+
+    uflat.load(path)['layer.weight'].zero_()
+    assert torch.equal(uflat.load(path)['layer.weight'], state_dict['layer.weight'])
+
+
+def test_no_temporary_file_is_left(tmp_path):
+    uflat.write(str(tmp_path / 'model.flat'), _state_dict())
+    assert os.listdir(tmp_path) == ['model.flat']
+
+
+def test_other_files_are_rejected(tmp_path):
+    path = str(tmp_path / 'model.pt')
+    torch.save(_state_dict(), path)
+
+    assert not uflat.is_flat_checkpoint(path)
+    with pytest.raises(ValueError):
+        uflat.load(path)
@@ -0,0 +1,86 @@
+# Tests of the vectorized version of Kaggle's GreedyAgent
+
+import numpy as np
+
+from environments.kaggle.hungry_geese.greedyBots import GreedyBots, NO_ACTION
+from benchmarks.greedyParity import record_positions, kaggle_actions, vectorized_actions
+
+
+ROWS = 7
+COLUMNS = 11
+NORTH, EAST, SOUTH, WEST = range(4)
+
+
+class _FirstChoice:
+    """ Stands in for the source of the random moves, picks the first one """
+
+    def __init__(self):
+        self.n_calls = 0
+
+    def choice(self, seq):
+        self.n_calls += 1
+        return seq[0]
+
+
+def _cell(row, column):
+    return row * COLUMNS + column
+
+
+def test_plays_like_kaggle_greedy_agent():
+    for n_agents in (2, 4):
+        configuration, positions, bots = record_positions(n_episodes=3, n_agents=n_agents)
+
+        expected = kaggle_actions(configuration, positions, bots)
+        actual = vectorized_actions(configuration, positions, bots)
+
+        compared = expected != NO_ACTION      # Kaggle's bots moving at random aren't compared
+        assert np.array_equal(actual[compared], expected[compared])
+
+
+def test_goes_to_the_closest_food():
+    bots = GreedyBots(ROWS, COLUMNS)
+    geese = [[_cell(3, 5)]]
+
+    assert bots.act([geese], [[_cell(0, 5)]], [0], [0], [NO_ACTION]) == [NORTH]
+    assert bots.act([geese], [[_cell(3, 9), _cell(3, 2)]], [0], [0], [NO_ACTION]) == [WEST]
+
+
+def test_never_turns_back():
+    bots = GreedyBots(ROWS, COLUMNS)
+    geese = [[_cell(3, 5)]]
+
+    # The food is right behind, along the last move
+    assert bots.act([geese], [[_cell(4, 5)]], [0], [0], [NORTH]) != [SOUTH]
+
+
+def test_avoids_the_bodies_and_the_cells_next_to_other_heads():
+    bots = GreedyBots(ROWS, COLUMNS)
+    food = [_cell(3, 7)]
+
+    # A body on the way to the food
+    geese = [[_cell(3, 5)], [_cell(2, 6), _cell(3, 6), _cell(4, 6)]]
+    assert bots.act([geese], [food], [0], [0], [NO_ACTION])[0] != EAST
+
+    # Another head next to the cell on the way to the food
+    geese = [[_cell(3, 5)], [_cell(2, 6)]]
+    assert bots.act([geese], [food], [0], [0], [NO_ACTION])[0] != EAST
+
+
+def test_moves_at_random_when_blocked():
+    bots = GreedyBots(ROWS, COLUMNS)
+    head = _cell(3, 5)
+    body = [bots.neighbours[head, a] for a in (NORTH, EAST, WEST)]
+    rng = _FirstChoice()
+
+    actions = bots.act([[[head] + body[:1], body[1:2], body[2:3]]], [[_cell(0, 0)]], [0], [0], [NORTH], rng=rng)
+    assert rng.n_calls == 1
+    assert actions[0] == 0
+
+
+def test_many_games_at_once():
+    bots = GreedyBots(ROWS, COLUMNS)
+    geese = [[[_cell(3, 5)], [_cell(0, 0)]], [[_cell(5, 5)]]]
+    food = [[_cell(1, 5)], [_cell(5, 8)]]
+
+    actions = bots.act(geese, food, games=[0, 1, 0], indices=[0, 0, 1], last_actions=[NO_ACTION] * 3)
+    assert list(actions[:2]) == [NORTH, EAST]
@@ -0,0 +1,76 @@
+# Tests of the reading of Kaggle episode files, for the pretraining on recorded data
+
+import json
+
+import numpy as np
+import pytest
+import kaggle_environments as kaggle_env
+
+import utils.offlineTraining as uoffline
+
+
+N_CELLS = 77
+
+
+@pytest.fixture(scope='module')
+def episode():
+    """ Returns the JSON of a game of Kaggle's greedy agents """
+    env = kaggle_env.make('hungry_geese')
+    env.run(['greedy'] * 4)
+    return env.toJSON()
+
+
+def _write(path, episode, **dump_kwargs):
+    with open(path, 'w') as episode_file:
+        json.dump(episode, episode_file, **dump_kwargs)
+    return str(path)
+
+
+@pytest.mark.parametrize('read_size', [1, 7, 100, uoffline.READ_SIZE])
+def test_steps_are_read_whatever_the_read_size(tmp_path, episode, read_size):
+    path = _write(tmp_path / 'episode.json', episode)
+    assert list(uoffline.iter_episode_steps(path, read_size=read_size)) == episode['steps']
+
+
+def test_steps_of_an_indented_file(tmp_path, episode):
+    path = _write(tmp_path / 'episode.json', episode, indent=4)
+    assert list(uoffline.iter_episode_steps(path, read_size=13)) == episode['steps']
+
+
+def test_steps_after_and_before_other_keys(tmp_path, episode):
+    # The steps aren't necessarily first (nor last), and other keys may hold lists as well
+    reordered = {'info': {'steps': 'not these'}, 'rewards': [1, 2], 'steps': episode['steps'], 'version': 'x'}
+    path = _write(tmp_path / 'episode.json', reordered)
+    assert list(uoffline.iter_episode_steps(path, read_size=5)) == episode['steps']
+
+
+def test_no_steps(tmp_path):
+    path = _write(tmp_path / 'episode.json', {'rewards': [1, 2]})
+    with pytest.raises(ValueError):
+        list(uoffline.iter_episode_steps(path))
+
+
+def test_truncated_file(tmp_path, episode):
+    path = tmp_path / 'episode.json'
+    text = json.dumps(episode)
+    path.write_text(text[:len(text) // 2])
+
+    with pytest.raises(ValueError):
+        list(uoffline.iter_episode_steps(str(path), read_size=64))
+
+
+def test_transitions(tmp_path, episode):
+    path = _write(tmp_path / 'episode.json', episode)
+    steps = episode['steps']
+    transitions = list(uoffline.iter_episode_transitions(path, N_CELLS))
+
+    # One per goose still playing on every step but the last one
+    expected_count = sum(prev_state['status'] == 'ACTIVE' for prev_step in steps[:-1] for prev_state in prev_step)
+    assert len(transitions) == expected_count
+
+    # Every goose is done on its last transition only
+    for state, action, reward, next_state, done in transitions:
+        assert state.shape == next_state.shape == (N_CELLS, )
+        assert action in uoffline.ACTION_INDICES.values()
+        assert np.isfinite(reward)
+    assert sum(done for *_, done in transitions) == len(steps[0])
@@ -0,0 +1,186 @@
+# Tests of the resumable state of a run: the segments of the replay buffer and the state saved along
+
+import os
+import random
+
+import numpy as np
+import torch
+
+from agents.replayBuffer import ReplayBuffer
+from utils.resumeCheckpoint import ResumeCheckpoint
+from utils.trainer import Trainer
+
+
+def _store(buffer, first, n_experiences):
+    """ Stores n_experiences numbered from first, so that every experience can be told apart """
+    for i in range(first, first + n_experiences):
+        buffer.store(np.full(3, i, dtype=np.float32), i % 4, float(i), np.full(3, i + 1, dtype=np.float32), i % 7 == 0)
+
+
+def _numbers(buffer):
+    """ Returns the numbers of the experiences in the buffer, oldest first """
+    return [int(data[ReplayBuffer.REWARD_KEY]) for data in buffer.buffer]
+
+
+def _segments(directory):
+    return sorted(name for name in os.listdir(directory) if name.startswith(ReplayBuffer.SEGMENT_PREFIX))
+
+
+class _Environment:
+    """ Stands in for the self-play environment, whose state is restored along """
+
+    def __init__(self):
+        self.state = None
+
+    def getState(self):
+        return self.state
+
+    def setState(self, state):
+        self.state = state
+
+
+class _Agent:
+    """ Stands in for an agent with a replay buffer """
+
+    def __init__(self, buffer_size):
+        self.env = _Environment()
+        self.buffer = ReplayBuffer(buffer_size)
+        self.state = None
+
+    def get_environment(self):
+        return self.env
+
+    def get_replay_buffer(self):
+        return self.buffer
+
+    def get_state(self):
+        return self.state
+
+    def set_state(self, state):
+        self.state = state
+
+
+def test_new_segment_has_only_the_new_experiences():
+    buffer = ReplayBuffer(10)
+    _store(buffer, 0, 4)
+    assert buffer.take_new_segment()[0] == 0
+
+    _store(buffer, 4, 3)
+    start, experiences = buffer.take_new_segment()
+    assert start == 4
+    assert [int(data[ReplayBuffer.REWARD_KEY]) for data in experiences] == [4, 5, 6]
+    assert buffer.take_new_segment() == (7, [])
+
+
+def test_new_segment_skips_the_evicted_experiences():
+    buffer = ReplayBuffer(5)
+    _store(buffer, 0, 12)
+
+    start, experiences = buffer.take_new_segment()
+    assert start == 7
+    assert [int(data[ReplayBuffer.REWARD_KEY]) for data in experiences] == list(range(7, 12))
+
+
+def test_segments_rebuild_the_buffer(tmp_path):
+    buffer = ReplayBuffer(6)
+    for n_experiences in (4, 3, 5):
+        _store(buffer, buffer.total_stored, n_experiences)
+        ReplayBuffer.write_segment(str(tmp_path), *buffer.take_new_segment())
+
+    loaded = ReplayBuffer(6)
+    loaded.load_segments(str(tmp_path), buffer.total_stored)
+
+    assert _numbers(loaded) == _numbers(buffer) == list(range(6, 12))
+    assert loaded.total_stored == loaded.total_dumped == 12
+    for data, expected in zip(loaded.buffer, buffer.buffer):
+        for key in expected:
+            assert np.array_equal(data[key], expected[key])
+
+
+def test_segments_rebuild_an_earlier_buffer(tmp_path):
+    buffer = ReplayBuffer(6)
+    for n_experiences in (4, 3, 5):
+        _store(buffer, buffer.total_stored, n_experiences)
+        ReplayBuffer.write_segment(str(tmp_path), *buffer.take_new_segment())
+
+    # As it was after the second segment, the third one was written by a run that crashed before saving its state
+    loaded = ReplayBuffer(6)
+    loaded.load_segments(str(tmp_path), 7)
+    assert _numbers(loaded) == list(range(1, 7))
+
+
+def test_prune_segments(tmp_path):
+    buffer = ReplayBuffer(6)
+    for n_experiences in (4, 3, 5):
+        _store(buffer, buffer.total_stored, n_experiences)
+        ReplayBuffer.write_segment(str(tmp_path), *buffer.take_new_segment())
+    assert _segments(str(tmp_path)) == ['segment_0_4.npz', 'segment_4_7.npz', 'segment_7_12.npz']
+
+    ReplayBuffer.prune_segments(str(tmp_path), 12, 6)
+    assert _segments(str(tmp_path)) == ['segment_4_7.npz', 'segment_7_12.npz']
+
+    ReplayBuffer.prune_segments(str(tmp_path), 7, 6)
+    assert _segments(str(tmp_path)) == ['segment_4_7.npz']
+
+
+def _seed(seed):
+    random.seed(seed)
+    np.random.seed(seed)
+    torch.manual_seed(seed)
+
+
+def _draw():
+    return random.random(), float(np.random.rand()), float(torch.rand(1))
+
+
+def test_save_and_restore(tmp_path):
+    agent = _Agent(buffer_size=8)
+    checkpoint = ResumeCheckpoint(str(tmp_path))
+    assert not checkpoint.exists()
+
+    for e in range(1, 4):
+        _store(agent.buffer, agent.buffer.total_stored, 5)
+        agent.state = {'epsilon': 1 / e}
+        agent.env.state = {'clones': e}
+        _seed(e)
+        checkpoint.save({Trainer.EPISODE_KEY: e}, agent)
+    expected_draws = _draw()
+    checkpoint.close()
+
+    # Only the experiences still in the buffer are kept on disk
+    assert checkpoint.exists()
+    assert set(_segments(checkpoint.replay_dir)) == {'segment_5_10.npz', 'segment_10_15.npz'}
+
+    _seed(0)
+    resumed = _Agent(buffer_size=8)
+    trainer_state = ResumeCheckpoint(str(tmp_path)).restore(resumed)
+
+    assert trainer_state == {Trainer.EPISODE_KEY: 3}
+    assert resumed.state == {'epsilon': 1 / 3}
+    assert resumed.env.state == {'clones': 3}
+    assert _numbers(resumed.buffer) == list(range(7, 15))
+    assert resumed.buffer.total_stored == 15
+
+    # The random number generators carry on from where they were when the state was saved
+    assert _draw() == expected_draws
+
+
+def test_trainer_state_of_an_older_run():
+    trainer = Trainer(worker_thread=None, config_data={}, agent=None)
+    state = trainer.get_state(40)
+    del state['showdown_scores'], state['saved_episodes']
+    state['total_train_wins_till_now'] = 7
+
+    resumed = Trainer(worker_thread=None, config_data={}, agent=None)
+    resumed.set_state(state)
+    assert resumed.total_train_wins_till_now == 7
+    assert resumed.showdown_scores == [] and resumed.saved_episodes == []
+
+
+def test_checkpoint_scores_of_the_trainer():
+    trainer = Trainer(worker_thread=None, config_data={}, agent=None)
+    trainer.saved_episodes = [10, 20, 30]
+    trainer.showdown_scores = [(5, 0.9), (10, 0.1), (25, 0.4), (30, 0.6), (35, 0.7)]
+
+    # A showdown scores the latest checkpoint saved till then, the most recent showdown wins
+    assert trainer.get_checkpoint_scores() == {10: 0.1, 20: 0.4, 30: 0.7}
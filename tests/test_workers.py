@@ -0,0 +1,124 @@
+# Tests of the throttling of the updates the training process sends to the GUI
+
+import multiprocessing as mp
+
+import pytest
+
+import gui.workers as gui_worker
+
+
+class _Signal:
+    """ Stands in for a signal, records what is emitted """
+
+    def __init__(self):
+        self.emitted = []
+
+    def emit(self, value):
+        self.emitted.append(value)
+
+
+class _Clock:
+    """ Stands in for time.monotonic(), moved forward by hand """
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake_clock = _Clock()
+    monkeypatch.setattr(gui_worker.time, 'monotonic', fake_clock)
+    return fake_clock
+
+
+def test_first_value_is_sent_right_away(clock):
+    signal = _Signal()
+    gui_worker.SignalThrottle(signal, 100).update(1)
+    assert signal.emitted == [1]
+
+
+def test_only_the_latest_value_of_an_interval_is_sent(clock):
+    signal = _Signal()
+    throttle = gui_worker.SignalThrottle(signal, 100)
+    for value in range(5):
+        throttle.update(value)
+    assert signal.emitted == [0]
+
+    clock.now += 0.05
+    throttle.flush_if_due()
+    assert signal.emitted == [0]
+
+    clock.now += 0.06
+    throttle.flush_if_due()
+    assert signal.emitted == [0, 4]
+
+    throttle.flush_if_due()
+    assert signal.emitted == [0, 4]
+
+
+def test_update_after_the_interval_is_sent(clock):
+    signal = _Signal()
+    throttle = gui_worker.SignalThrottle(signal, 100)
+    throttle.update(1)
+    clock.now += 0.11
+    throttle.update(2)
+    assert signal.emitted == [1, 2]
+
+
+def test_value_already_shown_is_not_sent_again(clock):
+    signal = _Signal()
+    throttle = gui_worker.SignalThrottle(signal, 100)
+    throttle.update(1)
+    throttle.update(2)
+    throttle.update(1)        # Back to what the GUI shows
+
+    clock.now += 1
+    throttle.flush_if_due()
+    throttle.update(1)
+    assert signal.emitted == [1]
+
+
+def test_none_is_a_value(clock):
+    signal = _Signal()
+    throttle = gui_worker.SignalThrottle(signal, 100)
+    throttle.update(1)
+    throttle.update(None)
+    throttle.flush()
+    assert signal.emitted == [1, None]
+
+
+def test_flush_sends_the_pending_value_at_once(clock):
+    signal = _Signal()
+    throttle = gui_worker.SignalThrottle(signal, 100)
+    throttle.update(1)
+    throttle.update(2)
+    throttle.flush()
+    throttle.flush()
+    assert signal.emitted == [1, 2]
+
+
+def test_worker_sends_held_back_updates_while_checking_for_commands():
+    events, child_events = mp.Pipe(duplex=False)
+    child_commands, commands = mp.Pipe(duplex=False)
+    worker = gui_worker.Worker({}, child_events, child_commands)
+
+    worker.update_textbox_showdown({'win_rate': 10})
+    worker.update_textbox_showdown({'win_rate': 20})
+    assert events.recv() == (gui_worker.MSG_TEXTBOX_SHOWDOWN, {'win_rate': 10})
+
+    worker.receive_commands()
+    assert not events.poll()
+
+    # The pipes wait on the real clock, so time is moved forward by aging the last emit (and the last check)
+    worker.showdown_throttle.last_emit_time -= 2 * worker.UPDATE_INTERVAL_MS / 1000
+    worker.last_poll_time -= 2 * worker.COMMAND_POLL_INTERVAL_MS / 1000
+    worker.receive_commands()
+    assert events.poll(1)
+    assert events.recv() == (gui_worker.MSG_TEXTBOX_SHOWDOWN, {'win_rate': 20})
+
+    commands.send(gui_worker.CMD_STOP)
+    worker.last_poll_time -= 2 * worker.COMMAND_POLL_INTERVAL_MS / 1000
+    assert not worker.is_active()
@@ -0,0 +1,181 @@
+# This module contains the store that keeps the history of the checkpoints as keyframes and deltas
+#
+# Consecutive checkpoints are nearly identical: most of their floats only differ in the low bits of the mantissa.
+# So only one save every few is a full (flat) checkpoint, the keyframe. The others are deltas against it: the
+# bits of every tensor XOR-ed with those of the keyframe, split into byte planes (the high bytes then are mostly
+# zeros) and deflated. Every delta depends on its keyframe only, so any version is rebuilt from two files
+
+import os
+import glob
+import pickle
+import zipfile
+from collections import OrderedDict
+
+import numpy as np
+import torch
+
+import utils.flatCheckpoint as uflat
+
+
+DELTA_EXTENSION = '.delta'
+KEYFRAME_KEY = '__keyframe__'           # Key of the name of the keyframe in a delta file
+
+
+class DeltaCheckpointStore:
+    """ Writes a keyframe every keyframe_interval saves and deltas in between. Keeps track of which deltas
+        depend on which keyframes, so that a keyframe is only deleted once none of its deltas is left
+    """
+
+    def __init__(self, keyframe_interval):
+        """
+        keyframe_interval: Number of saves per keyframe (1 or less writes only keyframes)
+        """
+        self.keyframe_interval = keyframe_interval
+        self.n_saved = 0                # Number of checkpoints written so far
+        self.keyframe_path = None       # Path of the keyframe the new deltas are taken against
+        self.keyframe_bits = None       # Name of the tensor -> Bits of the tensor in the keyframe
+        self.dependents = {}            # Path of a keyframe -> Paths of the deltas taken against it
+        self.delta_keyframes = {}       # Path of a delta -> Path of its keyframe
+        self.removed = set()            # Keyframes deleted by the caller but still needed by some deltas
+
+    def write(self, path, state_dict):
+        """ Writes the checkpoint as a keyframe or as a delta. Returns the path it was written to """
+        arrays = OrderedDict((name, tensor.detach().cpu().contiguous().numpy())
+                             for name, tensor in state_dict.items())
+        keyframe = self._needs_keyframe(arrays)
+        self.n_saved += 1
+
+        if keyframe:
+            uflat.write(path, state_dict)
+            self._set_keyframe(path, arrays)
+            return path
+
+        delta_path = os.path.splitext(path)[0] + DELTA_EXTENSION
+        planes = {name: _to_planes(_bits(array) ^ self.keyframe_bits[name]) for name, array in arrays.items()}
+        planes[KEYFRAME_KEY] = np.array(os.path.basename(self.keyframe_path))
+
+        # np.savez_compressed() appends '.npz' to the names, so it's handed a file instead
+        tmp_path = delta_path + '.tmp'
+        with open(tmp_path, 'wb') as delta_file:
+            np.savez_compressed(delta_file, **planes)
+            delta_file.flush()
+            os.fsync(delta_file.fileno())
+        os.replace(tmp_path, delta_path)
+
+        self.dependents[self.keyframe_path].add(delta_path)
+        self.delta_keyframes[delta_path] = self.keyframe_path
+        return delta_path
+
+    def adopt(self, directory):
+        """ Takes over the deltas already in the directory (e.g. of a resumed run), so that their keyframes are
+            kept for as long as they are needed
+        """
+        for delta_path in glob.glob(os.path.join(directory, f'*{DELTA_EXTENSION}')):
+            try:
+                with np.load(delta_path) as planes:
+                    keyframe_path = os.path.join(directory, str(planes[KEYFRAME_KEY]))
+            except (OSError, ValueError, KeyError):
+                print(f'WARNING: Unable to read the delta checkpoint {delta_path}')
+                continue
+
+            self.dependents.setdefault(keyframe_path, set()).add(delta_path)
+            self.delta_keyframes[delta_path] = keyframe_path
+
+    def remove(self, path):
+        """ Deletes the checkpoint. A keyframe stays on disk (invisibly) as long as some deltas need it """
+        keyframe_path = self.delta_keyframes.pop(path, None)
+
+        if keyframe_path is None:
+            self.removed.add(path)
+            self._collect(path)
+            return
+
+        os.remove(path)
+        self.dependents[keyframe_path].discard(path)
+        self._collect(keyframe_path)
+
+    def _needs_keyframe(self, arrays):
+        """ Returns a boolean indicating whether the checkpoint needs to be written in full """
+        if self.keyframe_interval <= 1 or self.n_saved % self.keyframe_interval == 0:
+            return True
+
+        if self.keyframe_path is None or not os.path.isfile(self.keyframe_path):
+            return True
+
+        # The architecture changed, nothing to take a delta against
+        return (arrays.keys() != self.keyframe_bits.keys() or
+                any(_bits(array).dtype != self.keyframe_bits[name].dtype or
+                    array.shape != self.keyframe_bits[name].shape for name, array in arrays.items()))
+
+    def _set_keyframe(self, path, arrays):
+        """ Makes the checkpoint the keyframe of the next deltas """
+        previous_path = self.keyframe_path
+
+        self.keyframe_path = path
+        self.keyframe_bits = OrderedDict((name, _bits(array).copy()) for name, array in arrays.items())
+        self.dependents[path] = set()
+
+        if previous_path is not None:
+            self._collect(previous_path)
+
+    def _collect(self, keyframe_path):
+        """ Deletes the keyframe if it was removed and is no longer needed """
+        if (keyframe_path not in self.removed or self.dependents.get(keyframe_path) or
+                keyframe_path == self.keyframe_path):
+            return
+
+        self.removed.discard(keyframe_path)
+        self.dependents.pop(keyframe_path, None)
+        os.remove(keyframe_path)
+
+
+def is_delta_checkpoint(path):
+    """ Returns a boolean indicating whether the file is a delta checkpoint """
+    return zipfile.is_zipfile(path)
+
+
+def load_delta(path):
+    """ Rebuilds the state dictionary of a delta checkpoint from its keyframe """
+    with np.load(path) as planes:
+        keyframe_path = os.path.join(os.path.dirname(path), str(planes[KEYFRAME_KEY]))
+        keyframe = uflat.load(keyframe_path)
+
+        state_dict = OrderedDict()
+        for name, tensor in keyframe.items():
+            array = tensor.numpy()
+            bits = _bits(array) ^ _from_planes(planes[name], array.dtype.itemsize, array.shape)
+            bits = np.asarray(bits)                             # XOR-ing 0-d arrays gives a scalar
+            state_dict[name] = torch.from_numpy(bits.view(array.dtype))
+
+    return state_dict
+
+
+def load_checkpoint(path):
+    """ Loads a checkpoint of any format: flat (memory-mapped), delta, or pickled state dictionary """
+    if uflat.is_flat_checkpoint(path):
+        return uflat.load(path)
+
+    if is_delta_checkpoint(path):
+        return load_delta(path)
+
+    with open(path, 'rb') as model_file:
+        return pickle.load(model_file)
+
+
+# *****************************************
+# Helper functions for the deltas
+# *****************************************
+
+def _bits(array):
+    """ Returns the raw bits of the array, as unsigned integers of the same size """
+    return array.view(np.dtype(f'u{array.dtype.itemsize}'))
+
+
+def _to_planes(bits):
+    """ Splits the integers into byte planes: all the first bytes, then all the second bytes, ... """
+    return np.asarray(bits).reshape(-1).view(np.uint8).reshape(-1, bits.dtype.itemsize).T.copy()
+
+
+def _from_planes(planes, itemsize, shape):
+    """ Inverse of _to_planes() """
+    return planes.T.copy().view(np.dtype(f'u{itemsize}')).reshape(shape)
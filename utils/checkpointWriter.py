@@ -0,0 +1,161 @@
+# This module contains the writer that dumps the checkpoints to disk in background
+
+import os
+import glob
+import queue
+import bisect
+import threading
+
+import utils.flatCheckpoint as uflat
+import utils.profiler as uprof
+
+
+class CheckpointWriter:
+    """ Writes the checkpoints on a separate thread and only keeps the most recent and the best ones """
+
+    # Kinds of jobs of the writer thread
+    SAVE_JOB = 'save'
+    EXPECT_JOB = 'expect'
+    SCORE_JOB = 'score'
+
+    def __init__(self, keep_last, keep_best, write_fn=uflat.write, remove_fn=os.remove, checkpoints=(), scores=None,
+                 saved_episodes=None):
+        """
+        keep_last:   Number of most recent checkpoints to keep (0 keeps all of them)
+        keep_best:   Number of checkpoints with the highest showdown win rates to keep on top of those
+        write_fn:    Function (path, state_dict) that writes one checkpoint and returns the path it was written to
+        remove_fn:   Function (path) that deletes one checkpoint
+        checkpoints: (episode, path) of the checkpoints already on disk, oldest first (e.g. those of a resumed run)
+        scores:      Episode of a checkpoint -> Showdown win rate, for those of the checkpoints that were scored
+        saved_episodes: Episodes all the checkpoints were saved at (pruned or not), oldest first. Defaults to those of
+                     the checkpoints on disk
+        """
+        self.keep_last = keep_last
+        self.keep_best = keep_best
+        self.write_fn = write_fn
+        self.remove_fn = remove_fn
+        self.checkpoints = list(checkpoints)    # (episode, path) of the checkpoints on disk, oldest first
+        self.scores = {}                # Path of the checkpoint -> Showdown win rate
+        self.saved_episodes = list(saved_episodes if saved_episodes is not None else (e for e, _ in checkpoints))
+        self.pending = set()            # Episodes of the showdowns whose results haven't come yet
+        self.jobs = queue.Queue()       # Unbounded, the training thread must never wait on the disk
+        self.thread = threading.Thread(target=self._run, name='CheckpointWriter', daemon=True)
+
+        # The checkpoints already on disk are kept (or not) just like the ones written from now on
+        for episode, path in self.checkpoints:
+            if scores and episode in scores:
+                self.scores[path] = scores[episode]
+        self._prune()
+
+        self.thread.start()
+
+    def submit(self, episode, path, state_dict):
+        """ Queues the checkpoint for writing. The state dictionary must not be modified afterwards """
+        self.jobs.put((self.SAVE_JOB, episode, path, state_dict))
+
+    def expect_score(self, episode):
+        """ Announces a showdown taken at the episode whose result comes later. Till then, the checkpoint it scores
+            and the more recent ones are kept
+        """
+        self.jobs.put((self.EXPECT_JOB, episode))
+
+    def record_score(self, episode, win_rate):
+        """ Attributes the win rate of a showdown taken at the episode to the latest checkpoint saved till then """
+        self.jobs.put((self.SCORE_JOB, episode, win_rate))
+
+    def close(self):
+        """ Writes the pending checkpoints and stops the writer thread """
+        self.jobs.put(None)     # Sentinel -- Marks the end of the jobs
+        self.thread.join()
+
+    def _run(self):
+        """ Entry point of the writer thread """
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                # The showdowns still expected were cancelled, they no longer hold any checkpoint back
+                self.pending.clear()
+                self._prune()
+                break
+
+            if job[0] == self.SAVE_JOB:
+                self._save(*job[1:])
+            elif job[0] == self.EXPECT_JOB:
+                self.pending.add(job[1])
+            else:
+                self._score(*job[1:])
+
+            self._prune()
+
+    def _save(self, episode, path, state_dict):
+        """ Writes the checkpoint to disk """
+        self.saved_episodes.append(episode)     # Even if it fails, so that its showdown doesn't score an older one
+        try:
+            with uprof.phase(uprof.PHASE_CHECKPOINT_WRITE):
+                path = self.write_fn(path, state_dict)
+            self.checkpoints.append((episode, path))
+        except OSError:
+            print(f'WARNING: Unable to save the checkpoint {path}')
+
+    def _score(self, episode, win_rate):
+        """ Records the win rate of the latest checkpoint saved at or before the episode. It's dropped if that
+            checkpoint is gone already
+        """
+        self.pending.discard(episode)
+        scored = scored_checkpoint(self.saved_episodes, episode)
+        for saved_at, path in self.checkpoints:
+            if saved_at == scored:
+                self.scores[path] = win_rate
+
+    def _prune(self):
+        """ Deletes every checkpoint that is neither among the most recent nor among the best ones """
+        if self.keep_last <= 0:
+            return
+
+        recent = {path for _, path in self.checkpoints[-self.keep_last:]}
+        ranked = sorted(self.scores, key=self.scores.get, reverse=True)
+        best = set(ranked[:self.keep_best])
+
+        # The checkpoints the expected showdowns may score can't be told apart from the others yet
+        awaited = None
+        if self.pending:
+            oldest = min(self.pending)
+            awaited = scored_checkpoint(self.saved_episodes, oldest)
+            awaited = oldest if awaited is None else awaited
+
+        kept = []
+        for episode, path in self.checkpoints:
+            if path in recent or path in best or (awaited is not None and episode >= awaited):
+                kept.append((episode, path))
+                continue
+
+            try:
+                self.remove_fn(path)
+            except OSError:
+                print(f'WARNING: Unable to delete the checkpoint {path}')
+            self.scores.pop(path, None)
+
+        self.checkpoints = kept
+
+
+def scored_checkpoint(saved_episodes, episode):
+    """ Returns the episode of the checkpoint scored by a showdown taken at the episode: the latest one saved at or
+        before it (None if there is none). saved_episodes are those of all the checkpoints saved, oldest first
+    """
+    n_saved_before = bisect.bisect_right(saved_episodes, episode)
+    return saved_episodes[n_saved_before - 1] if n_saved_before > 0 else None
+
+
+def list_checkpoints(directory):
+    """ Returns (episode, path) of the checkpoints in the directory, oldest first. They are named
+        <acronym>_<episode>_<YYYYmmdd-HHMMSS>.<extension> (see Agent.save())
+    """
+    checkpoints = []
+    for path in glob.glob(os.path.join(directory, '*')):
+        name, extension = os.path.splitext(os.path.basename(path))
+        parts = name.rsplit('_', 2)
+        if extension == '.tmp' or len(parts) != 3 or not parts[1].isdigit():
+            continue
+        checkpoints.append((int(parts[1]), parts[2], path))
+
+    return [(episode, path) for episode, _, path in sorted(checkpoints)]
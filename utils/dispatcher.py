@@ -5,6 +5,7 @@ import config.environmentConfig as ecfg
 import utils.nn as unn              # Module for building a neural network
 import utils.trainer as utrainer    # Module for training
 import utils.foldersPrep as fprep   # Module for creating the directories
+import utils.offlineTraining as uoffline    # Module for pretraining on recorded data
 
 
 # *****************************************
@@ -14,6 +15,12 @@ import utils.foldersPrep as fprep   # Module for creating the directories
 # *****************************************
 def dispatcher(configData, worker):
 
+    # When resuming a run, its own configuration takes over (the keys it predates keep the current values)
+    resume_dir = configData[acfg.KEY_RESUME_DIR]
+    if resume_dir is not None:
+        configData = {**configData, **fprep.PrepareFolders.load_config(resume_dir)}
+        configData[acfg.KEY_RESUME_DIR] = resume_dir
+
     env_name = configData[acfg.KEY_ENVIRONMENT]
     env_workspace = configData[acfg.KEY_WORKSPACE]
     n_agents = configData[acfg.KEY_NUM_AGENTS]
@@ -26,8 +33,9 @@ def dispatcher(configData, worker):
     splay_delta = configData[acfg.KEY_SELF_PLAY_DELTA]
 
     # Create the directories, if possible
-    folder_prep = fprep.PrepareFolders(env_name=env_name, path=env_workspace)
+    folder_prep = fprep.PrepareFolders(env_name=env_name, path=env_workspace, existing_root=resume_dir)
     folder_prep.prepare()
+    folder_prep.save_config(configData)
 
     # Update the tensorboard link on the GUI by sending a signal
     if folder_prep.get_log_dir() is not None:
@@ -53,9 +61,21 @@ def dispatcher(configData, worker):
                         model_dir=folder_prep.get_chkpt_dir(),
                         log_dir=folder_prep.get_log_dir())
 
+    # Pretrain on the recorded data, if any. A resumed run has been pretrained already
+    pretraining = None
+    if configData[acfg.KEY_PRETRAIN_DATA] and resume_dir is None:
+        pretraining = uoffline.pretrain(agent,
+                                        paths=configData[acfg.KEY_PRETRAIN_DATA],
+                                        n_epochs=configData[acfg.KEY_PRETRAIN_EPOCHS],
+                                        n_workers=max(0, configData[acfg.KEY_NUM_CORES] - 1),
+                                        need_to_stop=lambda: not worker.is_active())
+
     trainer = utrainer.Trainer(worker_thread=worker,
                                config_data=configData,
-                               agent=agent)
+                               agent=agent,
+                               resume_dir=folder_prep.get_resume_dir(),
+                               run_dir=folder_prep.get_root_dir(),
+                               pretraining=pretraining)
 
     # Everything is ready. Start the training loop
     trainer.start()
@@ -0,0 +1,196 @@
+# This module contains the background evaluator that runs showdowns alongside training
+
+import copy
+import math
+import queue
+import threading
+import torch
+
+import utils.profiler as uprof
+
+
+class BackgroundEvaluator:
+    """ Runs showdowns against a frozen snapshot of the agent on a separate thread """
+
+    # Keys of a (frozen) snapshot
+    NETWORK_KEY = 'network'
+    EPSILON_KEY = 'epsilon'
+    SELF_PLAY_KEY = 'self_play'
+
+    def __init__(self, agent, max_pending, seeds=None):
+        """
+        agent:       The agent that is being trained (it is never touched from the evaluation thread)
+        max_pending: Maximum number of evaluations waiting to be run. Submissions beyond that are dropped
+        seeds:       Seeds of the evaluation episodes (None for fresh randomness in every showdown)
+        """
+        self.eval_agent = self._build_eval_agent(agent)     # Private copy of the agent, with its own environment
+        self.seeds = seeds                                  # Every showdown plays the same (seeded) episodes
+        self.jobs = queue.Queue(maxsize=max_pending)        # Snapshots waiting to be evaluated
+        self.results = queue.Queue()                        # Finished evaluations waiting to be logged
+        self.cancelled = threading.Event()                  # Set to abandon the showdown being run
+        self.eval_agent.set_stop_check(self.cancelled.is_set)
+        self.thread = threading.Thread(target=self._run, name='Evaluator', daemon=True)
+
+        self.thread.start()
+
+    def submit(self, episode, agent, n_episodes, ci_width=0):
+        """ Freezes the current weights of the agent and queues a showdown of n_episodes for them.
+            Returns False if the queue is full and the evaluation had to be dropped
+        """
+        # Only the training thread submits, so a slot that's free now is still free once the snapshot is taken
+        if self.jobs.full():
+            return False
+
+        job = (episode, self.take_snapshot(agent), n_episodes, ci_width)
+        try:
+            self.jobs.put_nowait(job)
+        except queue.Full:
+            return False
+
+        return True
+
+    def poll(self):
+        """ Returns the list of (episode, win_rate, avg_reward, avg_steps, n_played) of the finished evaluations """
+        finished = []
+        while True:
+            try:
+                finished.append(self.results.get_nowait())
+            except queue.Empty:
+                break
+
+        return finished
+
+    def close(self, wait=True):
+        """ Stops the evaluation thread. If wait is set, the pending evaluations are run before stopping,
+            otherwise they are dropped and the one being run is abandoned (within a step)
+        """
+        if not wait:
+            self.cancelled.set()
+            self._drop_pending()
+
+        self.jobs.put(None)     # Sentinel -- Marks the end of the jobs
+        self.thread.join()
+
+    @classmethod
+    def take_snapshot(cls, agent):
+        """ Returns a copy of everything the showdown depends on, i.e. the weights of our agent and its clones,
+            and the exploration rate of our agent (for the agents that explore)
+        """
+        network = {k: v.detach().clone() for k, v in agent.get_network().state_dict().items()}
+
+        # The clones are never trained (they are replaced by new copies on updates)
+        # so the self-play state references their weights as they are
+        snapshot = {
+            cls.NETWORK_KEY: network,
+            cls.EPSILON_KEY: getattr(agent, 'epsilon', None),
+            cls.SELF_PLAY_KEY: agent.get_environment().getState()
+        }
+
+        return snapshot
+
+    def _run(self):
+        """ Entry point of the evaluation thread """
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                break
+
+            episode, snapshot, n_episodes, ci_width = job
+            self._load_snapshot(snapshot)
+
+            with torch.no_grad():
+                results = showdown(self.eval_agent, n_episodes, ci_width, self.seeds, self.cancelled.is_set)
+
+            if not self.cancelled.is_set():
+                self.results.put((episode, *results))
+
+    def _load_snapshot(self, snapshot):
+        """ Loads the weights of the snapshot into the evaluation agent and its opponents """
+        self.eval_agent.get_network().load_state_dict(snapshot[self.NETWORK_KEY])
+        if snapshot[self.EPSILON_KEY] is not None:
+            self.eval_agent.epsilon = snapshot[self.EPSILON_KEY]
+        self.eval_agent.get_environment().setState(snapshot[self.SELF_PLAY_KEY])
+
+    def _drop_pending(self):
+        """ Removes the evaluations that have not been started yet """
+        while True:
+            try:
+                self.jobs.get_nowait()
+            except queue.Empty:
+                break
+
+    @staticmethod
+    def _build_eval_agent(agent):
+        """ Builds a fresh agent of the same kind, on a fresh environment of the same kind """
+        env = agent.get_environment()
+        eval_env = type(env)(env.getNumAgents(), env.n_warmup, env.delta)
+        eval_agent = type(agent)(env=eval_env,
+                                 network=copy.deepcopy(agent.get_network()),
+                                 optimizer=None,
+                                 model_dir=None,
+                                 log_dir=None)
+
+        eval_env.setAgents(eval_agent)      # The weights of the clones are loaded from the snapshots later on
+        return eval_agent
+
+
+# Constants for the sequential (early-stopping) showdowns
+SEQUENTIAL_MIN_EPISODES = 10    # Never stop before these many episodes, the interval is unreliable for tiny samples
+SEQUENTIAL_Z_SCORE = 1.96       # Z-score of the confidence interval on the win rate (95%)
+
+
+def showdown(agent, n_episodes, ci_width=0, seeds=None, need_to_stop=None):
+    """ Perform a showdown of at most n_episodes against the opponents.
+        If ci_width is positive, the showdown stops as soon as the Wilson interval on the win rate (a fraction
+        in [0,1]) gets narrower than ci_width. If seeds are given, episode i is played on seeds[i].
+        If need_to_stop returns True, the showdown is abandoned (the unfinished episode doesn't count).
+        Returns (win_rate, avg_reward, avg_steps, n_played)
+    """
+    env = agent.get_environment()
+    n_wins = 0
+    avg_reward = 0
+    avg_steps = 0
+    n_played = 0
+
+    with uprof.phase(uprof.PHASE_SHOWDOWN):
+        while n_played < n_episodes:
+            if seeds is not None:
+                env.setNextSeed(seeds[n_played])
+
+            total_reward, total_steps, won = agent.play_one_episode(eval=True)
+            if need_to_stop is not None and need_to_stop():
+                break
+
+            # Now update the statistics
+            if won:
+                n_wins += 1
+            avg_reward += total_reward
+            avg_steps += total_steps
+            n_played += 1
+
+            # Stop early if the win rate is already known precisely enough
+            if ci_width > 0 and n_played >= SEQUENTIAL_MIN_EPISODES:
+                lower, upper = wilson_interval(n_wins, n_played, SEQUENTIAL_Z_SCORE)
+                if upper - lower < ci_width:
+                    break
+
+    if n_played == 0:
+        return 0, 0, 0, 0
+
+    win_rate = (n_wins / n_played) * 100
+    avg_reward = avg_reward / n_played
+    avg_steps = avg_steps / n_played
+
+    return win_rate, avg_reward, avg_steps, n_played
+
+
+def wilson_interval(n_wins, n_played, z):
+    """ Returns the (lower, upper) bounds of the Wilson score interval on the win rate """
+    p = n_wins / n_played
+    z_sq = z * z
+    denominator = 1 + z_sq / n_played
+
+    center = (p + z_sq / (2 * n_played)) / denominator
+    half_width = z * math.sqrt(p * (1 - p) / n_played + z_sq / (4 * n_played * n_played)) / denominator
+
+    return center - half_width, center + half_width
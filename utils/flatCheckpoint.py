@@ -0,0 +1,102 @@
+# This module contains the flat (memory-mappable) checkpoint format
+#
+# Layout of a flat checkpoint:
+#   MAGIC (8 bytes) | Length of the header (8 bytes, little-endian) | Header (JSON) | Padding | Raw tensors
+#
+# The header lists the name, dtype, shape and offset (from the start of the file) of every tensor.
+# Each tensor is stored contiguously, aligned to ALIGNMENT bytes, so that loading it is only a matter of
+# mapping the file and viewing the right pages -- no unpickling, no copy. As the pages come from the OS
+# page cache, every process mapping the same checkpoint shares the same physical memory
+
+import os
+import json
+import mmap
+import struct
+from collections import OrderedDict
+
+import numpy as np
+import torch
+
+
+MAGIC = b'KSLFLAT1'
+EXTENSION = '.flat'
+ALIGNMENT = 64
+
+# Keys of the header
+TENSORS_KEY = 'tensors'
+NAME_KEY = 'name'
+DTYPE_KEY = 'dtype'
+SHAPE_KEY = 'shape'
+OFFSET_KEY = 'offset'
+
+
+def write(path, state_dict):
+    """ Writes the state dictionary to path in the flat format. Written to a temporary file first and renamed,
+        so a crash never leaves a truncated checkpoint behind. Returns the path
+    """
+    arrays = [(name, tensor.detach().cpu().contiguous().numpy()) for name, tensor in state_dict.items()]
+
+    # The header depends on the offsets, which depend on the length of the header. Reserve a generous length
+    # for the offsets first (they only get shorter when the real ones are filled in), then pad the header
+    entries = [{NAME_KEY: name, DTYPE_KEY: array.dtype.str, SHAPE_KEY: list(array.shape), OFFSET_KEY: 2 ** 62}
+               for name, array in arrays]
+    header_len = len(json.dumps({TENSORS_KEY: entries}).encode())
+
+    offset = _align(len(MAGIC) + 8 + header_len)
+    for entry, (_, array) in zip(entries, arrays):
+        entry[OFFSET_KEY] = offset
+        offset = _align(offset + array.nbytes)
+
+    header = json.dumps({TENSORS_KEY: entries}).encode().ljust(header_len)
+
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as model_file:
+        model_file.write(MAGIC)
+        model_file.write(struct.pack('<Q', header_len))
+        model_file.write(header)
+
+        for entry, (_, array) in zip(entries, arrays):
+            model_file.write(b'\0' * (entry[OFFSET_KEY] - model_file.tell()))
+            model_file.write(array.tobytes())
+
+        model_file.flush()
+        os.fsync(model_file.fileno())
+
+    os.replace(tmp_path, path)
+    return path
+
+
+def load(path):
+    """ Maps the flat checkpoint into memory and returns its state dictionary, whose tensors are views over
+        the mapped pages. The mapping is private (copy-on-write): modifying a tensor never changes the file
+    """
+    with open(path, 'rb') as model_file:
+        if model_file.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f'"{path}" is not a flat checkpoint')
+        header_len = struct.unpack('<Q', model_file.read(8))[0]
+        header = json.loads(model_file.read(header_len))
+
+        # The mapping stays alive as long as the tensors viewing it do
+        mapped = mmap.mmap(model_file.fileno(), 0, access=mmap.ACCESS_COPY)
+
+    state_dict = OrderedDict()
+    for entry in header[TENSORS_KEY]:
+        dtype = np.dtype(entry[DTYPE_KEY])
+        shape = entry[SHAPE_KEY]
+        count = int(np.prod(shape))
+
+        array = np.frombuffer(mapped, dtype=dtype, count=count, offset=entry[OFFSET_KEY]).reshape(shape)
+        state_dict[entry[NAME_KEY]] = torch.from_numpy(array)     # Writable (copy-on-write), so no copy is made
+
+    return state_dict
+
+
+def is_flat_checkpoint(path):
+    """ Returns a boolean indicating whether the file is a flat checkpoint """
+    with open(path, 'rb') as model_file:
+        return model_file.read(len(MAGIC)) == MAGIC
+
+
+def _align(offset):
+    """ Rounds the offset up to the next multiple of ALIGNMENT """
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
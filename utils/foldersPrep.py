@@ -2,21 +2,29 @@
 # and model checkpoints periodically
 
 import os
+import json
 import time
 
+from utils.resumeCheckpoint import ResumeCheckpoint
+
 class PrepareFolders:
 
     # Keys for directory names (also used as directory names, except ROOT_DIR)
     ROOT_DIR = 'root_dir'       # Directory storing the below two folders
     LOG_DIR = 'logs'            # Directory storing the TensorBoard logs
     CHKPT_DIR = 'saved_models'  # Directory storing the models at checkpoints
+    RESUME_DIR = 'resume'       # Directory storing the full state of the run, to resume it from
+    CONFIG_FILE = 'run_config.json'  # File storing the configuration of the run
 
-    def __init__(self, env_name, path):
+    def __init__(self, env_name, path, existing_root=None):
+        """ If existing_root is given, the directories of that (previous) run are reused instead """
         self.name = env_name
         self.path = path
+        self.existing_root = existing_root
         self.root_dir = None
         self.log_dir = None
         self.chkpt_dir = None
+        self.resume_dir = None
 
         currTime = time.asctime()                               # Day Month Date Time Year
         parentDirName = f'{self.name}-{currTime}'               # EnvironmentName-{Day Month Date ...etc }
@@ -38,18 +46,64 @@ class PrepareFolders:
         return self.chkpt_dir
 
 
+    def get_resume_dir(self):
+        """ Returns the directory storing the state to resume the run from """
+        return self.resume_dir
+
+
     def prepare(self):
         """ Prepares all the directories """
         self.create_root_dir()
         self.create_log_dir()
         self.create_checkpoint_dir()
+        self.create_resume_dir()
+
+
+    def save_config(self, config_data):
+        """ Saves the configuration of the run in the root directory (needed to resume it later on) """
+        if self.root_dir is None:
+            return
+
+        config_path = os.path.join(self.root_dir, self.CONFIG_FILE)
+        try:
+            with open(config_path, 'w') as config_file:
+                json.dump(config_data, config_file, indent=2)
+        except OSError:
+            print(f'WARNING: Unable to save the configuration to {config_path}')
+
+
+    @classmethod
+    def load_config(cls, root_dir):
+        """ Loads the configuration of the run stored in the root directory """
+        with open(os.path.join(root_dir, cls.CONFIG_FILE)) as config_file:
+            return json.load(config_file)
+
+
+    @classmethod
+    def check_resumable(cls, root_dir):
+        """ Returns the reasons why the run in the root directory can't be resumed (an empty list if it can) """
+        problems = []
+        try:
+            cls.load_config(root_dir)
+        except (OSError, ValueError):
+            problems.append(f'No readable configuration ({cls.CONFIG_FILE}) in "{root_dir}" -- '
+                            f'Is it the folder of a run?')
+
+        state_path = os.path.join(root_dir, cls.RESUME_DIR, ResumeCheckpoint.STATE_FILE)
+        if not os.path.isfile(state_path):
+            problems.append(f'No state to resume from ({cls.RESUME_DIR}/{ResumeCheckpoint.STATE_FILE}) in "{root_dir}"')
+
+        return problems
 
 
     def create_root_dir(self):
         """ Creates the root directory for storing other information """
         root_path = os.path.join(self.path, self.parentDirName)  # Path to the directory where we'll be working
+        if self.existing_root is not None:
+            root_path = self.existing_root
+
         try:
-            os.mkdir(root_path)
+            os.makedirs(root_path, exist_ok=(self.existing_root is not None))
             self.root_dir = root_path
         except OSError:
             print(f'WARNING: Unable to create root directory {root_path} -- Other directories will also not be created')
@@ -63,7 +117,7 @@ class PrepareFolders:
 
         logs_path = os.path.join(self.root_dir, self.LOG_DIR)  # Path to the directory for storing TensorBoard logs
         try:
-            os.mkdir(logs_path)
+            os.makedirs(logs_path, exist_ok=(self.existing_root is not None))
             self.log_dir = logs_path
         except OSError:
             print(f'WARNING: Unable to create log directory {logs_path}')
@@ -78,7 +132,21 @@ class PrepareFolders:
 
         chkpt_path = os.path.join(self.root_dir, self.CHKPT_DIR)  # Path to the directory for storing models
         try:
-            os.mkdir(chkpt_path)
+            os.makedirs(chkpt_path, exist_ok=(self.existing_root is not None))
             self.chkpt_dir = chkpt_path
         except OSError:
-            print(f'WARNING: Unable to create checkpoint directory {chkpt_path}')
\ No newline at end of file
+            print(f'WARNING: Unable to create checkpoint directory {chkpt_path}')
+
+
+    def create_resume_dir(self):
+        """ Creates the directory storing the state to resume from, within the root directory """
+        if self.root_dir is None:
+            print('WARNING: Root directory is not present. Skipping creation of resume directory')
+            return
+
+        resume_path = os.path.join(self.root_dir, self.RESUME_DIR)  # Path to the directory for storing the state
+        try:
+            os.makedirs(resume_path, exist_ok=(self.existing_root is not None))
+            self.resume_dir = resume_path
+        except OSError:
+            print(f'WARNING: Unable to create resume directory {resume_path}')
\ No newline at end of file
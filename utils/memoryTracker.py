@@ -0,0 +1,112 @@
+# This module contains the tracker of the memory used by a training run
+
+import os
+import sys
+import tracemalloc
+from collections import deque
+import numpy as np
+
+try:
+    import resource         # Not available on Windows
+except ImportError:
+    resource = None
+
+
+class MemoryTracker:
+    """ Samples the resident memory of the process and the allocation sites holding the most memory (through
+        tracemalloc), and watches for steady growth once the run should have reached a steady state, i.e.
+        once the replay buffer is full. Allocations are traced from the moment it is created, which slows
+        allocations down noticeably -- It's meant to be turned on when hunting for a leak
+    """
+
+    N_FRAMES = 1                        # Frames stored per allocation (the allocation site only, the cheapest)
+    N_TOP_SITES = 10                    # Number of allocation sites reported per sample
+    GROWTH_WINDOW = 8                   # Number of steady-state samples the growth is measured over
+    GROWTH_WARN_MB_PER_1K = 50          # Growth (MB per 1000 episodes) beyond which the run is considered leaking
+
+    # Keys of a sample
+    EPISODE_KEY = 'episode'
+    RSS_KEY = 'rss_mb'
+    TRACED_KEY = 'traced_mb'
+    TOP_SITES_KEY = 'top_sites'         # List of (site, MB) of the sites holding the most memory
+    GROWTH_KEY = 'growth_mb_per_1k'     # Growth over the recent steady-state samples (None till there are enough)
+
+    def __init__(self):
+        self.steady_samples = deque(maxlen=self.GROWTH_WINDOW)     # (episode, RSS) since the steady state
+        self.baseline = None                                        # Snapshot of the allocations at steady state
+        self.started = not tracemalloc.is_tracing()                 # Was the tracing started here ?
+
+        if self.started:
+            tracemalloc.start(self.N_FRAMES)
+
+    def sample(self, episode, steady):
+        """ Takes a sample of the memory after the episode. steady tells whether the run is expected to be in
+            its steady state (e.g. the replay buffer is full), from when the growth is watched. Returns the sample
+        """
+        snapshot = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),    # Not the bookkeeping of tracemalloc itself
+        ])
+        rss_mb = get_rss_bytes() / 2**20
+        traced_mb = tracemalloc.get_traced_memory()[0] / 2**20
+
+        top_stats = snapshot.statistics('lineno')[:self.N_TOP_SITES]
+        sample = {
+            self.EPISODE_KEY: episode,
+            self.RSS_KEY: rss_mb,
+            self.TRACED_KEY: traced_mb,
+            self.TOP_SITES_KEY: [(self._site_name(stat), stat.size / 2**20) for stat in top_stats],
+            self.GROWTH_KEY: None
+        }
+
+        if steady:
+            if self.baseline is None:
+                self.baseline = snapshot
+            self.steady_samples.append((episode, rss_mb))
+            sample[self.GROWTH_KEY] = self._check_growth(snapshot)
+
+        return sample
+
+    def close(self):
+        """ Stops tracing the allocations (unless someone else started it) """
+        if self.started:
+            tracemalloc.stop()
+
+    def _check_growth(self, snapshot):
+        """ Returns the growth of the memory over the recent steady-state samples (MB per 1000 episodes),
+            warning about it (along with the sites that grew the most) if it looks like a leak
+        """
+        if len(self.steady_samples) < self.GROWTH_WINDOW:
+            return None
+
+        episodes, rss = zip(*self.steady_samples)
+        growth = np.polyfit(episodes, rss, deg=1)[0] * 1000
+
+        if growth > self.GROWTH_WARN_MB_PER_1K:
+            print(f'WARNING: Memory keeps growing after the steady state -- {growth:.1f} MB per 1000 episodes '
+                  f'(RSS {rss[-1]:.1f} MB at episode {episodes[-1]}). Sites that grew the most since then:')
+            for stat in snapshot.compare_to(self.baseline, 'lineno')[:self.N_TOP_SITES]:
+                print(f'    {self._site_name(stat)}: {stat.size_diff / 2**20:+.2f} MB')
+
+            self.steady_samples.clear()     # Warn again only once a fresh window shows it too
+
+        return growth
+
+    @staticmethod
+    def _site_name(stat):
+        """ Returns the allocation site of the statistic as file:line """
+        frame = stat.traceback[0]
+        return f'{os.path.basename(frame.filename)}:{frame.lineno}'
+
+
+def get_rss_bytes():
+    """ Returns the resident memory of the process (its peak, where the current one can't be read) """
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        if resource is None:
+            return 0
+
+        # ru_maxrss is in kilobytes on Linux, but in bytes on macOS
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return max_rss if sys.platform == 'darwin' else max_rss * 1024
@@ -0,0 +1,85 @@
+# This module contains the aggregator of the metrics logged to tensorboard
+
+import queue
+import threading
+import numpy as np
+from torch.utils.tensorboard import SummaryWriter
+
+import utils.profiler as uprof
+
+
+class MetricsAggregator:
+    """ Accumulates the per-episode metrics and logs windowed summaries of them (mean, min, max, count)
+        instead of every single value. The summary writer is fed from a background thread, so that the
+        training loop doesn't spend its time serializing and flushing events
+    """
+
+    FLUSH_SECS = 30                     # How often the events are flushed to disk
+    SUMMARIES = ('mean', 'min', 'max', 'count')
+
+    def __init__(self, log_dir, window, purge_step=None):
+        """
+        log_dir:    Directory to write the event files into
+        window:     Number of values summarized at a time (1 or less logs every value as it is)
+        purge_step: Step from which the previously logged events are discarded (used when resuming)
+        """
+        self.window = max(window, 1)
+        self.values = {}                # Tag -> Preallocated array of the values of the current window
+        self.counts = {}                # Tag -> Number of values in the current window
+        self.steps = {}                 # Tag -> Step of the latest value of the current window
+        self.events = queue.Queue()     # (tag, value, step) lists for the writer thread
+        self.writer = SummaryWriter(log_dir=log_dir, flush_secs=self.FLUSH_SECS, purge_step=purge_step)
+        self.thread = threading.Thread(target=self._run, name='MetricsWriter', daemon=True)
+
+        self.thread.start()
+
+    def record(self, tag, value, step):
+        """ Adds the value to the current window of the tag, logging its summary when the window is full """
+        if self.window == 1:
+            self.events.put([(tag, value, step)])
+            return
+
+        if tag not in self.values:
+            self.values[tag] = np.empty(self.window, dtype=np.float64)
+            self.counts[tag] = 0
+
+        self.values[tag][self.counts[tag]] = value
+        self.counts[tag] += 1
+        self.steps[tag] = step
+
+        if self.counts[tag] == self.window:
+            self._summarize(tag)
+
+    def log(self, tag, value, step):
+        """ Logs the value as it is (for the metrics that are too sparse to be summarized, e.g. showdowns) """
+        self.events.put([(tag, value, step)])
+
+    def close(self):
+        """ Logs the summaries of the incomplete windows, writes the pending events and closes the writer """
+        for tag, count in self.counts.items():
+            if count > 0:
+                self._summarize(tag)
+
+        self.events.put(None)   # Sentinel -- Marks the end of the events
+        self.thread.join()
+        self.writer.close()
+
+    def _summarize(self, tag):
+        """ Queues the summary of the current window of the tag and starts a new window """
+        values = self.values[tag][:self.counts[tag]]
+        step = self.steps[tag]
+        summary = (float(values.mean()), float(values.min()), float(values.max()), len(values))
+
+        self.events.put([(f'{tag}/{name}', value, step) for name, value in zip(self.SUMMARIES, summary)])
+        self.counts[tag] = 0
+
+    def _run(self):
+        """ Entry point of the writer thread """
+        while True:
+            events = self.events.get()
+            if events is None:
+                break
+
+            with uprof.phase(uprof.PHASE_LOGGING):
+                for tag, value, step in events:
+                    self.writer.add_scalar(tag, value, step)
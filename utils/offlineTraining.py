@@ -0,0 +1,211 @@
+# This module pretrains agents on existing data before (or instead of) playing against themselves
+#
+# The data can be trajectories recorded by earlier runs (see utils.trajectoryRecorder) and Kaggle Hungry Geese
+# episodes (the replay JSON files, as downloaded from Kaggle). The episodes are parsed step by step, so a large
+# file is never held in memory at once, and every goose of an episode contributes its own transitions, encoded
+# the same way the environment encodes them in training. The data is loaded by DataLoader workers, in background
+
+import os
+import re
+import glob
+import json
+import random
+import numpy as np
+import torch
+from torch.utils.data import IterableDataset, ChainDataset, DataLoader, get_worker_info
+from kaggle_environments.envs.hungry_geese import hungry_geese
+
+import utils.trajectoryRecorder as utraj
+from environments.kaggle.hungry_geese.hungryGeese import HungryGeese
+
+
+BATCH_SIZE = 256
+SHUFFLE_BUFFER = 20_000         # Transitions mixed together before being handed out (the steps are correlated)
+READ_SIZE = 1 << 20             # Characters of an episode file read at once
+EPISODE_EXTENSION = '.json'
+
+ACTION_INDICES = {a.name: i for i, a in enumerate(hungry_geese.Action)}     # Same order as HungryGeese.actions
+_STEPS_START = re.compile(r'"steps"\s*:\s*\[')
+
+
+def iter_episode_steps(path, read_size=READ_SIZE):
+    """ Yields the steps of a Kaggle episode file one at a time (the list of the states of all the agents),
+        decoding them straight from the file as they're read
+    """
+    decoder = json.JSONDecoder()
+    with open(path) as episode_file:
+        buffer = ''
+        eof = False
+
+        # Skip everything up to the list of steps
+        match = None
+        while match is None:
+            chunk = episode_file.read(read_size)
+            if not chunk:
+                raise ValueError(f'No steps found in "{path}"')
+            buffer = buffer[-64:] + chunk       # The key may straddle two reads
+            match = _STEPS_START.search(buffer)
+        buffer = buffer[match.end():]
+
+        while True:
+            pos = 0
+            while pos < len(buffer) and buffer[pos] in ' \t\r\n,':
+                pos += 1
+
+            if pos < len(buffer) and buffer[pos] == ']':
+                return                          # End of the list of steps
+
+            try:
+                if pos == len(buffer):
+                    raise json.JSONDecodeError('Incomplete step', buffer, pos)
+                step, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise ValueError(f'Truncated or malformed steps in "{path}"')
+
+                chunk = episode_file.read(read_size)
+                eof = not chunk
+                buffer = buffer[pos:] + chunk
+                continue
+
+            yield step
+            buffer = buffer[end:]
+
+
+def iter_episode_transitions(path, n_cells):
+    """ Yields (state, action, reward, next_state, done) of every goose of the Kaggle episode, every step.
+        The action taken on a step is the one recorded on the step after it, along with its outcome
+    """
+    prev_step = None
+    prev_boards = None
+
+    for step in iter_episode_steps(path):
+        obs = step[0]['observation']            # Only the first agent carries the state of the board
+        boards = np.zeros((len(step), n_cells), dtype=np.float32)
+        for i in range(len(step)):
+            HungryGeese.encode_board(boards[i], obs['geese'], obs['food'], i)
+
+        if prev_step is not None:
+            for i, agent_state in enumerate(step):
+                if prev_step[i]['status'] != 'ACTIVE' or agent_state['action'] not in ACTION_INDICES:
+                    continue
+
+                action = ACTION_INDICES[agent_state['action']]
+                reward = HungryGeese.tweak_reward(agent_state['reward'] or 0)
+                done = agent_state['status'] != 'ACTIVE'
+                yield prev_boards[i], action, np.float32(reward), boards[i], done
+
+        prev_step = step
+        prev_boards = boards
+
+
+class EpisodesDataset(IterableDataset):
+    """ Transitions of Kaggle episode files. Every worker parses its own share of the files """
+
+    def __init__(self, paths, n_cells):
+        self.paths = sorted(paths)
+        self.n_cells = n_cells
+
+    def __iter__(self):
+        paths = _worker_share(self.paths)
+        random.shuffle(paths)
+
+        transitions = (t for path in paths for t in iter_episode_transitions(path, self.n_cells))
+        return _shuffled(transitions, SHUFFLE_BUFFER)
+
+
+class TrajectoryDataset(IterableDataset):
+    """ Transitions of a recording of trajectories. Every worker maps its own share of the chunks """
+
+    def __init__(self, directory):
+        self.directory = directory      # The chunks are mapped in the workers, a mapping isn't worth pickling
+
+    def __iter__(self):
+        chunk_paths = _worker_share(utraj.list_chunks(self.directory))
+        random.shuffle(chunk_paths)
+
+        return _shuffled(self._iter_chunks(chunk_paths), SHUFFLE_BUFFER)
+
+    @staticmethod
+    def _iter_chunks(chunk_paths):
+        for path in chunk_paths:
+            reader = utraj.TrajectoryReader(os.path.dirname(path), [os.path.basename(path)])
+            states, actions, rewards, next_states, dones = reader.get_batch(np.arange(len(reader)))
+            yield from zip(states, actions, rewards, next_states, dones)
+
+
+def build_dataset(paths, n_cells):
+    """ Returns the dataset of all the data found at the paths: directories of recorded trajectories, episode files
+        and directories of episode files
+    """
+    datasets = []
+    episode_paths = []
+    for path in paths:
+        if os.path.isdir(path) and utraj.list_chunks(path):
+            datasets.append(TrajectoryDataset(path))
+        elif os.path.isdir(path):
+            episode_paths.extend(glob.glob(os.path.join(path, f'*{EPISODE_EXTENSION}')))
+        elif os.path.isfile(path):
+            episode_paths.append(path)
+        else:
+            print(f'WARNING: No data found at "{path}" -- Skipping it')
+
+    if episode_paths:
+        datasets.append(EpisodesDataset(episode_paths, n_cells))
+
+    return ChainDataset(datasets) if datasets else None
+
+
+def pretrain(agent, paths, n_epochs=1, n_workers=0, need_to_stop=None):
+    """ Trains the agent on the data found at the paths (see build_dataset()) for n_epochs, the data being loaded
+        by n_workers background processes (0 loads it in the caller). Returns (number of batches, mean loss), or
+        None if there was nothing to train on
+    """
+    if not agent.supports_offline_training():
+        print(f'WARNING: {agent.get_name()} can\'t be trained on recorded data -- Skipping the pretraining')
+        return None
+
+    dataset = build_dataset(paths, agent.get_environment().getObservationLength())
+    if dataset is None:
+        return None
+
+    loader = DataLoader(dataset, batch_size=BATCH_SIZE, num_workers=n_workers)
+    n_batches = 0
+    total_loss = 0
+    for _ in range(n_epochs):
+        for states, actions, rewards, next_states, dones in loader:
+            if need_to_stop is not None and need_to_stop():
+                break
+
+            total_loss += agent.train_on_batch(states, actions, rewards, next_states, dones)
+            n_batches += 1
+
+        # Cancelled -- No more epochs (each one would start the loading workers afresh)
+        if need_to_stop is not None and need_to_stop():
+            break
+
+    return (n_batches, total_loss / n_batches) if n_batches > 0 else None
+
+
+def _worker_share(items):
+    """ Returns the share of the items the current DataLoader worker is responsible for (all of them without one) """
+    worker_info = get_worker_info()
+    if worker_info is None:
+        return list(items)
+    return list(items[worker_info.id::worker_info.num_workers])
+
+
+def _shuffled(iterable, buffer_size):
+    """ Yields the items in a random order, mixing them within a buffer of buffer_size """
+    buffer = []
+    for item in iterable:
+        if len(buffer) < buffer_size:
+            buffer.append(item)
+            continue
+
+        i = random.randrange(buffer_size)
+        yield buffer[i]
+        buffer[i] = item
+
+    random.shuffle(buffer)
+    yield from buffer
@@ -0,0 +1,244 @@
+# This module contains the profiler of the phases of the training loop
+
+import os
+import json
+import time
+import threading
+
+
+# Phases of the training loop that are timed
+PHASE_ENV_STEP = 'env_step'
+PHASE_UPDATE_BOARD = 'update_board'
+PHASE_CLONE_PREDICT = 'clone_predict'
+PHASE_PREDICT_ACTION = 'predict_action'
+PHASE_TRAIN = 'train'
+PHASE_GRADIENT_UPDATE = 'gradient_update'
+PHASE_SHOWDOWN = 'showdown'
+PHASE_CHECKPOINT = 'checkpoint'
+PHASE_LOGGING = 'logging'
+PHASE_GUI_EMIT = 'gui_emit'
+PHASE_CHECKPOINT_WRITE = 'checkpoint_write'
+PHASE_RECORD = 'record'
+PHASE_OTHER = 'other'           # Time spent outside all the phases
+
+TRACE_FILE = 'trace.json'       # The timeline of a run, written into its logs directory
+
+
+class _NullPhase:
+    """ Handed out while profiling is disabled (or on other threads) -- Does nothing """
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_PHASE = _NullPhase()
+
+
+class _Phase:
+    """ Times one run of a phase and/or records it as a span of the trace.
+        The time of the phases nested in it is not counted as its own
+    """
+    __slots__ = ('profiler', 'name', 'start', 'nested_time', 'timed')
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.start = 0
+        self.nested_time = 0
+        self.timed = False          # Is it accounted for in the shares ? (only on the profiled thread)
+
+    def __enter__(self):
+        profiler = self.profiler
+        self.timed = profiler.enabled and threading.get_ident() == profiler.thread_id
+        if self.timed:
+            profiler.stack.append(self)
+
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc_info):
+        elapsed = time.perf_counter_ns() - self.start
+        profiler = self.profiler
+
+        tracer = profiler.tracer
+        if tracer is not None:
+            tracer.add(self.name, self.start, elapsed)
+
+        if not self.timed:
+            return False
+
+        profiler.stack.pop()
+        if profiler.stack:
+            profiler.stack[-1].nested_time += elapsed
+
+        name = self.name
+        profiler.times[name] = profiler.times.get(name, 0) + elapsed - self.nested_time
+        profiler.counts[name] = profiler.counts.get(name, 0) + 1
+        return False
+
+
+class _Span:
+    """ Records one run of a phase as a span of the trace """
+    __slots__ = ('tracer', 'name', 'start')
+
+    def __init__(self, tracer, name):
+        self.tracer = tracer
+        self.name = name
+        self.start = 0
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.tracer.add(self.name, self.start, time.perf_counter_ns() - self.start)
+        return False
+
+
+class TraceRecorder:
+    """ Records the phases run on every thread of the process as spans of a timeline, which is written
+        as a Chrome trace (viewable in chrome://tracing or Perfetto). The spans are timed on the monotonic
+        clock of the system, so the traces of the processes of a run line up when written to the same file
+    """
+
+    MAX_SPANS = 1_000_000           # The spans beyond these are dropped, to bound the memory of long runs
+
+    def __init__(self, process_name):
+        self.pid = os.getpid()
+        self.process_name = process_name
+        self.spans = []             # (name, thread id, start, duration) -- Appending is atomic, no lock needed
+        self.thread_names = {}      # Thread id -> Name of the thread
+        self.dropped = 0            # Number of spans dropped once full
+
+    def add(self, name, start, duration):
+        """ Records a span of the calling thread. start and duration are in nanoseconds """
+        if len(self.spans) >= self.MAX_SPANS:
+            self.dropped += 1
+            return
+
+        thread_id = threading.get_ident()
+        if thread_id not in self.thread_names:
+            self.thread_names[thread_id] = threading.current_thread().name
+        self.spans.append((name, thread_id, start, duration))
+
+    def span(self, name):
+        """ Returns the context manager recording the phase as a span """
+        return _Span(self, name)
+
+    def get_events(self):
+        """ Returns the spans (and the names of the process and the threads) as trace events """
+        events = [{'name': 'process_name', 'ph': 'M', 'pid': self.pid, 'args': {'name': self.process_name}}]
+        events += [
+            {'name': 'thread_name', 'ph': 'M', 'pid': self.pid, 'tid': thread_id, 'args': {'name': thread_name}}
+            for thread_id, thread_name in list(self.thread_names.items())
+        ]
+        events += [
+            {'name': name, 'ph': 'X', 'pid': self.pid, 'tid': thread_id, 'ts': start / 1000, 'dur': duration / 1000}
+            for name, thread_id, start, duration in self.spans[:]
+        ]
+        return events
+
+    def write(self, path, append=False):
+        """ Writes the trace to the path. If append is set, the events already in the file are kept """
+        events = []
+        if append and os.path.exists(path):
+            try:
+                with open(path) as trace_file:
+                    events = json.load(trace_file)['traceEvents']
+            except (OSError, ValueError, KeyError):
+                print(f'WARNING: Unable to read the trace {path} -- Overwriting it')
+
+        if self.dropped > 0:
+            print(f'WARNING: The trace is full -- {self.dropped} spans were dropped')
+
+        events += self.get_events()
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as trace_file:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, trace_file)
+        os.replace(tmp_path, path)
+
+
+class PhaseProfiler:
+    """ Accumulates the time spent in each phase of the training loop, on the thread that enabled it.
+        Phases are timed with `with profiler.phase(name):` -- When disabled, that hands out a shared
+        no-op object, so the instrumented code costs next to nothing. While tracing, the phases of all
+        the threads are recorded as spans as well
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.thread_id = None           # Only the phases run on this thread are timed
+        self.stack = []                 # Phases currently running, innermost last
+        self.times = {}                 # Phase -> Nanoseconds spent in it (excluding nested phases)
+        self.counts = {}                # Phase -> Number of times it was run
+        self.window_start = 0           # When the current report window started
+        self.tracer = None              # Records the phases as a timeline, while tracing
+
+    def enable(self):
+        """ Starts timing the phases run on the calling thread """
+        self.thread_id = threading.get_ident()
+        self.enabled = True
+        self.reset()
+
+    def disable(self):
+        """ Stops timing the phases """
+        self.enabled = False
+        self.thread_id = None
+        self.stack = []
+
+    def start_trace(self, process_name):
+        """ Starts recording the phases of every thread as a timeline """
+        self.tracer = TraceRecorder(process_name)
+
+    def stop_trace(self):
+        """ Stops recording the timeline and returns its recorder (None if it wasn't tracing) """
+        tracer, self.tracer = self.tracer, None
+        return tracer
+
+    def is_enabled(self):
+        """ Returns whether the phases are being timed """
+        return self.enabled
+
+    def phase(self, name):
+        """ Returns the context manager timing the phase """
+        if self.tracer is None and (not self.enabled or threading.get_ident() != self.thread_id):
+            return _NULL_PHASE
+        return _Phase(self, name)
+
+    def reset(self):
+        """ Discards the times accumulated so far and starts a new report window """
+        self.times = {}
+        self.counts = {}
+        self.window_start = time.perf_counter_ns()
+
+    def report(self):
+        """ Returns the wall time (seconds) of the current window, the share of it spent in each phase
+            and the number of times each phase was run, then starts a new window
+        """
+        wall = max(time.perf_counter_ns() - self.window_start, 1)
+        shares = {name: t / wall for name, t in self.times.items()}
+        shares[PHASE_OTHER] = max(1 - sum(shares.values()), 0)
+        counts = dict(self.counts)
+
+        self.reset()
+        return wall / 1e9, shares, counts
+
+
+def trace_span(tracer, name):
+    """ Returns the context manager recording the phase as a span of the tracer (a no-op if it is None) """
+    if tracer is None:
+        return _NULL_PHASE
+    return tracer.span(name)
+
+
+# The profiler used by the training loop. It is disabled unless the run asks for it
+PROFILER = PhaseProfiler()
+
+
+def phase(name):
+    """ Returns the context manager timing the phase on the training loop's profiler """
+    return PROFILER.phase(name)
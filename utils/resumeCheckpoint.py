@@ -0,0 +1,125 @@
+# This module contains the checkpoint that a training run can be resumed from
+
+import os
+import queue
+import pickle
+import random
+import threading
+import numpy as np
+import torch
+
+from agents.replayBuffer import ReplayBuffer
+import utils.profiler as uprof
+
+
+class ResumeCheckpoint:
+    """ Saves (in background) and restores the full state of a training run: the trainer's progress, the agent
+        (network, optimizer, exploration ...), the self-play clones, the random number generators and the
+        replay buffer. The replay buffer is written incrementally, as segments of the new experiences only
+    """
+
+    STATE_FILE = 'state.pkl'            # The state of the run, except the experiences
+    REPLAY_DIR = 'replay'               # The directory storing the segments of the replay buffer
+
+    # Keys of the state of the run
+    TRAINER_KEY = 'trainer'
+    AGENT_KEY = 'agent'
+    SELF_PLAY_KEY = 'self_play'
+    RNG_KEY = 'rng'
+    REPLAY_KEY = 'replay_total_stored'
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.state_path = os.path.join(directory, self.STATE_FILE)
+        self.replay_dir = os.path.join(directory, self.REPLAY_DIR)
+        self.jobs = queue.Queue()       # Unbounded and in order, the segments of the replay buffer depend on it
+        self.thread = threading.Thread(target=self._run, name='ResumeWriter', daemon=True)
+
+        os.makedirs(self.replay_dir, exist_ok=True)
+        self.thread.start()
+
+    def exists(self):
+        """ Returns a boolean indicating whether there is a state to resume from """
+        return os.path.isfile(self.state_path)
+
+    def save(self, trainer_state, agent):
+        """ Takes a copy of the state of the run and queues it for writing """
+        env = agent.get_environment()
+        buffer = agent.get_replay_buffer()
+
+        state = {
+            self.TRAINER_KEY: trainer_state,
+            self.AGENT_KEY: agent.get_state(),
+            self.SELF_PLAY_KEY: env.getState(),
+            self.RNG_KEY: {
+                'python': random.getstate(),
+                'numpy': np.random.get_state(),
+                'torch': torch.get_rng_state()
+            },
+            self.REPLAY_KEY: None
+        }
+
+        # Only the experiences stored since the previous save are handed over (they are never modified)
+        segment = None
+        if buffer is not None:
+            segment = buffer.take_new_segment()
+            state[self.REPLAY_KEY] = buffer.total_stored
+
+        self.jobs.put((state, segment, buffer.buffer_size if buffer is not None else None))
+
+    def restore(self, agent):
+        """ Restores the agent, its clones, its replay buffer and the random number generators.
+            Returns the state of the trainer that was saved along
+        """
+        with open(self.state_path, 'rb') as state_file:
+            state = pickle.load(state_file)
+
+        agent.set_state(state[self.AGENT_KEY])
+        agent.get_environment().setState(state[self.SELF_PLAY_KEY])
+
+        buffer = agent.get_replay_buffer()
+        if buffer is not None and state[self.REPLAY_KEY] is not None:
+            ReplayBuffer.prune_segments(self.replay_dir, state[self.REPLAY_KEY], buffer.buffer_size)
+            buffer.load_segments(self.replay_dir, state[self.REPLAY_KEY])
+
+        rng_state = state[self.RNG_KEY]
+        random.setstate(rng_state['python'])
+        np.random.set_state(rng_state['numpy'])
+        torch.set_rng_state(rng_state['torch'])
+
+        return state[self.TRAINER_KEY]
+
+    def close(self):
+        """ Writes the pending states and stops the writer thread """
+        self.jobs.put(None)     # Sentinel -- Marks the end of the jobs
+        self.thread.join()
+
+    def _run(self):
+        """ Entry point of the writer thread """
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                break
+
+            try:
+                with uprof.phase(uprof.PHASE_CHECKPOINT_WRITE):
+                    self._write(*job)
+            except OSError:
+                print(f'WARNING: Unable to save the state of the run to {self.directory}')
+
+    def _write(self, state, segment, buffer_size):
+        """ Writes the new segment of the replay buffer, then the state referring to it """
+        if segment is not None:
+            ReplayBuffer.write_segment(self.replay_dir, *segment)
+
+        # The state is replaced atomically, it only becomes visible once its segments are on disk
+        tmp_path = self.state_path + '.tmp'
+        with open(tmp_path, 'wb') as state_file:
+            pickle.dump(state, state_file)
+            state_file.flush()
+            os.fsync(state_file.fileno())
+        os.replace(tmp_path, self.state_path)
+
+        # Only now can the segments that were evicted from the buffer go away
+        if state[self.REPLAY_KEY] is not None:
+            ReplayBuffer.prune_segments(self.replay_dir, state[self.REPLAY_KEY], buffer_size)
@@ -0,0 +1,112 @@
+# This module contains the statistical profiler that can be started on a live training run
+
+import os
+import sys
+import time
+import signal
+import threading
+from collections import Counter
+
+
+class SamplingProfiler:
+    """ Samples the stacks of all the threads of the process for a window of time and writes them as
+        collapsed stacks (one 'thread;outer;...;inner count' line per stack), ready for flamegraph.pl or
+        speedscope. Nothing runs while it's not sampling, so it costs nothing to keep around
+    """
+
+    SAMPLE_INTERVAL_MS = 10         # Time between two samples of the stacks
+    FILE_PREFIX = 'profile_'
+    EXTENSION = '.collapsed'
+
+    def __init__(self):
+        self.out_dir = None             # Directory the collapsed stacks are written into
+        self.duration = 0               # Number of seconds sampled at a time
+        self.thread = None              # Thread taking the samples, while sampling
+        self.stopped = threading.Event()
+        self.lock = threading.RLock()   # Reentrant, the signal handler may interrupt the thread holding it
+
+    def configure(self, out_dir, duration):
+        """ Sets where the samples of the run are written, and how many seconds are sampled at a time """
+        self.out_dir = out_dir
+        self.duration = duration
+
+    def is_running(self):
+        """ Returns whether the stacks are being sampled """
+        return self.thread is not None and self.thread.is_alive()
+
+    def toggle(self):
+        """ Starts sampling for the configured duration, or stops early (writing the samples) if it is running """
+        with self.lock:
+            if self.is_running():
+                self.stopped.set()
+                return
+
+            if self.out_dir is None:
+                print('WARNING: There is no run directory to write the profile into -- Not sampling')
+                return
+
+            self.stopped.clear()
+            self.thread = threading.Thread(target=self._run, args=(self.out_dir, self.duration),
+                                           name='SamplingProfiler', daemon=True)
+            self.thread.start()
+
+    def close(self):
+        """ Stops sampling (writing the samples taken so far), waits for it and detaches from the run """
+        with self.lock:
+            thread = self.thread
+            self.stopped.set()
+            self.out_dir = None
+
+        if thread is not None:
+            thread.join()
+
+    def _run(self, out_dir, duration):
+        """ Entry point of the sampling thread """
+        own_id = threading.get_ident()
+        stacks = Counter()
+        deadline = time.monotonic() + duration
+
+        while time.monotonic() < deadline and not self.stopped.is_set():
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id != own_id:
+                    stacks[self._collapse(names.get(thread_id, str(thread_id)), frame)] += 1
+
+            self.stopped.wait(self.SAMPLE_INTERVAL_MS / 1000)
+
+        self._write(out_dir, stacks)
+
+    @staticmethod
+    def _collapse(thread_name, frame):
+        """ Returns the stack of the frame as 'thread;outermost;...;innermost' """
+        functions = []
+        while frame is not None:
+            code = frame.f_code
+            functions.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+            frame = frame.f_back
+
+        functions.append(thread_name)
+        return ';'.join(reversed(functions))
+
+    def _write(self, out_dir, stacks):
+        """ Writes the collapsed stacks into the output directory """
+        path = os.path.join(out_dir, self.FILE_PREFIX + time.strftime('%Y%m%d-%H%M%S') + self.EXTENSION)
+        try:
+            with open(path, 'w') as profile_file:
+                for stack, count in stacks.most_common():
+                    profile_file.write(f'{stack} {count}\n')
+        except OSError:
+            print(f'WARNING: Unable to write the profile to {path}')
+
+
+# The profiler of the training process. It is configured (but not started) by the trainer
+SAMPLER = SamplingProfiler()
+
+
+def install_signal_handler():
+    """ Lets SIGUSR1 start (or stop) the sampling, for runs without the GUI. Only possible on the main thread """
+    if not hasattr(signal, 'SIGUSR1') or threading.current_thread() is not threading.main_thread():
+        return False
+
+    signal.signal(signal.SIGUSR1, lambda signum, frame: SAMPLER.toggle())
+    return True
@@ -0,0 +1,61 @@
+# This module contains the bank of seeds that the showdowns are played on
+
+import os
+import json
+import random
+
+
+class SeedBank:
+    """ A fixed list of seeds for the evaluation episodes, cached on disk and shared by all the runs
+        of an environment in a workspace. Every showdown plays episode i on seed i, so the checkpoints
+        are compared on the same games (common random numbers)
+    """
+
+    MASTER_SEED = 20210419              # Seed of the generator of the bank -- Never change it, or the banks will differ
+    SEEDS_KEY = 'seeds'                 # Key of the list of seeds in the JSON file
+    FILE_SUFFIX = 'evaluation_seeds.json'
+
+    def __init__(self, workspace, env_name, size):
+        """
+        workspace: The workspace directory (the bank is shared by all the runs inside it)
+        env_name:  Name of the environment the seeds are for
+        size:      Minimum number of seeds needed
+        """
+        env_name = '_'.join(env_name.split(' '))        # Need to do this to eliminate spaces
+        self.path = os.path.join(workspace, f'{env_name}_{self.FILE_SUFFIX}')
+        self.seeds = self._load_or_create(size)
+
+    def get_path(self):
+        """ Returns the path of the file storing the bank """
+        return self.path
+
+    def get_seeds(self):
+        """ Returns the list of seeds """
+        return self.seeds
+
+    def _load_or_create(self, size):
+        """ Loads the bank from disk, (re)creating it if it doesn't exist or is too small """
+        try:
+            with open(self.path) as file:
+                seeds = json.load(file)[self.SEEDS_KEY]
+            if len(seeds) >= size:
+                return seeds
+        except (OSError, ValueError, KeyError):
+            pass
+
+        # The seeds are drawn from a fixed generator, so a larger bank always starts with the smaller one
+        generator = random.Random(self.MASTER_SEED)
+        seeds = [generator.getrandbits(32) for _ in range(size)]
+        self._dump(seeds)
+
+        return seeds
+
+    def _dump(self, seeds):
+        """ Writes the bank to disk. The file is replaced atomically as other runs may be reading it """
+        tmp_path = f'{self.path}.{os.getpid()}.tmp'
+        try:
+            with open(tmp_path, 'w') as file:
+                json.dump({self.SEEDS_KEY: seeds}, file)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            print(f'WARNING: Unable to save the evaluation seeds to {self.path}')
@@ -0,0 +1,239 @@
+# This module exports a trained Hungry Geese agent as a single-file Kaggle submission
+#
+# Run it from the root of the project, for e.g.
+#           python -m utils.submissionExporter <run>/saved_models/dqn_100_<time>.flat --output main.py
+#
+# The configuration of the network (units and activations) is read from the run's configuration by default
+
+import os
+import json
+import base64
+import string
+import argparse
+import numpy as np
+import torch
+import torch.nn as nn
+import kaggle_environments as kaggle_env
+from kaggle_environments.envs.hungry_geese import hungry_geese
+
+import utils.nn as unn
+import utils.checkpointStore as ustore
+import config.algorithmsConfig as acfg
+from utils.foldersPrep import PrepareFolders
+from environments.kaggle.hungry_geese.hungryGeese import HungryGeese
+
+
+DEF_OUTPUT = 'main.py'
+N_VERIFY_BOARDS = 200           # Number of random boards the exported agent is checked against the network on
+VERIFY_TOLERANCE = 1e-4         # Maximum difference allowed between the scores of the two
+
+# The exported agent. It only needs NumPy, decodes the weights once on import and encodes the observation
+# exactly like HungryGeese.encode_board() does for the goose it plays
+SUBMISSION_TEMPLATE = string.Template('''\
+# Hungry Geese agent exported by Kaggle Simulations Lab from $source
+# Self-contained: the weights are embedded and only NumPy is needed
+
+import math
+import base64
+import numpy as np
+
+
+N_ROWS = $n_rows
+N_COLS = $n_cols
+ACTIONS = $actions
+
+OUR_GEESE_HEAD_MARKER = $our_head
+OUR_GEESE_BODY_MARKER = $our_body
+OUR_GEESE_TAIL_MARKER = $our_tail
+OPPONENT_GEESE_HEAD_MARKER = $opp_head
+OPPONENT_GEESE_BODY_MARKER = $opp_body
+OPPONENT_GEESE_TAIL_MARKER = $opp_tail
+FOOD_MARKER = $food
+
+# The layers of the network, in order -- ('linear', weight, bias) or ('activation', name, parameter)
+# The arrays are stored as (base64 of the little-endian float32 data, shape)
+LAYERS = $layers
+
+SELU_ALPHA = 1.6732632423543772
+SELU_SCALE = 1.0507009873554805
+RRELU_SLOPE = (1 / 8 + 1 / 3) / 2           # The slope of RReLU when evaluating
+_erf = np.frompyfunc(math.erf, 1, 1)
+
+ACTIVATIONS = {
+    'CELU':       lambda x, p: np.where(x > 0, x, np.expm1(np.minimum(x, 0))),
+    'ELU':        lambda x, p: np.where(x > 0, x, np.expm1(np.minimum(x, 0))),
+    'GELU':       lambda x, p: 0.5 * x * (1 + _erf(x / math.sqrt(2)).astype(np.float32)),
+    'HardTanh':   lambda x, p: np.clip(x, -1, 1),
+    'LeakyReLU':  lambda x, p: np.where(x > 0, x, 0.01 * x),
+    'LogSigmoid': lambda x, p: -np.logaddexp(0, -x),
+    'PReLU':      lambda x, p: np.where(x > 0, x, p * x),
+    'RReLU':      lambda x, p: np.where(x > 0, x, RRELU_SLOPE * x),
+    'ReLU':       lambda x, p: np.maximum(x, 0),
+    'ReLU6':      lambda x, p: np.clip(x, 0, 6),
+    'SELU':       lambda x, p: SELU_SCALE * np.where(x > 0, x, SELU_ALPHA * np.expm1(np.minimum(x, 0))),
+    'Sigmoid':    lambda x, p: 0.5 * (1 + np.tanh(0.5 * x)),
+    'Tanh':       lambda x, p: np.tanh(x),
+}
+
+
+def _decode(array):
+    data, shape = array
+    return np.frombuffer(base64.b64decode(data), dtype='<f4').reshape(shape)
+
+
+def _build_network():
+    """ Decodes the layers once. The weights are transposed up front, so a layer is a single x @ W + b """
+    network = []
+    for kind, first, second in LAYERS:
+        if kind == 'linear':
+            network.append((kind, np.ascontiguousarray(_decode(first).T), _decode(second)))
+        else:
+            network.append((kind, ACTIVATIONS[first], _decode(second) if second is not None else None))
+    return network
+
+
+NETWORK = _build_network()
+
+
+def encode_board(geese, food, index):
+    """ Encodes the observation of the goose at index, the same way the environment did during training """
+    board = np.zeros(N_ROWS * N_COLS, dtype=np.float32)
+
+    pos = geese[index]
+    if pos:
+        board[pos[0]] = OUR_GEESE_HEAD_MARKER
+        if len(pos) > 1:
+            board[pos[1:-1]] = OUR_GEESE_BODY_MARKER
+            board[pos[-1]] = OUR_GEESE_TAIL_MARKER
+
+    board[food] = FOOD_MARKER
+
+    for j, opp_pos in enumerate(geese):
+        if j == index or not opp_pos:
+            continue
+
+        board[opp_pos[0]] = OPPONENT_GEESE_HEAD_MARKER
+        if len(opp_pos) > 1:
+            board[opp_pos[1:-1]] = OPPONENT_GEESE_BODY_MARKER
+            board[opp_pos[-1]] = OPPONENT_GEESE_TAIL_MARKER
+
+    return board
+
+
+def forward(x):
+    """ Returns the scores of the actions for the encoded board """
+    for kind, first, second in NETWORK:
+        if kind == 'linear':
+            x = x @ first + second
+        else:
+            x = first(x, second)
+    return x
+
+
+def agent(obs, config):
+    """ Entry point called by Kaggle on every move -- Plays the action with the highest score """
+    board = encode_board(obs['geese'], obs['food'], obs['index'])
+    return ACTIONS[int(np.argmax(forward(board)))]
+''')
+
+
+def export_submission(checkpoint_path, units_list, activations_list, output_path=DEF_OUTPUT):
+    """ Writes the network of the checkpoint as a single-file Kaggle agent. Returns the network it was built from """
+    env_config = kaggle_env.make(HungryGeese.HUNGRY_GEESE_ENV_NAME).configuration
+    n_rows, n_cols = env_config['rows'], env_config['columns']
+    actions = [action.name for action in hungry_geese.Action]   # Same order as HungryGeese.actions
+
+    # Loading it into the network checks that the checkpoint and the configuration match
+    network = unn.FeedForwardNet(ip_dim=n_rows * n_cols,
+                                 op_dim=len(actions),
+                                 units_list=units_list,
+                                 activ_list=activations_list)
+    network.load_state_dict(ustore.load_checkpoint(checkpoint_path))
+    network.eval()
+
+    source = SUBMISSION_TEMPLATE.substitute(
+        source=os.path.basename(checkpoint_path),
+        n_rows=n_rows,
+        n_cols=n_cols,
+        actions=repr(actions),
+        our_head=HungryGeese.OUR_GEESE_HEAD_MARKER,
+        our_body=HungryGeese.OUR_GEESE_BODY_MARKER,
+        our_tail=HungryGeese.OUR_GEESE_TAIL_MARKER,
+        opp_head=HungryGeese.OPPONENT_GEESE_HEAD_MARKER,
+        opp_body=HungryGeese.OPPONENT_GEESE_BODY_MARKER,
+        opp_tail=HungryGeese.OPPONENT_GEESE_TAIL_MARKER,
+        food=HungryGeese.FOOD_MARKER,
+        layers=_format_layers(network)
+    )
+
+    with open(output_path, 'w') as output_file:
+        output_file.write(source)
+
+    return network
+
+
+def verify_submission(submission_path, network, n_boards=N_VERIFY_BOARDS):
+    """ Returns the largest difference between the scores of the exported agent and the network on random boards """
+    namespace = {}
+    with open(submission_path) as submission_file:
+        exec(compile(submission_file.read(), submission_path, 'exec'), namespace)
+
+    n_obs = namespace['N_ROWS'] * namespace['N_COLS']
+    boards = np.random.randint(-3, 5, size=(n_boards, n_obs)).astype(np.float32)
+    with torch.no_grad():
+        expected = network(torch.from_numpy(boards)).numpy()
+
+    exported = np.stack([namespace['forward'](board) for board in boards])
+    return float(np.abs(exported - expected).max())
+
+
+def _format_layers(network):
+    """ Returns the source of the LAYERS list of the exported agent """
+    activation_names = {activ_class: name for name, activ_class in unn.ACTIV_MAP.items()}
+
+    lines = []
+    for layer in network.model:
+        if isinstance(layer, nn.Linear):
+            entry = ('linear', _encode(layer.weight), _encode(layer.bias))
+        else:
+            parameter = _encode(layer.weight) if isinstance(layer, nn.PReLU) else None
+            entry = ('activation', activation_names[type(layer)], parameter)
+        lines.append(f'    {entry!r},')
+
+    return '[\n' + '\n'.join(lines) + '\n]'
+
+
+def _encode(tensor):
+    """ Returns the tensor as (base64 of the little-endian float32 data, shape) """
+    array = tensor.detach().cpu().numpy().astype('<f4')
+    return base64.b64encode(array.tobytes()).decode('ascii'), array.shape
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Exports a trained Hungry Geese agent as a Kaggle submission')
+    parser.add_argument('checkpoint', help='Checkpoint of the agent (in saved_models of the run)')
+    parser.add_argument('--config', default=None,
+                        help="Configuration of the run, for the units and activations (the run's own by default)")
+    parser.add_argument('--output', default=DEF_OUTPUT, help='File to write the agent into')
+    args = parser.parse_args()
+
+    config_path = args.config
+    if config_path is None:
+        run_dir = os.path.dirname(os.path.dirname(os.path.abspath(args.checkpoint)))
+        config_path = os.path.join(run_dir, PrepareFolders.CONFIG_FILE)
+
+    with open(config_path) as config_file:
+        config_data = json.load(config_file)
+
+    network = export_submission(args.checkpoint, config_data[acfg.KEY_UNITS_LIST],
+                                config_data[acfg.KEY_ACTIV_LIST], args.output)
+
+    difference = verify_submission(args.output, network)
+    print(f'Agent written to {args.output} ({os.path.getsize(args.output) / 1024:.1f} KB) -- '
+          f'Largest difference from the network: {difference:.2e}')
+    if difference > VERIFY_TOLERANCE:
+        print('WARNING: The exported agent does not match the network')
+
+
+if __name__ == '__main__':
+    main()
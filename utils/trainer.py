@@ -1,6 +1,17 @@
 # This module contains the trainer class for training our agent
-from torch.utils.tensorboard import SummaryWriter
+import os
 import config.algorithmsConfig as acfg
+import utils.evaluator as uevaluator
+import utils.seedBank as useedbank
+import utils.checkpointWriter as uchkpt
+import utils.checkpointStore as ustore
+import utils.resumeCheckpoint as uresume
+import utils.metricsAggregator as umetrics
+import utils.profiler as uprof
+import utils.samplingProfiler as usampler
+import utils.memoryTracker as umemory
+import utils.trajectoryRecorder as utraj
+import utils.warmupGenerator as uwarmup
 
 
 class Trainer:
@@ -15,13 +26,42 @@ class Trainer:
     AVG_SHOWDOWN_REWARD_KEY = 'avg_showdown_reward'
     AVG_SHOWDOWN_STEPS_KEY = 'avg_showdown_steps'
     SHOWDOWN_KEY = 'showdown'
-
-    def __init__(self, worker_thread, config_data, agent):
+    SHOWDOWN_EPISODES_KEY = 'showdown_episodes'
+
+    PROFILE_SHARES_KEY = 'profile_shares'
+    ENV_STEPS_PER_SEC_KEY = 'env_steps_per_sec'
+    UPDATES_PER_SEC_KEY = 'updates_per_sec'
+
+    # Keys of the trainer's progress that is saved for resuming
+    EPISODE_KEY = 'episode'
+    PROGRESS_KEYS = [
+        'total_train_wins_till_now',
+        'total_train_rewards_till_now',
+        'total_train_steps_till_now',
+        'total_showdowns_till_now',
+        'total_showdown_win_rate_till_now',
+        'total_showdown_steps_till_now',
+        'total_showdown_rewards_till_now',
+        'last_showdown_episodes',
+        'showdown_scores',
+        'saved_episodes',
+    ]
+
+    def __init__(self, worker_thread, config_data, agent, resume_dir=None, run_dir=None, pretraining=None):
         self.config_data = config_data              # Dictionary containing training information
         self.worker_thread = worker_thread          # Thread on which this trainer is running
         self.agent = agent                          # The agent to train
-        self.writer = None                          # Tensorboard writer
-        self.can_log = False                        # Can we log the results ? Only true when writer is not None
+        self.resume_dir = resume_dir                # Directory of the state to resume from (None if not saved)
+        self.run_dir = run_dir                      # Directory of the run, the profiles and trajectories go there
+        self.pretraining = pretraining              # (number of batches, mean loss) of the pretraining, if any
+        self.resume_checkpoint = None               # Saves (and restores) the full state of the run
+        self.metrics = None                         # Aggregates the metrics and logs them to tensorboard
+        self.evaluator = None                       # Background evaluator, if showdowns are run asynchronously
+        self.showdown_seeds = None                  # Seeds of the showdown episodes, if they are played on a fixed bank
+        self.checkpoint_writer = None               # Background writer of the checkpoints
+        self.memory_tracker = None                  # Samples the memory used by the run, if it is tracked
+        self.recorder = None                        # Records the transitions played in training, if asked for
+        self.can_log = False                        # Can we log the results ? Only true when metrics is not None
         self.total_train_wins_till_now = 0          # Track the number of games we won till now
         self.total_train_rewards_till_now = 0       # Track the total rewards we got till now
         self.total_train_steps_till_now = 0         # Track the total steps we did till now
@@ -29,6 +69,9 @@ class Trainer:
         self.total_showdown_win_rate_till_now = 0   # Track the cumulative win rate till now
         self.total_showdown_steps_till_now = 0      # Track the total number of steps in the showdown till now
         self.total_showdown_rewards_till_now = 0    # Track the total number of showdown rewards till now
+        self.last_showdown_episodes = 0             # Number of episodes the most recent showdown actually played
+        self.showdown_scores = []                   # (episode, win rate) of every showdown, to score the checkpoints
+        self.saved_episodes = []                    # Episodes the checkpoints were saved at, in order
 
 
     def need_to_stop(self):
@@ -39,8 +82,6 @@ class Trainer:
     def start(self):
         """ Trains until stop signal is received or all episodes have been looped """
 
-        self.instantiate_writer()        # Instantiate the summary writer object
-
         env = self.agent.get_environment()
         chkpt_dir = self.agent.get_model_directory()
 
@@ -50,22 +91,54 @@ class Trainer:
         chkpt_interval = self.config_data[acfg.KEY_CHKPT_INT]
         showdown_interval = self.config_data[acfg.KEY_EVAL_INTERVAL]
         showdown_episodes = self.config_data[acfg.KEY_EVAL_EPISODES]
+        showdown_ci_width = self.config_data[acfg.KEY_EVAL_CI_WIDTH]
+        log_window = max(self.config_data[acfg.KEY_LOG_WINDOW], 1)  # 1 or less reports every episode
 
         # Create the initial clones of itself before we begin training
+        # Then pick up from where the run was left, if it is being resumed
         env.setAgents(self.agent)
-
-        for e in range(1, episodes + warmup_episodes + 1):
+        self.agent.set_stop_check(self.need_to_stop)    # Cancelling takes effect within a single step
+        first_episode = self.instantiate_resume_checkpoint()
+        last_saved_episode = first_episode - 1
+
+        self.instantiate_metrics(first_episode)     # Instantiate the metrics aggregator (and its summary writer)
+        self.log_pretraining()
+        self.instantiate_checkpoint_writer()
+        self.instantiate_seed_bank()
+        self.instantiate_evaluator()
+        self.instantiate_profiler()
+        self.instantiate_sampler()
+        self.instantiate_memory_tracker()
+        self.instantiate_recorder()
+        self.instantiate_all_perspectives()
+        self.instantiate_augmentation()
+        first_episode = self.play_parallel_warmup(first_episode)
+
+        e = first_episode - 1
+        for e in range(first_episode, episodes + warmup_episodes + 1):
 
             # Before playing one episode, check if we need to stop, if yes, then break
             # This check is needed in case "Cancel" button is pressed in the GUI which must
             # stop the training process !
             if self.need_to_stop():
+                e -= 1      # This episode hasn't been played
                 break
 
             # Play one episode, then train the network
             # Cumulative reward and whether or not we won, are returned after episode termination
             total_reward, total_steps, won = self.agent.play_one_episode()
-            self.agent.train()
+
+            # Cancelled in the middle of the episode -- It doesn't count and isn't trained on
+            if self.need_to_stop():
+                e -= 1
+                break
+
+            if self.recorder is not None:
+                with uprof.phase(uprof.PHASE_RECORD):
+                    self.recorder.end_episode(e)
+
+            with uprof.phase(uprof.PHASE_TRAIN):
+                self.agent.train()
 
             # Update the summary statistics (need to display in the GUI)
             if won:
@@ -75,65 +148,269 @@ class Trainer:
 
             # If it is time to save the agent to disk, save it to disk
             if e % chkpt_interval == 0 and chkpt_dir is not None:
-                self.agent.save(e)
+                with uprof.phase(uprof.PHASE_CHECKPOINT):
+                    self.save_checkpoint(e)
+                    self.save_resume_checkpoint(e)
+                last_saved_episode = e
 
             # If it is showdown time, start the showdown
             if e % showdown_interval == 0:
-                win_rate, avg_reward, avg_steps = self.showdown(showdown_episodes)
+                if self.evaluator is not None:
+                    self.submit_showdown(e, showdown_episodes, showdown_ci_width)
+                else:
+                    results = self.showdown(showdown_episodes, showdown_ci_width)
+                    if not self.need_to_stop():     # A showdown cut short by cancelling is meaningless
+                        self.record_showdown(e, *results)
 
-                self.total_showdowns_till_now += 1
-                self.total_showdown_win_rate_till_now += win_rate
-                self.total_showdown_steps_till_now += avg_steps
-                self.total_showdown_rewards_till_now += avg_reward
-
-                # print(f'win_rate: {win_rate}\navg. reward: {avg_reward}\navg_steps: {avg_steps}\n')
-
-                if self.logging_possible():
-                    self.writer.add_scalar('Evaluation/win_rate', win_rate, e)
-                    self.writer.add_scalar('Evaluation/avg_reward', avg_reward, e)
-                    self.writer.add_scalar('Evaluation/avg_steps', avg_steps, e)
-
-                # Now update the contents in the GUI
-                self.update_text_box_showdown(e)
+            # Log the showdowns that finished in the background in the meantime
+            with uprof.phase(uprof.PHASE_LOGGING):
+                self.collect_showdowns()
 
             # If we have crossed the warmup episodes and we have reached the episode
             # when we can increase the difficulty by updating the clones
             if (e > warmup_episodes) and (e % selfplay_update_interval) == 0:
                 env.updateAgents(self.agent)
 
+            with uprof.phase(uprof.PHASE_LOGGING):
+                if self.logging_possible():
+                    self.metrics.record('Training/total_reward', total_reward, e)
+                    self.metrics.record('Training/total_steps', total_steps, e)
+                    self.metrics.record('Training/wins', int(won), e)
+
+                # Update the GUI components
+                self.update_progress_bar(e)
+                self.update_text_box_training(e)
+
+            # Report where the time went over the most recent episodes
+            if uprof.PROFILER.is_enabled() and e % log_window == 0:
+                self.report_profile(e)
+
+            # Sample the memory, to catch it growing over long runs
+            if self.memory_tracker is not None and e % self.config_data[acfg.KEY_MEMORY_INT] == 0:
+                self.record_memory(e)
+
+        # Training done -- Wait for the pending showdowns (if not cancelled) and log them
+        if self.evaluator is not None:
+            self.evaluator.close(wait=not self.need_to_stop())
+            self.collect_showdowns()
+
+        uprof.PROFILER.disable()
+        if self.memory_tracker is not None:
+            self.memory_tracker.close()
+        if self.recorder is not None:
+            self.recorder.close()
+
+        # Save the state of the run (if not saved already), so that it can be resumed later on
+        # When cancelled, the model reached so far is saved as well, unless the final checkpoint is turned off
+        cancelled = self.need_to_stop()
+        if e > last_saved_episode and (not cancelled or self.config_data[acfg.KEY_CHKPT_ON_CANCEL]):
+            if cancelled and chkpt_dir is not None:
+                self.save_checkpoint(e)
+            self.save_resume_checkpoint(e)
+
+        # Write the pending checkpoints
+        if self.checkpoint_writer is not None:
+            self.checkpoint_writer.close()
+        if self.resume_checkpoint is not None:
+            self.resume_checkpoint.close()
+
+        # Log the incomplete windows and close the summary writer
+        if self.metrics:
+            self.metrics.close()
+
+        # The background threads are done -- The timeline is complete
+        usampler.SAMPLER.close()
+        self.write_trace()
+
+    def play_parallel_warmup(self, first_episode):
+        """ Plays the warmup episodes up front on all the cores of the run and loads their experience into the
+            replay buffer at once, then trains on it as many times as the warmup would have. Only for agents with a
+            replay buffer (the others learn from their own episodes) and fresh runs. Returns the episode to carry on from
+        """
+        warmup_episodes = self.config_data[acfg.KEY_NUM_WARMUP]
+        replay_buffer = self.agent.get_replay_buffer()
+        if not self.config_data[acfg.KEY_PARALLEL_WARMUP] or warmup_episodes == 0 or replay_buffer is None \
+                or first_episode != 1:
+            return first_episode
+
+        results = uwarmup.generate_warmup(self.agent, warmup_episodes, n_workers=self.config_data[acfg.KEY_NUM_CORES],
+                                          need_to_stop=self.need_to_stop)
+        if results is None:
+            return first_episode        # Cancelled -- The training loop stops right away as well
+
+        columns, stats = results
+        replay_buffer.store_batch(columns)
+        self.agent.get_environment().completeWarmup()
+
+        for e, (total_reward, total_steps, won) in enumerate(stats, start=1):
+            # Cancelled -- The run carries on from the first episode not trained on (the training loop stops right
+            # away). The experience of all the warmup episodes is in the replay buffer already, the warmup is over
+            if self.need_to_stop():
+                self.update_progress_bar(e - 1)
+                self.update_text_box_training(e - 1)
+                return e
+
+            with uprof.phase(uprof.PHASE_TRAIN):
+                self.agent.train()
+
+            if won:
+                self.total_train_wins_till_now += 1
+            self.total_train_rewards_till_now += total_reward
+            self.total_train_steps_till_now += total_steps
+
             if self.logging_possible():
-                self.writer.add_scalar('Training/total_reward', total_reward, e)
-                self.writer.add_scalar('Training/total_steps', total_steps, e)
-                self.writer.add_scalar('Training/wins', int(won), e)
+                self.metrics.record('Training/total_reward', total_reward, e)
+                self.metrics.record('Training/total_steps', total_steps, e)
+                self.metrics.record('Training/wins', int(won), e)
 
-            # Update the GUI components
-            self.update_progress_bar(e)
-            self.update_text_box_training(e)
+        self.update_progress_bar(warmup_episodes)
+        self.update_text_box_training(warmup_episodes)
+        return warmup_episodes + 1
 
-        # Training done -- Close the summary writer
-        if self.writer:
-            self.writer.close()
 
-    def showdown(self, n_episodes):
-        """ Perform a showdown of n_episodes against the opponents """
-        n_wins = 0
-        avg_reward = 0
-        avg_steps = 0
+    def write_trace(self):
+        """ Stops recording the timeline and writes it into the logs directory, if it was recorded """
+        tracer = uprof.PROFILER.stop_trace()
+        log_dir = self.agent.get_log_directory()
+        if tracer is None or log_dir is None:
+            return
 
-        for _ in range(n_episodes):
-            total_reward, total_steps, won = self.agent.play_one_episode(eval=True)
+        try:
+            tracer.write(os.path.join(log_dir, uprof.TRACE_FILE))
+        except OSError:
+            print(f'WARNING: Unable to write the trace to {log_dir}')
 
-            # Now update the statistics
-            if won:
-                n_wins += 1
-            avg_reward += total_reward
-            avg_steps += total_steps
 
-        win_rate = (n_wins / n_episodes) * 100
-        avg_reward = avg_reward / n_episodes
-        avg_steps = avg_steps / n_episodes
+    def get_state(self, e):
+        """ Returns the progress of the trainer after the episode e """
+        state = {key: getattr(self, key) for key in self.PROGRESS_KEYS}
+        state[self.EPISODE_KEY] = e
+        return state
+
+
+    def set_state(self, state):
+        """ Restores the progress of the trainer from a state returned by get_state() (the keys it predates keep
+            their initial values)
+        """
+        for key in self.PROGRESS_KEYS:
+            if key in state:
+                setattr(self, key, state[key])
+
+
+    def save_checkpoint(self, e):
+        """ Saves the agent (in background, if possible) after the episode e """
+        self.agent.save(e)
+        self.saved_episodes.append(e)
+
+
+    def get_checkpoint_scores(self):
+        """ Returns the win rate of every checkpoint saved so far that was scored, by the episode it was saved at.
+            The rule is the checkpoint writer's: a showdown scores the latest checkpoint saved at or before its
+            episode, pruned or not. The scores of the pruned ones are dropped by the writer, as they were then
+        """
+        scores = {}
+        for e, win_rate in self.showdown_scores:
+            scored = uchkpt.scored_checkpoint(self.saved_episodes, e)
+            if scored is not None:
+                scores[scored] = win_rate
+        return scores
+
+
+    def save_resume_checkpoint(self, e):
+        """ Saves the full state of the run after the episode e, if possible """
+        if self.resume_checkpoint is not None:
+            self.resume_checkpoint.save(self.get_state(e), self.agent)
+
+
+    def showdown(self, n_episodes, ci_width=0):
+        """ Perform a showdown of (at most) n_episodes against the opponents """
+        return uevaluator.showdown(self.agent, n_episodes, ci_width, self.showdown_seeds, self.need_to_stop)
+
+
+    def submit_showdown(self, e, n_episodes, ci_width=0):
+        """ Submits a showdown of the current weights to the background evaluator """
+        with uprof.phase(uprof.PHASE_SHOWDOWN):
+            submitted = self.evaluator.submit(e, self.agent, n_episodes, ci_width)
+
+        # The checkpoint it will score must still be there when the result comes
+        if submitted and self.checkpoint_writer is not None:
+            self.checkpoint_writer.expect_score(e)
+        if not submitted:
+            print(f'WARNING: Evaluations are piling up -- Skipping the showdown of episode {e}')
 
-        return win_rate, avg_reward, avg_steps
+
+    def collect_showdowns(self):
+        """ Records the showdowns that were finished by the background evaluator """
+        if self.evaluator is None:
+            return
+
+        for e, *results in self.evaluator.poll():
+            self.record_showdown(e, *results)
+
+
+    def record_showdown(self, e, win_rate, avg_reward, avg_steps, n_played):
+        """ Updates the showdown statistics, logs them and updates the GUI. e is the episode it was taken at """
+        self.total_showdowns_till_now += 1
+        self.total_showdown_win_rate_till_now += win_rate
+        self.total_showdown_steps_till_now += avg_steps
+        self.total_showdown_rewards_till_now += avg_reward
+        self.last_showdown_episodes = n_played
+        self.showdown_scores.append((e, win_rate))
+
+        # The checkpoints with the best showdowns are kept on disk
+        if self.checkpoint_writer is not None:
+            self.checkpoint_writer.record_score(e, win_rate)
+
+        if self.logging_possible():
+            self.metrics.log('Evaluation/win_rate', win_rate, e)
+            self.metrics.log('Evaluation/avg_reward', avg_reward, e)
+            self.metrics.log('Evaluation/avg_steps', avg_steps, e)
+            self.metrics.log('Evaluation/episodes_played', n_played, e)
+
+        # Now update the contents in the GUI
+        self.update_text_box_showdown(e)
+
+
+    def report_profile(self, e):
+        """ Logs the share of the time spent in each phase since the last report, along with the throughput """
+        wall_time, shares, counts = uprof.PROFILER.report()
+        env_steps_per_sec = counts.get(uprof.PHASE_ENV_STEP, 0) / wall_time
+        updates_per_sec = counts.get(uprof.PHASE_GRADIENT_UPDATE, 0) / wall_time
+
+        if self.logging_possible():
+            for name, share in shares.items():
+                self.metrics.log(f'Profile/{name}_percent', share * 100, e)
+            self.metrics.log('Profile/env_steps_per_sec', env_steps_per_sec, e)
+            self.metrics.log('Profile/updates_per_sec', updates_per_sec, e)
+
+        # Now update the contents in the GUI
+        data = self._prepare_data_profile(e, shares, env_steps_per_sec, updates_per_sec)
+        self.worker_thread.update_textbox_profile(data)
+
+
+    def log_pretraining(self):
+        """ Logs how the pretraining on recorded data went, before the first episode """
+        if self.pretraining is None or not self.logging_possible():
+            return
+
+        n_batches, mean_loss = self.pretraining
+        self.metrics.log('Pretraining/loss', mean_loss, 0)
+        self.metrics.log('Pretraining/batches', n_batches, 0)
+
+
+    def record_memory(self, e):
+        """ Samples the memory after the episode e and logs it. Growth is only watched once the replay buffer is full """
+        sample = self.memory_tracker.sample(e, steady=self.agent.is_replay_full())
+        if not self.logging_possible():
+            return
+
+        self.metrics.log('Memory/rss_mb', sample[umemory.MemoryTracker.RSS_KEY], e)
+        self.metrics.log('Memory/traced_mb', sample[umemory.MemoryTracker.TRACED_KEY], e)
+        if sample[umemory.MemoryTracker.GROWTH_KEY] is not None:
+            self.metrics.log('Memory/growth_mb_per_1k_episodes', sample[umemory.MemoryTracker.GROWTH_KEY], e)
+
+        for site, size_mb in sample[umemory.MemoryTracker.TOP_SITES_KEY]:
+            self.metrics.log(f'MemorySites/{site}', size_mb, e)
 
 
     def update_progress_bar(self, e):
@@ -158,12 +435,126 @@ class Trainer:
         self.worker_thread.update_textbox_showdown(data)
 
 
-    def instantiate_writer(self):
-        """ Instantiates the summary writer object for tensorboard logging """
+    def instantiate_metrics(self, first_episode=1):
+        """ Instantiates the metrics aggregator for tensorboard logging """
         log_dir = self.agent.get_log_directory()
         if log_dir is not None:
+            # When resuming, discard whatever was logged after the state that is resumed from
+            purge_step = first_episode if first_episode > 1 else None
+
             self.can_log = True
-            self.writer = SummaryWriter(log_dir=log_dir, flush_secs=1)
+            self.metrics = umetrics.MetricsAggregator(log_dir=log_dir,
+                                                      window=self.config_data[acfg.KEY_LOG_WINDOW],
+                                                      purge_step=purge_step)
+
+
+    def instantiate_resume_checkpoint(self):
+        """ Instantiates the resumable checkpoint, restoring the run from it when resuming.
+            Returns the episode to start training from
+        """
+        if self.resume_dir is None:
+            return 1
+
+        self.resume_checkpoint = uresume.ResumeCheckpoint(self.resume_dir)
+        if self.config_data[acfg.KEY_RESUME_DIR] is None or not self.resume_checkpoint.exists():
+            return 1
+
+        trainer_state = self.resume_checkpoint.restore(self.agent)
+        self.set_state(trainer_state)
+
+        return trainer_state[self.EPISODE_KEY] + 1
+
+
+    def instantiate_checkpoint_writer(self):
+        """ Instantiates the background writer of the checkpoints, if the checkpoints can be saved """
+        chkpt_dir = self.agent.get_model_directory()
+        if chkpt_dir is not None:
+            # A resumed run carries on keeping (and pruning) the checkpoints it saved before
+            store = ustore.DeltaCheckpointStore(keyframe_interval=self.config_data[acfg.KEY_CHKPT_KEYFRAME_INT])
+            store.adopt(chkpt_dir)
+            self.checkpoint_writer = uchkpt.CheckpointWriter(keep_last=self.config_data[acfg.KEY_CHKPT_KEEP_LAST],
+                                                             keep_best=self.config_data[acfg.KEY_CHKPT_KEEP_BEST],
+                                                             write_fn=store.write,
+                                                             remove_fn=store.remove,
+                                                             checkpoints=uchkpt.list_checkpoints(chkpt_dir),
+                                                             scores=self.get_checkpoint_scores(),
+                                                             saved_episodes=self.saved_episodes)
+            self.agent.set_checkpoint_writer(self.checkpoint_writer)
+
+
+    def instantiate_evaluator(self):
+        """ Instantiates the background evaluator, if showdowns need to overlap with training """
+        if self.config_data[acfg.KEY_EVAL_ASYNC]:
+            max_pending = self.config_data[acfg.KEY_EVAL_MAX_PENDING]
+            self.evaluator = uevaluator.BackgroundEvaluator(self.agent, max_pending, self.showdown_seeds)
+
+
+    def instantiate_profiler(self):
+        """ Starts timing the phases of the training loop (and recording their timeline), if the run asks for it """
+        if self.config_data[acfg.KEY_PROFILE_PHASES]:
+            uprof.PROFILER.enable()
+
+        if self.config_data[acfg.KEY_TRACE_TIMELINE]:
+            uprof.PROFILER.start_trace(process_name=f'Training ({self.agent.get_name()})')
+
+
+    def instantiate_sampler(self):
+        """ Lets the sampling profiler be started on the run (from the GUI, or by SIGUSR1 without it) """
+        if self.run_dir is not None:
+            usampler.SAMPLER.configure(self.run_dir, self.config_data[acfg.KEY_SAMPLING_SECS])
+            usampler.install_signal_handler()
+
+
+    def instantiate_memory_tracker(self):
+        """ Starts tracking the memory (and tracing the allocations), if the run asks for it """
+        if self.config_data[acfg.KEY_MEMORY_INT] > 0:
+            self.memory_tracker = umemory.MemoryTracker()
+
+
+    def instantiate_recorder(self):
+        """ Starts recording the transitions played in training into the directory of the run, if it asks for it """
+        if self.config_data[acfg.KEY_RECORD_TRAJ] and self.run_dir is not None:
+            env = self.agent.get_environment()
+            self.recorder = utraj.TrajectoryRecorder(out_dir=os.path.join(self.run_dir, utraj.TRAJECTORY_DIR),
+                                                     n_agents=env.getNumAgents())
+            self.agent.set_recorder(self.recorder)
+
+
+    def instantiate_all_perspectives(self):
+        """ Lets the agent play all the geese once the warmup is over, if the run asks for it and it's supported """
+        if not self.config_data[acfg.KEY_ALL_PERSPECTIVES]:
+            return
+
+        if self.agent.supports_all_perspectives() and self.agent.get_environment().supportsAllPerspectives():
+            self.agent.set_all_perspectives(True)
+        else:
+            print(f'WARNING: {self.agent.get_name()} can\'t play all the agents of the game at once -- '
+                  f'Playing against its clones')
+
+
+    def instantiate_augmentation(self):
+        """ Augments the experience sampled from the replay buffer by the symmetries of the game, if the run asks
+            for it and there are both
+        """
+        if not self.config_data[acfg.KEY_AUGMENT_SYMMETRIES]:
+            return
+
+        symmetries = self.agent.get_environment().getSymmetries()
+        replay_buffer = self.agent.get_replay_buffer()
+        if symmetries is not None and replay_buffer is not None:
+            replay_buffer.set_augmentation(symmetries.augment)
+        else:
+            print(f'WARNING: {self.agent.get_name()} on this environment can\'t be trained on augmented experience -- '
+                  f'Training on it as it was played')
+
+
+    def instantiate_seed_bank(self):
+        """ Loads (or creates) the bank of seeds the showdowns are played on, if common seeds are used """
+        if self.config_data[acfg.KEY_EVAL_COMMON_SEEDS]:
+            seed_bank = useedbank.SeedBank(workspace=self.config_data[acfg.KEY_WORKSPACE],
+                                           env_name=self.config_data[acfg.KEY_ENVIRONMENT],
+                                           size=self.config_data[acfg.KEY_EVAL_EPISODES])
+            self.showdown_seeds = seed_bank.get_seeds()
 
 
     def logging_possible(self):
@@ -203,7 +594,24 @@ class Trainer:
             self.SHOWDOWN_KEY: showdowns,
             self.WIN_RATE_KEY: win_rate,
             self.AVG_SHOWDOWN_REWARD_KEY: avg_reward,
-            self.AVG_SHOWDOWN_STEPS_KEY: avg_steps
+            self.AVG_SHOWDOWN_STEPS_KEY: avg_steps,
+            self.SHOWDOWN_EPISODES_KEY: self.last_showdown_episodes
+        }
+
+        return data
+
+
+    def _prepare_data_profile(self, epoch, shares, env_steps_per_sec, updates_per_sec):
+        """ Bundles the data that needs to be sent to the parent GUI for update """
+
+        # Shares as percentages, the phases taking the most time first
+        shares = {name: round(share * 100, 1) for name, share in sorted(shares.items(), key=lambda x: -x[1])}
+
+        data = {
+            self.EPOCH_KEY: epoch,
+            self.PROFILE_SHARES_KEY: shares,
+            self.ENV_STEPS_PER_SEC_KEY: round(env_steps_per_sec, 1),
+            self.UPDATES_PER_SEC_KEY: round(updates_per_sec, 2)
         }
 
         return data
\ No newline at end of file
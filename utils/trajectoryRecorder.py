@@ -0,0 +1,170 @@
+# This module contains the recorder of the experience played in training, and the reader of the recordings
+#
+# The transitions are stored column by column, in chunks of whole episodes: a chunk is a directory holding one .npy
+# file per column. The boards only hold small markers, so they are stored as int8 (a quarter of the float32 boards
+# the agents see). The files are left uncompressed, so that the reader memory-maps them instead of loading them
+
+import os
+import glob
+import numpy as np
+
+
+TRAJECTORY_DIR = 'trajectories'         # Directory of the recording, in the directory of the run
+CHUNK_PREFIX = 'chunk_'
+NO_ACTION = -1                          # Action of a goose that didn't act (our own one in the opponents' column)
+
+# Columns of a chunk (one row per transition)
+COL_OBSERVATIONS = 'observations'       # (n, n_obs) int8 -- The state our agent acted on
+COL_ACTIONS = 'actions'                 # (n, ) int8
+COL_REWARDS = 'rewards'                 # (n, ) float32
+COL_DONES = 'dones'                     # (n, ) bool
+COL_OPP_ACTIONS = 'opponent_actions'    # (n, n_agents) int8 -- Actions of the opponents on the step, by their index
+COL_EPISODES = 'episodes'               # (n, ) int32 -- Training episode the transition was played in
+COLUMNS = [COL_OBSERVATIONS, COL_ACTIONS, COL_REWARDS, COL_DONES, COL_OPP_ACTIONS, COL_EPISODES]
+
+
+class TrajectoryRecorder:
+    """ Streams the transitions of the training episodes to disk. The transitions of an episode are kept in memory
+        till it ends, and the finished episodes are written as a chunk once there are enough of them, so a chunk
+        never holds part of an episode
+    """
+
+    CHUNK_TRANSITIONS = 16384           # A chunk is written once the finished episodes hold these many transitions
+
+    def __init__(self, out_dir, n_agents):
+        """
+        out_dir:  Directory to write the chunks into. A resumed run carries on numbering the chunks already there
+        n_agents: Number of agents in the game (the width of the opponents' actions)
+        """
+        self.out_dir = out_dir
+        self.n_agents = n_agents
+        self.episode = []                   # Transitions of the episode being played
+        self.pending = []                   # Columns of the finished episodes that are not written yet
+        self.n_pending = 0                  # Number of transitions in them
+        self.next_chunk = len(list_chunks(out_dir))
+
+        os.makedirs(out_dir, exist_ok=True)
+
+    def add(self, observation, action, reward, done, opponent_actions):
+        """ Adds a transition to the episode being played. opponent_actions is the list of the actions of all the
+            agents on the step, with None for those that didn't act (None if the environment doesn't track them)
+        """
+        self.episode.append((observation, action, reward, done, opponent_actions))
+
+    def end_episode(self, episode):
+        """ Marks the end of the episode being played, so its transitions can be written """
+        if not self.episode:
+            return
+
+        observations, actions, rewards, dones, opponent_actions = zip(*self.episode)
+        columns = {
+            COL_OBSERVATIONS: np.asarray(observations).astype(np.int8),
+            COL_ACTIONS: np.asarray(actions, dtype=np.int8),
+            COL_REWARDS: np.asarray(rewards, dtype=np.float32),
+            COL_DONES: np.asarray(dones, dtype=bool),
+            COL_OPP_ACTIONS: self._encode_opponent_actions(opponent_actions),
+            COL_EPISODES: np.full(len(self.episode), episode, dtype=np.int32)
+        }
+
+        self.pending.append(columns)
+        self.n_pending += len(self.episode)
+        self.episode = []
+
+        if self.n_pending >= self.CHUNK_TRANSITIONS:
+            self.flush()
+
+    def flush(self):
+        """ Writes the finished episodes as a chunk. The chunk only shows up under its name once it is complete """
+        if not self.pending:
+            return
+
+        path = os.path.join(self.out_dir, f'{CHUNK_PREFIX}{self.next_chunk:06d}')
+        tmp_path = path + '.tmp'
+        os.makedirs(tmp_path, exist_ok=True)
+        for column in COLUMNS:
+            np.save(os.path.join(tmp_path, f'{column}.npy'), np.concatenate([p[column] for p in self.pending]))
+        os.rename(tmp_path, path)
+
+        self.pending = []
+        self.n_pending = 0
+        self.next_chunk += 1
+
+    def close(self):
+        """ Writes the finished episodes. The unfinished one (e.g. cut short by cancelling) is dropped """
+        self.episode = []
+        self.flush()
+
+    def _encode_opponent_actions(self, opponent_actions):
+        """ Returns the actions of the opponents as an int8 array, NO_ACTION for those that didn't act """
+        encoded = np.full((len(opponent_actions), self.n_agents), NO_ACTION, dtype=np.int8)
+        for i, step_actions in enumerate(opponent_actions):
+            if step_actions is not None:
+                encoded[i] = [NO_ACTION if a is None else a for a in step_actions]
+        return encoded
+
+
+class TrajectoryReader:
+    """ Memory-maps the chunks of a recording. Rows are addressed globally, in the order they were recorded """
+
+    def __init__(self, in_dir, chunk_names=None):
+        """
+        in_dir:      Directory of the recording
+        chunk_names: Names of the chunks to map (all the complete ones by default)
+        """
+        paths = list_chunks(in_dir) if chunk_names is None else [os.path.join(in_dir, n) for n in chunk_names]
+        self.chunks = [{column: np.load(os.path.join(path, f'{column}.npy'), mmap_mode='r') for column in COLUMNS}
+                       for path in paths]
+
+        # offsets[i] is the global index of the first row of chunk i
+        self.offsets = np.cumsum([0] + [len(chunk[COL_ACTIONS]) for chunk in self.chunks])
+
+    def __len__(self):
+        """ Returns the number of transitions recorded """
+        return int(self.offsets[-1])
+
+    def get_chunks(self):
+        """ Returns the chunks, as dictionaries of the mapped columns """
+        return self.chunks
+
+    def get_column(self, column):
+        """ Returns a whole column, copied out of the chunks """
+        return np.concatenate([chunk[column] for chunk in self.chunks])
+
+    def get_batch(self, indices):
+        """ Returns (states, actions, rewards, next_states, dones) of the transitions at the indices, in the format of
+            ReplayBuffer.sample() but as arrays. The next state of a transition is the state of the one after it.
+            The last transition of an episode has none, it's all zeros (the targets discard it anyway)
+        """
+        indices = np.asarray(indices)
+        n_obs = self.chunks[0][COL_OBSERVATIONS].shape[1]
+        states = np.empty((len(indices), n_obs), dtype=np.float32)
+        next_states = np.empty((len(indices), n_obs), dtype=np.float32)
+        actions = np.empty(len(indices), dtype=np.int64)
+        rewards = np.empty(len(indices), dtype=np.float32)
+        dones = np.empty(len(indices), dtype=bool)
+
+        chunk_ids = np.searchsorted(self.offsets, indices, side='right') - 1
+        for chunk_id in np.unique(chunk_ids):
+            chunk = self.chunks[chunk_id]
+            mask = chunk_ids == chunk_id
+            rows = indices[mask] - self.offsets[chunk_id]
+            next_rows = np.minimum(rows + 1, len(chunk[COL_ACTIONS]) - 1)   # Chunks end on the end of an episode
+
+            states[mask] = chunk[COL_OBSERVATIONS][rows]
+            actions[mask] = chunk[COL_ACTIONS][rows]
+            rewards[mask] = chunk[COL_REWARDS][rows]
+            dones[mask] = chunk[COL_DONES][rows]
+            next_states[mask] = chunk[COL_OBSERVATIONS][next_rows]
+
+        next_states[dones] = 0
+        return states, actions, rewards, next_states, dones
+
+    def sample(self, batch_size):
+        """ Returns a batch of transitions picked uniformly at random (see get_batch()) """
+        return self.get_batch(np.random.randint(len(self), size=batch_size))
+
+
+def list_chunks(directory):
+    """ Returns the paths of the complete chunks in the directory, in the order they were written """
+    paths = glob.glob(os.path.join(directory, f'{CHUNK_PREFIX}*'))
+    return sorted(path for path in paths if os.path.isdir(path) and not path.endswith('.tmp'))
@@ -0,0 +1,103 @@
+# This module plays the warmup episodes in parallel, in worker processes
+#
+# During the warmup, the opponents are the bots of the environment, so the episodes don't depend on the agent being
+# trained. They can all be played up front, by frozen copies of the agent picking actions the way it does in
+# training, and their experience loaded into the replay buffer at once
+
+import queue
+import random
+import traceback
+import numpy as np
+import torch
+import multiprocessing as mp
+
+
+POLL_INTERVAL_SECS = 0.2        # How often the cancellation is checked while the workers play
+
+
+def generate_warmup(agent, n_episodes, n_workers, need_to_stop=None):
+    """ Plays n_episodes against the warmup bots, split over n_workers processes that each play a frozen copy of
+        the agent. Returns (columns, stats): the experiences (column by column, in the format of the replay buffer's
+        segments) and the (total_reward, total_steps, won) of every episode. Returns None if cancelled
+    """
+    env = agent.get_environment()
+    n_workers = max(1, min(n_workers, n_episodes))
+    shares = [n_episodes // n_workers + (i < n_episodes % n_workers) for i in range(n_workers)]
+    seeds = np.random.randint(2**31, size=n_workers)
+
+    jobs = [(type(agent), type(env), env.getNumAgents(), agent.get_network(), agent.get_state(), share, int(seed))
+            for share, seed in zip(shares, seeds)]
+
+    # Spawned, not forked -- The training process runs threads of its own (and those of torch). Plain processes
+    # rather than a pool: a pool silently replaces a worker that dies (e.g. killed when out of memory, or unable to
+    # import the modules of the run), and its episodes never come back
+    context = mp.get_context('spawn')
+    results_queue = context.Queue()
+    workers = [context.Process(target=_run_worker, args=(i, results_queue) + job, daemon=True)
+               for i, job in enumerate(jobs)]
+    for worker in workers:
+        worker.start()
+
+    results = [None] * n_workers
+    try:
+        n_done = 0
+        while n_done < n_workers:
+            try:
+                i, worker_results, error = results_queue.get(timeout=POLL_INTERVAL_SECS)
+            except queue.Empty:
+                if need_to_stop is not None and need_to_stop():
+                    return None
+                _check_workers(workers, results)
+                continue
+
+            if error is not None:
+                raise RuntimeError(f'Warmup worker {i} failed:\n{error}')
+            results[i] = worker_results
+            n_done += 1
+    finally:
+        for worker in workers:
+            if worker.is_alive():
+                worker.terminate()
+            worker.join()
+
+    columns = {key: np.concatenate([worker_columns[key] for worker_columns, _ in results])
+               for key in results[0][0]}
+    stats = [episode_stats for _, worker_stats in results for episode_stats in worker_stats]
+    return columns, stats
+
+
+def _check_workers(workers, results):
+    """ Raises a RuntimeError if a worker died before sending its results """
+    for i, worker in enumerate(workers):
+        if results[i] is None and worker.exitcode not in (None, 0):
+            # A negative exit code is the signal that killed it (e.g. -9 when the system ran out of memory)
+            raise RuntimeError(f'Warmup worker {i} died before sending its episodes (exit code {worker.exitcode})')
+
+
+def _run_worker(index, results_queue, *job):
+    """ Entry point of a worker process. Sends (index, (columns, stats), None) back, or (index, None, traceback) if
+        the episodes couldn't be played
+    """
+    try:
+        results_queue.put((index, _play_warmup(*job), None))
+    except Exception:
+        results_queue.put((index, None, traceback.format_exc()))
+
+
+def _play_warmup(agent_class, env_class, n_agents, network, state, n_episodes, seed):
+    """ Plays the episodes of a worker against the warmup bots and returns (columns, stats) """
+    torch.set_num_threads(1)        # The workers already take all the cores of the run
+    random.seed(seed)
+    np.random.seed(seed)
+    torch.manual_seed(seed)
+
+    env = env_class(n_agents, n_episodes, -1)       # Every episode it plays is a warmup one
+    agent = agent_class(env=env, network=network, optimizer=None, model_dir=None, log_dir=None)
+    agent.set_state(state)
+
+    with torch.no_grad():
+        stats = [agent.play_one_episode() for _ in range(n_episodes)]
+
+    _, experiences = agent.get_replay_buffer().take_new_segment()
+    columns = {key: np.asarray([data[key] for data in experiences]) for key in experiences[0]}
+    return columns, stats